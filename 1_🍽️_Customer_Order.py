@@ -4,17 +4,29 @@ Tabs: Chatbot (multilingual), Menu (with images), Deals
 Dark luxury theme with gold accents.
 """
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
+import functools
 import sys
+import uuid
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from utils.database import (
-    load_menu, get_active_deals, create_order, get_menu_item,
-    load_categories, get_active_categories
+    load_menu, get_active_deals, get_menu_items,
+    load_categories, get_active_categories, get_menu_version
 )
+from utils.cart import Cart
+from utils.deal_engine import get_deal_engine
 from utils.gemini_client import RestaurantChatbot
+from utils.image_cache import DEFAULT_CATEGORY_IMAGE, category_image, thumbnail_url
+from utils.menu_cards import get_menu_cards
+from utils.order_queue import get_order_queue
+from utils.order_status import get_order_status_board
+from utils.session_pool import checkout_chatbot
+from utils.session_store import get_session_store
+from utils.tracing import Span, get_tracer
 import config
 
 # Page configuration
@@ -348,6 +360,16 @@ except ValueError:
     st.error("Invalid table ID. Please scan the QR code again.")
     st.stop()
 
+# Visit token kept in the URL: a reload continues this visit, the next diner
+# scanning the table's QR code starts a new one
+visit_id = query_params.get("visit", None)
+if not visit_id:
+    visit_id = uuid.uuid4().hex
+    st.query_params["visit"] = visit_id
+
+# Time of a full page run (fragment reruns are timed separately)
+page_span = Span("render_page", table_id=table_id)
+
 # Header
 st.markdown(f"""
 <div class="main-header">
@@ -360,28 +382,36 @@ st.markdown(f"""
 if 'session_initialized' not in st.session_state:
     # This is a new session - clear everything
     st.session_state.session_initialized = True
-    st.session_state.cart_items = []
+    st.session_state.cart = Cart()
     st.session_state.chat_messages = []
     st.session_state.chatbot = None
     st.session_state.order_submitted = False
     st.session_state.last_order = None
-    st.session_state.cart_version = 0
-
-if 'cart_items' not in st.session_state:
-    st.session_state.cart_items = []
 
-if 'cart_version' not in st.session_state:
-    st.session_state.cart_version = 0
+if 'cart' not in st.session_state:
+    st.session_state.cart = Cart()
 
 if 'chat_messages' not in st.session_state:
     st.session_state.chat_messages = []
 
+if 'chat_window' not in st.session_state:
+    st.session_state.chat_window = config.CHAT_RENDER_WINDOW
+
 if 'chatbot' not in st.session_state or st.session_state.chatbot is None:
-    menu = load_menu()
-    deals = get_active_deals()
-    st.session_state.chatbot = RestaurantChatbot(table_id, menu, deals)
-    welcome = st.session_state.chatbot.get_welcome_message()
-    st.session_state.chat_messages = [{"role": "assistant", "content": welcome}]
+    saved = get_session_store().load(table_id, visit_id) if config.SESSION_STORE_ENABLED else None
+    if saved:
+        # Reload, reconnect or restart - continue the saved conversation and cart
+        st.session_state.chatbot = RestaurantChatbot.from_state(saved["chatbot"], load_menu(), get_active_deals())
+        st.session_state.chat_messages = [dict(message) for message in saved["chat_messages"]]
+        st.session_state.cart = Cart.from_list(saved["cart_items"])
+        st.session_state.order_submitted = saved.get("order_submitted", False)
+        st.session_state.last_order = saved.get("last_order")
+        st.session_state.pending_order_key = saved.get("pending_order_key")
+    else:
+        # A warm session from the pool when one is ready
+        st.session_state.chatbot = checkout_chatbot(table_id)
+        welcome = st.session_state.chatbot.get_welcome_message()
+        st.session_state.chat_messages = [{"role": "assistant", "content": welcome}]
 
 if 'order_submitted' not in st.session_state:
     st.session_state.order_submitted = False
@@ -389,42 +419,154 @@ if 'order_submitted' not in st.session_state:
 if 'last_order' not in st.session_state:
     st.session_state.last_order = None
 
-# Load data
-menu = load_menu()
-deals = get_active_deals()
-categories = get_active_categories()
+# Status changes of this table's orders already seen by the page
+if 'order_status_version' not in st.session_state:
+    st.session_state.order_status_version = None
+
+# Idempotency key of an order sent to the order queue but not saved yet
+if 'pending_order_key' not in st.session_state:
+    st.session_state.pending_order_key = None
+
+# The visit's order was paid - its session is no longer saved
+if 'visit_ended' not in st.session_state:
+    st.session_state.visit_ended = False
+
+# Bumped by order and chat resets; added messages and cart edits have their own counters
+if 'session_revision' not in st.session_state:
+    st.session_state.session_revision = 0
+
+# Revision of the session when it was last saved
+if 'saved_revision' not in st.session_state:
+    st.session_state.saved_revision = None
+
+def touch_session():
+    """Mark the order state as changed so the next save_session() writes it."""
+    st.session_state.session_revision += 1
+
+def session_revision() -> tuple:
+    """Changes whenever the chat, the cart or the order state changes."""
+    cart = st.session_state.cart
+    return (visit_id, st.session_state.session_revision, cart.id, cart.revision,
+            len(st.session_state.chat_messages))
+
+def save_session():
+    """Save chat and cart so a reload, reconnect or other server can continue them."""
+    if not config.SESSION_STORE_ENABLED or st.session_state.visit_ended:
+        return
+    revision = session_revision()
+    if revision != st.session_state.saved_revision:
+        # Serialized only when something changed since the last save
+        get_session_store().save(table_id, visit_id, {
+            "chat_messages": st.session_state.chat_messages,
+            "cart_items": st.session_state.cart.to_list(),
+            "order_submitted": st.session_state.order_submitted,
+            "last_order": st.session_state.last_order,
+            "pending_order_key": st.session_state.pending_order_key,
+            "chatbot": st.session_state.chatbot.to_state()
+        })
+        st.session_state.saved_revision = revision
+
+def end_visit(new_visit: bool = False):
+    """Delete the visit's saved session; with new_visit, continue under a new visit token."""
+    global visit_id
+    if config.SESSION_STORE_ENABLED:
+        get_session_store().delete(table_id, visit_id)
+    st.session_state.visit_ended = not new_visit
+    if new_visit:
+        visit_id = uuid.uuid4().hex
+        st.query_params["visit"] = visit_id
+
+# Changes made before the last st.rerun() are saved here (unchanged state is not rewritten)
+save_session()
+
+# Load data - cached until the admin saves the menu, deals or categories
+@st.cache_data(show_spinner=False)
+def _load_page_data(version: str):
+    return load_menu(), get_active_deals(), get_active_categories()
+
+def load_page_data():
+    """Menu, active deals and categories for the current data version."""
+    return _load_page_data(get_menu_version())
+
+menu, deals, categories = load_page_data()
+
+def fragment(name: str, run_every=None):
+    """
+    Page part that reruns on its own when its widgets change, and every
+    `run_every` seconds if given (CUSTOMER_PAGE_FRAGMENTS; without fragments
+    it only runs with the page). Each render is timed as a render_<name> span.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def render(*args, **kwargs):
+            with get_tracer().span(f"render_{name}", table_id=table_id):
+                return func(*args, **kwargs)
+        return st.fragment(render, run_every=run_every) if config.CUSTOMER_PAGE_FRAGMENTS else render
+    return decorator
+
+def rerun(scope: str = "app"):
+    """Save the session and rerun the page, or only the calling fragment."""
+    save_session()
+    if scope == "fragment" and config.CUSTOMER_PAGE_FRAGMENTS:
+        try:
+            st.rerun(scope="fragment")
+        except StreamlitAPIException:
+            # Widget handled during a full page run - there is no fragment rerun to repeat
+            pass
+    st.rerun()
 
 # Helper function to add item to cart
 def add_to_cart(item_id: str, name: str, price: float, quantity: int = 1):
-    # Check if item already exists in cart
-    for i, item in enumerate(st.session_state.cart_items):
-        if item['item_id'] == item_id:
-            item['quantity'] += quantity
-            new_qty = item['quantity']
-            
-            # Increment version to force widget refresh
-            st.session_state.cart_version += 1
-                
-            # Trigger state update explicitly
-            st.session_state.cart_items = st.session_state.cart_items
-            return new_qty
-            
-    # If not found, add new
-    st.session_state.cart_items.append({
-        "item_id": item_id,
-        "name": name,
-        "price": round(float(price), 2),
-        "quantity": quantity
-    })
-    st.session_state.cart_version += 1
-    return quantity
-
-# Helper function to calculate cart total
-def get_cart_total():
-    return sum(item['price'] * item['quantity'] for item in st.session_state.cart_items)
+    return st.session_state.cart.add(item_id, name, price, quantity)
+
+# Helper function to add the items of a chatbot reply to the cart
+def add_items_to_cart(items):
+    """
+    Resolve items against one menu snapshot (current prices, availability)
+    and merge them into the cart in one pass.
+    Returns the added items and the IDs that are unknown or unavailable.
+    """
+    menu_items = get_menu_items([item['item_id'] for item in items])
+    cart = st.session_state.cart
+    added = []
+    unavailable = []
+    for item in items:
+        menu_item = menu_items.get(item['item_id'])
+        if menu_item is None:
+            unavailable.append(item['item_id'])
+            continue
+        cart.add(item['item_id'], menu_item['name'].get('en', item['name']), menu_item['price'], item['quantity'])
+        added.append({**cart.get(item['item_id']), "quantity": item['quantity']})
+    return added, unavailable
+
+# Helper function to send the cart to the order queue
+def submit_order(wait: float = 0):
+    """
+    Queue the cart as an order (again under the pending key, so repeats return
+    the same order) and wait up to `wait` seconds for it to be saved.
+    """
+    cart = st.session_state.cart
+    key = st.session_state.pending_order_key or f"table{table_id}-{cart.checkout_key}"
+    pricing = cart.pricing()
+    submission = get_order_queue().submit(key, table_id, cart.to_list(), pricing['total'], pricing['discounts'])
+    st.session_state.pending_order_key = key
+    touch_session()
+    submission.wait(wait)
+    if submission.status == "committed":
+        st.session_state.order_submitted = True
+        st.session_state.last_order = submission.order
+        st.session_state.pending_order_key = None
+        touch_session()
+        # Only the submitted lines - items added while the order was saved stay in the cart
+        cart.remove_items(submission.request['items'])
+    elif submission.status == "failed":
+        st.session_state.pending_order_key = None
+        touch_session()
+        st.error(f"❌ {submission.error}. Please try again.")
+    return submission
 
 # Helper function to format bill
-def format_bill(items, total):
+def format_bill(items, total, discounts=()):
     bill = "```\n"
     bill += "=" * 40 + "\n"
     bill += "           ORDER RECEIPT\n"
@@ -438,6 +580,9 @@ def format_bill(items, total):
         # Truncate or pad
         name = item['name'][:20]
         bill += f"{name:<20} {item['quantity']:>3} {subtotal:>12.2f} SAR\n"
+    for discount in discounts:
+        name = f"{discount['name']} -{discount['percent']}%"[:24]
+        bill += f"{name:<24} {-discount['amount']:>12.2f} SAR\n"
     bill += "-" * 40 + "\n"
     bill += f"{'TOTAL':<20} {'':>3} {total:>12.2f} SAR\n"
     bill += "=" * 40 + "\n"
@@ -445,27 +590,39 @@ def format_bill(items, total):
     return bill
 
 # Sidebar - Cart
-with st.sidebar:
+@fragment("cart")
+def render_cart():
     st.markdown('<p class="cart-header">🛒 Your Order</p>', unsafe_allow_html=True)
     
+    # An order still being saved - check whether it is done
+    if st.session_state.pending_order_key:
+        submit_order()
+
     if st.session_state.order_submitted and st.session_state.last_order:
         st.success("✅ Order Submitted!")
         order = st.session_state.last_order
         st.markdown(f"**Order #{order['order_id']}**")
-        st.markdown(format_bill(order['items'], order['total_price']))
-        st.markdown("""
+        st.markdown(format_bill(order['items'], order['total_price'], order.get('discounts', [])))
+        message = "💳 Paid - thank you! ✨" if order.get('status') == "Paid" else "✨ Please proceed to cashier for payment. ✨"
+        st.markdown(f"""
         <div style="background: rgba(212, 175, 55, 0.1); border: 1px solid #d4af37; padding: 1rem; border-radius: 10px; text-align: center; margin: 1rem 0;">
-            <p style="color: #d4af37; font-weight: 600; margin: 0;">✨ Please proceed to cashier for payment. ✨</p>
+            <p style="color: #d4af37; font-weight: 600; margin: 0;">{message}</p>
         </div>
         """, unsafe_allow_html=True)
         
         if st.button("New Order", type="primary", use_container_width=True):
-            st.session_state.cart_items = []
+            end_visit(new_visit=True)
             st.session_state.order_submitted = False
             st.session_state.last_order = None
-            st.rerun()
+            touch_session()
+            rerun("fragment")
+    
+    elif st.session_state.pending_order_key:
+        st.info("⏳ Sending your order to the kitchen...")
+        if st.button("🔄 Check Order", use_container_width=True):
+            rerun("fragment")
     
-    elif not st.session_state.cart_items:
+    elif not st.session_state.cart:
         st.markdown("""
         <div style="background: rgba(212, 175, 55, 0.1); border: 2px solid #d4af37; padding: 1.5rem; border-radius: 15px; text-align: center; margin: 1rem 0; box-shadow: 0 0 20px rgba(212, 175, 55, 0.15);">
             <p style="color: #ffffff; font-size: 1.1rem; margin: 0;">Your cart is empty.</p>
@@ -474,7 +631,8 @@ with st.sidebar:
         """, unsafe_allow_html=True)
     
     else:
-        for i, item in enumerate(st.session_state.cart_items):
+        cart = st.session_state.cart
+        for item in cart:
             col1, col2, col3 = st.columns([3, 1, 1])
             with col1:
                 st.markdown(f"**{item['name']}**")
@@ -485,40 +643,59 @@ with st.sidebar:
                     min_value=0, 
                     max_value=10, 
                     value=item['quantity'],
-                    key=f"cart_qty_{item['item_id']}_{i}_v{st.session_state.get('cart_version', 0)}",
+                    key=cart.widget_key(item['item_id']),
                     label_visibility="collapsed"
                 )
                 if new_qty != item['quantity']:
-                    if new_qty == 0:
-                        st.session_state.cart_items.pop(i)
-                        st.rerun()
-                    else:
-                        item['quantity'] = new_qty
-                        st.rerun()
+                    cart.set_quantity(item['item_id'], new_qty)
+                    rerun("fragment")
             with col3:
                 subtotal = item['price'] * item['quantity']
                 st.markdown(f"**{subtotal:.2f}**")
             st.divider()
         
         # Total
-        total = get_cart_total()
+        pricing = cart.pricing()
+        for discount in pricing['discounts']:
+            st.markdown(f"🎁 **{discount['name']}** ({discount['percent']}% off): -{discount['amount']:.2f} SAR")
+        total = pricing['total']
         st.markdown(f'<p class="cart-total">Total: {total:.0f} SAR</p>', unsafe_allow_html=True)
         
         # Submit Order
         if st.button("✅ Confirm Order", type="primary", use_container_width=True):
-            order = create_order(
-                table_id=table_id,
-                items=st.session_state.cart_items,
-                total_price=total
-            )
-            st.session_state.order_submitted = True
-            st.session_state.last_order = order
-            st.session_state.cart_items = []
-            st.rerun()
+            # Saved by the order queue; repeated taps of the same cart give the same order
+            if submit_order(wait=config.ORDER_SUBMIT_WAIT).status != "failed":
+                rerun("fragment")
         
         if st.button("🗑️ Clear Cart", use_container_width=True):
-            st.session_state.cart_items = []
-            st.rerun()
+            cart.clear()
+            rerun("fragment")
+
+# Status of the submitted order - checked every few seconds against the
+# table's change counter, the order list is not reloaded
+@fragment("order_status", run_every=config.ORDER_STATUS_REFRESH_INTERVAL)
+def watch_order_status():
+    order = st.session_state.last_order
+    if not st.session_state.order_submitted or not order or order.get('status') == "Paid":
+        return
+    board = get_order_status_board()
+    version = board.version(table_id)
+    if version == st.session_state.order_status_version:
+        return
+    st.session_state.order_status_version = version
+    status = board.status(table_id, order['order_id'])
+    if status and status != order.get('status'):
+        st.session_state.last_order = {**order, "status": status}
+        touch_session()
+        if status == "Paid":
+            end_visit()
+            st.toast(f"Order #{order['order_id']} is paid. Thank you! 💳", icon="✅")
+        # The receipt in the cart shows the new status
+        rerun()
+
+with st.sidebar:
+    render_cart()
+    watch_order_status()
 
 # Main content - Three tabs
 tab1, tab2, tab3 = st.tabs(["🤖 Chatbot", "📋 Menu", "🎁 Deals"])
@@ -526,14 +703,22 @@ tab1, tab2, tab3 = st.tabs(["🤖 Chatbot", "📋 Menu", "🎁 Deals"])
 # =============================================================================
 # TAB 1: CHATBOT (Multilingual)
 # =============================================================================
-with tab1:
+@fragment("chat")
+def render_chat():
     st.markdown('<p class="section-header">💬 Chat with our AI Assistant</p>', unsafe_allow_html=True)
     st.markdown('<p style="color: #ffffff; font-size: 0.9rem;">Supports English • اردو • العربية</p>', unsafe_allow_html=True)
     
-    # Chat container
+    # Chat container - only the latest messages are rendered, earlier ones on request
     chat_container = st.container(height=400)
     with chat_container:
-        for message in st.session_state.chat_messages:
+        messages = st.session_state.chat_messages
+        shown = min(len(messages), st.session_state.chat_window)
+        if shown < len(messages):
+            if st.button(f"⬆️ Load earlier messages ({len(messages) - shown})", key="chat_load_earlier",
+                         use_container_width=True):
+                st.session_state.chat_window += config.CHAT_RENDER_WINDOW
+                rerun("fragment")
+        for message in messages[len(messages) - shown:]:
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
     
@@ -543,47 +728,52 @@ with tab1:
         st.session_state.chat_messages.append({"role": "user", "content": prompt})
         
         # Get chatbot response
+        queue_status = st.empty()
+        
+        def show_queue_position(position):
+            if position == 0:
+                queue_status.caption("⏳ You're next...")
+            else:
+                queue_status.caption(f"⏳ {position} request(s) ahead of you...")
+        
         with st.spinner("..."):
-            response = st.session_state.chatbot.send_message(prompt)
+            response = st.session_state.chatbot.send_message(
+                prompt,
+                cart_items=st.session_state.cart.items(),
+                on_wait=show_queue_position
+            )
+        queue_status.empty()
         
-        # Parse for hidden order tags: [ORDER: item_id, quantity]
-        import re
-        order_tags = re.findall(r'\[ORDER:\s*([^,]+),\s*(\d+)\]', response)
+        # Items the assistant confirmed, checked against the current menu in one batch
+        with get_tracer().span("cart_update", table_id=table_id) as span:
+            added, unavailable = add_items_to_cart(st.session_state.chatbot.last_order_items)
+            span.attributes["items"] = len(added)
+            span.attributes["unavailable"] = len(unavailable)
+        items_added = [f"{item['quantity']}x {item['name']}" for item in added]
         
-        # Process orders if found
-        items_added = []
-        if order_tags:
-            for item_id, qty in order_tags:
-                try:
-                    # Clean the ID (remove potential whitespace) and parse qty
-                    item_id = item_id.strip() 
-                    qty = int(qty)
-                    
-                    # We need to fetch the item details to add it
-                    # Try menu first
-                    item_details = get_menu_item(item_id)
-                    if item_details:
-                        name = item_details['name'].get('en', 'Unknown')
-                        price = item_details['price']
-                        add_to_cart(item_id, name, price, qty)
-                        items_added.append(f"{qty}x {name}")
-                except Exception as e:
-                    print(f"Error processing tag: {e}")
-            
-            # Clean response text (remove tags)
-            response = re.sub(r'\[ORDER:.*?\]', '', response).strip()
-            
-            if items_added:
-                st.toast(f"Added to cart: {', '.join(items_added)} 🛒", icon="✅")
-                # Add a visible reminder to confirm logic
-                st.session_state.chat_messages.append({
-                    "role": "assistant", 
-                    "content": "✅ **Items added to cart!** Please review your order in the sidebar and click **'Confirm Order'** to send it to the kitchen."
-                })
+        if items_added:
+            st.toast(f"Added to cart: {', '.join(items_added)} 🛒", icon="✅")
+            # Add a visible reminder to confirm logic
+            st.session_state.chat_messages.append({
+                "role": "assistant", 
+                "content": "✅ **Items added to cart!** Please review your order in the sidebar and click **'Confirm Order'** to send it to the kitchen."
+            })
         
         # Add assistant response
         st.session_state.chat_messages.append({"role": "assistant", "content": response})
-        st.rerun()
+        
+        if unavailable:
+            # The chatbot's menu is from when the chat started - tell it what changed
+            st.session_state.chatbot.report_unavailable_items(unavailable)
+            names = [item['name'] for item in st.session_state.chatbot.last_order_items
+                     if item['item_id'] in unavailable]
+            st.session_state.chat_messages.append({
+                "role": "assistant",
+                "content": f"⚠️ Sorry, {', '.join(names)} is no longer available and was not added to your cart."
+            })
+        
+        # The cart sidebar only changes when the reply added items
+        rerun("app" if items_added else "fragment")
     
     # Quick actions
     st.divider()
@@ -592,69 +782,70 @@ with tab1:
     with col1:
         if st.button("📋 Show Menu", use_container_width=True):
             st.session_state.chat_messages.append({"role": "user", "content": "Show me the menu"})
-            response = st.session_state.chatbot.send_message("Show me the full menu with prices")
+            response = st.session_state.chatbot.quick_action("menu", st.session_state.chatbot.language or "en")
             st.session_state.chat_messages.append({"role": "assistant", "content": response})
-            st.rerun()
+            rerun("fragment")
     
     with col2:
         if st.button("🎁 View Deals", use_container_width=True):
             st.session_state.chat_messages.append({"role": "user", "content": "What deals are available?"})
-            response = st.session_state.chatbot.send_message("What deals and offers do you have?")
+            response = st.session_state.chatbot.quick_action("deals", st.session_state.chatbot.language or "en")
             st.session_state.chat_messages.append({"role": "assistant", "content": response})
-            st.rerun()
+            rerun("fragment")
     
     with col3:
         if st.button("🛒 View Cart", use_container_width=True):
-            if st.session_state.cart_items:
-                bill = format_bill(st.session_state.cart_items, get_cart_total())
-                st.session_state.chat_messages.append({"role": "assistant", "content": f"Here's your current order:\n\n{bill}"})
-            else:
-                st.session_state.chat_messages.append({"role": "assistant", "content": "Your cart is empty. Would you like to see the menu?"})
-            st.rerun()
+            cart = st.session_state.cart
+            response = st.session_state.chatbot.quick_action(
+                "cart", st.session_state.chatbot.language or "en",
+                cart_items=cart.to_list(), discounts=cart.pricing()['discounts'] if cart else None
+            )
+            st.session_state.chat_messages.append({"role": "assistant", "content": response})
+            rerun("fragment")
     
     with col4:
         if st.button("🔄 New Chat", use_container_width=True):
             st.session_state.chat_messages = []
-            menu = load_menu()
-            deals = get_active_deals()
-            st.session_state.chatbot = RestaurantChatbot(table_id, menu, deals)
+            st.session_state.chat_window = config.CHAT_RENDER_WINDOW
+            st.session_state.chatbot = checkout_chatbot(table_id)
+            touch_session()
             welcome = st.session_state.chatbot.get_welcome_message()
             st.session_state.chat_messages.append({"role": "assistant", "content": welcome})
-            st.rerun()
+            rerun("fragment")
+
+with tab1:
+    render_chat()
 
 # =============================================================================
 # TAB 2: MENU (with images)
 # =============================================================================
-with tab2:
+@fragment("menu")
+def render_menu():
+    menu, _, categories = load_page_data()
     st.markdown('<p class="section-header">📋 Our Menu</p>', unsafe_allow_html=True)
     
     # Category selection
     if 'selected_menu_category' not in st.session_state:
         st.session_state.selected_menu_category = None
     
+    # Items shown of the selected category or search; "Load more" shows the next page
+    if 'menu_visible' not in st.session_state:
+        st.session_state.menu_visible = config.MENU_PAGE_SIZE
+    
     # Display category buttons with images
     st.markdown("**Select a Category:**")
     cols = st.columns(len(categories) if categories else 5)
     
-    # Category images mapping (using food images for categories)
-    category_images = {
-        "Fast Food": "https://images.unsplash.com/photo-1568901346375-23c9450c58cd?w=200",
-        "Pizza": "https://images.unsplash.com/photo-1565299624946-b28f40a0ae38?w=200",
-        "Meat & BBQ": "https://images.unsplash.com/photo-1544025162-d76694265947?w=200",
-        "Tea": "https://images.unsplash.com/photo-1571934811356-5cc061b6821f?w=200",
-        "Ice Cream": "https://images.unsplash.com/photo-1570197571499-166b36435e9f?w=200",
-        "naan": "https://images.unsplash.com/photo-1565557623262-b51c2513a641?w=200"
-    }
-    
     for i, cat in enumerate(categories):
         with cols[i % len(cols)]:
-            cat_image = cat.get('image', category_images.get(cat['name'], 'https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=200'))
+            # Local thumbnail once it is ready
+            cat_image = thumbnail_url(category_image(cat), "category")
             is_selected = st.session_state.selected_menu_category == cat['name']
             
             # Category Card HTML
             st.markdown(f"""
             <div class="category-card {'selected' if is_selected else ''}">
-                <img src="{cat_image}" class="category-image" onerror="this.src='https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=200'">
+                <img src="{cat_image}" class="category-image" onerror="this.src='{DEFAULT_CATEGORY_IMAGE}'">
                 <p class="category-name">{cat['name']}</p>
             </div>
             """, unsafe_allow_html=True)
@@ -666,50 +857,74 @@ with tab2:
                 use_container_width=True
             ):
                 st.session_state.selected_menu_category = cat['name']
-                st.rerun()
+                st.session_state.menu_visible = config.MENU_PAGE_SIZE
+                rerun("fragment")
     
     st.divider()
     
+    # Search by item name (in any language) across all categories
+    query = st.text_input(
+        "Search the menu",
+        key="menu_search",
+        placeholder="🔍 Search dishes... / تلاش کریں / ابحث",
+        label_visibility="collapsed",
+        on_change=lambda: st.session_state.update(menu_visible=config.MENU_PAGE_SIZE)
+    ).strip().lower()
+    
     # Display menu items
-    if st.session_state.selected_menu_category and st.session_state.selected_menu_category in menu:
+    available_items = None
+    if query:
+        available_items = [
+            item for items in menu.values() for item in items
+            if item.get('available', True)
+            and any(query in name.lower() for name in item['name'].values() if name)
+        ]
+        if not available_items:
+            st.info(f"No dishes match \"{query}\".")
+    elif st.session_state.selected_menu_category and st.session_state.selected_menu_category in menu:
         items = menu[st.session_state.selected_menu_category]
         available_items = [item for item in items if item.get('available', True)]
+    
+    if available_items:
+        # Card HTML is built once per menu version
+        cards = get_menu_cards("en")
+        visible = available_items[:st.session_state.menu_visible]
         
         # Display in grid (3 columns)
         cols = st.columns(3)
-        for i, item in enumerate(available_items):
+        for i, item in enumerate(visible):
             with cols[i % 3]:
-                # Image
-                image_url = item.get('image', 'https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=400')
-                
-                # Item details
                 name = item['name'].get('en', 'Unknown')
-                desc = item.get('description', {}).get('en', '')
                 price = item['price']
                 
-                st.markdown(f"""
-                <div class="menu-card">
-                    <img src="{image_url}" class="menu-image" alt="{name}" onerror="this.src='https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=400'">
-                    <div class="menu-info">
-                        <div class="menu-name">{name}</div>
-                        <div class="menu-desc">{desc[:60] + '...' if len(desc) > 60 else desc}</div>
-                        <div class="menu-price">{price} SAR</div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(cards.html(item['item_id']), unsafe_allow_html=True)
                 
                 # Add to cart button with unique key
                 if st.button(f"➕ Add to Cart", key=f"add_{item['item_id']}_{i}", use_container_width=True):
                     new_qty = add_to_cart(item['item_id'], name, price)
                     st.toast(f"Added {name} (Qty: {new_qty})! ✨", icon="✅")
-                    st.rerun()
-    else:
+                    # Full rerun so the cart sidebar shows the item
+                    rerun()
+        
+        remaining = len(available_items) - len(visible)
+        if remaining > 0:
+            st.caption(f"Showing {len(visible)} of {len(available_items)} dishes")
+            if st.button(f"⬇️ Load more ({min(remaining, config.MENU_PAGE_SIZE)})", key="menu_load_more",
+                         use_container_width=True):
+                st.session_state.menu_visible += config.MENU_PAGE_SIZE
+                rerun("fragment")
+    elif available_items is None:
         st.info("👆 Select a category above to view items")
 
+with tab2:
+    render_menu()
+
 # =============================================================================
 # TAB 3: DEALS
 # =============================================================================
-with tab3:
+@fragment("deals")
+def render_deals():
+    _, deals, _ = load_page_data()
     st.markdown('<p class="section-header">🎁 Special Deals & Offers</p>', unsafe_allow_html=True)
     
     if not deals:
@@ -722,7 +937,7 @@ with tab3:
                 discount = deal.get('discount_percent', 0)
                 deal_image = deal.get('image', 'https://images.unsplash.com/photo-1504674900247-0877df9cc836?w=600')
                 
-                applicable = deal.get('applicable_items', [])
+                deal_price = get_deal_engine().deal_price(deal['deal_id'])
                 
                 col1, col2 = st.columns([1, 2])
                 
@@ -737,18 +952,15 @@ with tab3:
                         <p class="deal-desc">{desc}</p>
                         <div style="margin-top: 1rem;">
                     """, unsafe_allow_html=True)
+                    if deal_price and deal_price['price']:
+                        st.markdown(f"~~{deal_price['price']:.2f}~~ **{deal_price['deal_price']:.2f} SAR**")
                     
                     if st.button(f"🛍️ Order Full Deal", key=f"full_deal_{deal['deal_id']}", type="primary", use_container_width=True):
-                        added_any = False
-                        for item_id in applicable:
-                            item = get_menu_item(item_id)
-                            if item:
-                                discounted_price = round(item['price'] * (1 - discount / 100), 2)
-                                add_to_cart(f"{item_id}_deal_{deal['deal_id']}", f"{item['name'].get('en', 'Item')} (Deal)", discounted_price)
-                                added_any = True
-                        if added_any:
+                        # Regular items; the cart pricing applies the deal discount
+                        added, _ = add_items_to_cart(get_deal_engine().expand(deal['deal_id']))
+                        if added:
                             st.toast(f"Full Deal '{name}' added to cart! 🎁", icon="✅")
-                            st.rerun()
+                            rerun()
                     
                     st.markdown("""
                         </div>
@@ -757,9 +969,16 @@ with tab3:
                 
                 st.divider()
 
+with tab3:
+    render_deals()
+
+save_session()
+
 # Footer
 st.markdown(f"""
 <div class="premium-footer">
     🍽️ Table {table_id} | Need help? Use the Chatbot!
 </div>
 """, unsafe_allow_html=True)
+
+get_tracer().record(page_span)
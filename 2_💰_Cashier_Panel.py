@@ -276,6 +276,8 @@ if search_id > 0:
                 for item in found_order.get('items', []):
                     subtotal = item['price'] * item['quantity']
                     st.markdown(f'<p style="color: #ffffff; margin: 0 0 0.2rem 0;">• {item["name"]} x{item["quantity"]} = <span style="color: #d4af37; font-weight: 600;">{subtotal:.2f} SAR</span></p>', unsafe_allow_html=True)
+                for discount in found_order.get('discounts', []):
+                    st.markdown(f'<p style="color: #ffffff; margin: 0 0 0.2rem 0;">• 🎁 {discount["name"]} ({discount["percent"]}% off) = <span style="color: #d4af37; font-weight: 600;">-{discount["amount"]:.2f} SAR</span></p>', unsafe_allow_html=True)
                 st.markdown(f'<h3 style="margin-top: 1rem;">Total: <span style="color: #f7e98e;">{found_order["total_price"]:.2f} SAR</span></h3>', unsafe_allow_html=True)
             
             with col2:
@@ -341,6 +343,8 @@ with tab1:
                 for item in order.get('items', []):
                     subtotal = item['price'] * item['quantity']
                     st.markdown(f'<p style="color: #ffffff; margin: 0 0 0.2rem 0;">• {item["name"]} x{item["quantity"]} = <span style="color: #d4af37; font-weight: 600;">{subtotal:.2f} SAR</span></p>', unsafe_allow_html=True)
+                for discount in order.get('discounts', []):
+                    st.markdown(f'<p style="color: #ffffff; margin: 0 0 0.2rem 0;">• 🎁 {discount["name"]} ({discount["percent"]}% off) = <span style="color: #d4af37; font-weight: 600;">-{discount["amount"]:.2f} SAR</span></p>', unsafe_allow_html=True)
                 
                 order_time = order.get('timestamp', '')
                 if order_time:
@@ -415,6 +419,9 @@ with tab2:
                         name = item['name'][:20] # slightly wider
                         receipt += f"│ {name:<20} {item['quantity']:>3} {subtotal:>10.2f} SAR │\n"
                         # Add extra line for clarity if needed, or just keep it tight but aligned.
+                    for discount in order.get('discounts', []):
+                        name = f"{discount['name']} -{discount['percent']}%"[:24]
+                        receipt += f"│ {name:<24} {-discount['amount']:>10.2f} SAR │\n"
                     
                     receipt += f"""├{'─' * 38}┤
 │ {'TOTAL':<20} {'':<3} {order['total_price']:>10.2f} SAR │
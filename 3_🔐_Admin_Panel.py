@@ -24,6 +24,15 @@ from utils.database import (
     get_active_categories, get_next_category_order
 )
 from utils.auth import check_password, logout
+from utils.tracing import get_tracer
+from utils.llm_scheduler import get_scheduler
+from utils.context_cache import get_context_cache_stats
+from utils.order_queue import get_order_queue
+from utils.session_pool import get_session_pool
+from utils.session_store import get_session_store
+from utils.image_cache import get_image_cache
+from utils.gemini_client import get_api_health
+from utils.token_ledger import get_token_ledger, today
 import config
 
 # Page configuration
@@ -95,7 +104,34 @@ translations = {
         "total_orders": "📋 Total Orders",
         "avg_order": "📊 Avg Order Value",
         "top_selling": "🏆 Top Selling Items",
-        "payment_methods": "💳 Payment Methods"
+        "payment_methods": "💳 Payment Methods",
+        "chatbot_performance": "⏱️ Chatbot Performance",
+        "latency_by_operation": "⏱️ Latency by Operation (seconds)",
+        "send_latency": "📈 Gemini Response Time",
+        "export_traces": "📥 Export Traces (JSON)",
+        "clear_traces": "🗑️ Clear Traces",
+        "no_traces": "No chatbot activity recorded yet.",
+        "traces_caption": "⚠️ Spans recorded by this server since it started (most recent only)",
+        "token_usage": "🪙 Token Usage",
+        "tokens_today": "Tokens Today",
+        "tokens_per_day": "🪙 Tokens per Day",
+        "tokens_by_table": "Tokens by Table",
+        "tokens_by_session": "Tokens by Session",
+        "select_day": "Day",
+        "no_token_usage": "No token usage recorded yet.",
+        "calls": "Calls",
+        "sessions": "Sessions",
+        "token_budgets_caption": "Budgets: {session:,} tokens per session, {table:,} per table per day "
+                                 "(compact prompts from {compact:.0%}, local answers at 100%)",
+        "live_status": "Live Status",
+        "live_status_caption": "Shared services of this server process (all tables)",
+        "llm_scheduler": "Gemini request scheduler",
+        "api_health": "Gemini API health",
+        "context_cache": "Shared prompt contexts",
+        "session_pool": "Warm chat sessions",
+        "session_store": "Saved chat sessions",
+        "image_cache": "Image thumbnails",
+        "order_queue": "Order queue"
     },
     "اردو (Urdu)": {
         "admin_panel": "🔐 ایڈمن پینل",
@@ -118,7 +154,34 @@ translations = {
         "total_orders": "📋 کل آرڈرز",
         "avg_order": "📊 اوسط آرڈر ویلیو",
         "top_selling": "🏆 ٹاپ سیلنگ آئٹمز",
-        "payment_methods": "💳 ادائیگی کے طریقے"
+        "payment_methods": "💳 ادائیگی کے طریقے",
+        "chatbot_performance": "⏱️ چیٹ بوٹ کارکردگی",
+        "latency_by_operation": "⏱️ ہر عمل کا وقت (سیکنڈ)",
+        "send_latency": "📈 Gemini جواب کا وقت",
+        "export_traces": "📥 ٹریسز ایکسپورٹ کریں (JSON)",
+        "clear_traces": "🗑️ ٹریسز صاف کریں",
+        "no_traces": "ابھی تک چیٹ بوٹ کی کوئی سرگرمی ریکارڈ نہیں ہوئی۔",
+        "traces_caption": "⚠️ اس سرور کے شروع ہونے کے بعد ریکارڈ کیے گئے اسپینز (صرف تازہ ترین)",
+        "token_usage": "🪙 ٹوکن استعمال",
+        "tokens_today": "آج کے ٹوکن",
+        "tokens_per_day": "🪙 روزانہ ٹوکن",
+        "tokens_by_table": "ٹیبل کے حساب سے ٹوکن",
+        "tokens_by_session": "سیشن کے حساب سے ٹوکن",
+        "select_day": "دن",
+        "no_token_usage": "ابھی تک کوئی ٹوکن استعمال ریکارڈ نہیں ہوا۔",
+        "calls": "کالز",
+        "sessions": "سیشنز",
+        "token_budgets_caption": "بجٹ: فی سیشن {session:,} ٹوکن، فی ٹیبل روزانہ {table:,} "
+                                 "({compact:.0%} سے مختصر پرامپٹس، 100% پر مقامی جوابات)",
+        "live_status": "لائیو اسٹیٹس",
+        "live_status_caption": "اس سرور پروسیس کی مشترکہ سروسز (تمام ٹیبلز)",
+        "llm_scheduler": "جیمنی درخواست شیڈولر",
+        "api_health": "جیمنی API کی صحت",
+        "context_cache": "مشترکہ پرامپٹ سیاق",
+        "session_pool": "تیار چیٹ سیشنز",
+        "session_store": "محفوظ چیٹ سیشنز",
+        "image_cache": "تصویری تھمب نیلز",
+        "order_queue": "آرڈر قطار"
     },
     "العربية (Arabic)": {
         "admin_panel": "🔐 لوحة الإدارة",
@@ -141,7 +204,34 @@ translations = {
         "total_orders": "📋 إجمالي الطلبات",
         "avg_order": "📊 متوسط قيمة الطلب",
         "top_selling": "🏆 الأكثر مبيعاً",
-        "payment_methods": "💳 طرق الدفع"
+        "payment_methods": "💳 طرق الدفع",
+        "chatbot_performance": "⏱️ أداء المساعد",
+        "latency_by_operation": "⏱️ زمن كل عملية (ثانية)",
+        "send_latency": "📈 زمن استجابة Gemini",
+        "export_traces": "📥 تصدير التتبع (JSON)",
+        "clear_traces": "🗑️ مسح التتبع",
+        "no_traces": "لم يتم تسجيل أي نشاط للمساعد بعد.",
+        "traces_caption": "⚠️ الفترات المسجلة على هذا الخادم منذ تشغيله (الأحدث فقط)",
+        "token_usage": "🪙 استهلاك الرموز",
+        "tokens_today": "رموز اليوم",
+        "tokens_per_day": "🪙 الرموز يومياً",
+        "tokens_by_table": "الرموز حسب الطاولة",
+        "tokens_by_session": "الرموز حسب الجلسة",
+        "select_day": "اليوم",
+        "no_token_usage": "لم يتم تسجيل أي استهلاك للرموز بعد.",
+        "calls": "الاستدعاءات",
+        "sessions": "الجلسات",
+        "token_budgets_caption": "الميزانيات: {session:,} رمز لكل جلسة، {table:,} لكل طاولة يومياً "
+                                 "(مطالبات مختصرة من {compact:.0%}، وإجابات محلية عند 100%)",
+        "live_status": "الحالة المباشرة",
+        "live_status_caption": "الخدمات المشتركة لعملية هذا الخادم (جميع الطاولات)",
+        "llm_scheduler": "مجدول طلبات Gemini",
+        "api_health": "صحة واجهة Gemini",
+        "context_cache": "سياقات المطالبة المشتركة",
+        "session_pool": "جلسات المحادثة الجاهزة",
+        "session_store": "جلسات المحادثة المحفوظة",
+        "image_cache": "الصور المصغرة",
+        "order_queue": "قائمة انتظار الطلبات"
     }
 }
 
@@ -364,13 +454,14 @@ with col3:
         logout()
 
 # Main tabs
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
     t('settings'),
     t('categories'),
     t('menu_management'), 
     t('deals'), 
     t('order_history'), 
-    t('analytics')
+    t('analytics'),
+    t('chatbot_performance')
 ])
 
 # =============================================================================
@@ -939,6 +1030,141 @@ with tab6:
                     top_items.to_excel(writer, sheet_name='Top Items', index=False)
             st.download_button("📥 Download", buffer.getvalue(), f"analytics_{datetime.now().strftime('%Y%m%d')}.xlsx")
 
+# =============================================================================
+# TAB 7: CHATBOT PERFORMANCE (Latency tracing)
+# =============================================================================
+with tab7:
+    st.markdown(f'<p class="section-header">{t("chatbot_performance")}</p>', unsafe_allow_html=True)
+    st.caption(t('traces_caption'))
+    
+    tracer = get_tracer()
+    trace_summary = tracer.summary()
+    
+    if not trace_summary:
+        st.info(t('no_traces'))
+    else:
+        st.markdown(f"### {t('latency_by_operation')}")
+        st.dataframe(pd.DataFrame(trace_summary), use_container_width=True, hide_index=True)
+        
+        st.divider()
+        
+        # Response time distribution per model
+        send_spans = pd.DataFrame(tracer.get_spans("send"))
+        if not send_spans.empty:
+            fig = px.histogram(send_spans, x='duration', color='model', nbins=30,
+                              color_discrete_sequence=['#d4af37', '#f7e98e', '#b8860b', '#ffd700'],
+                              labels={'duration': 'Seconds', 'model': 'Model'})
+            fig.update_layout(
+                height=350,
+                paper_bgcolor='rgba(0,0,0,0)',
+                plot_bgcolor='rgba(0,0,0,0)',
+                font=dict(color='#ffffff', family='Inter, sans-serif'),
+                title=dict(
+                    text=f"<b>{t('send_latency')}</b>",
+                    font=dict(color='#d4af37', size=20),
+                    x=0.5,
+                    xanchor='center'
+                ),
+                xaxis=dict(tickfont=dict(color='#ffffff'), title_font=dict(color='#d4af37')),
+                yaxis=dict(tickfont=dict(color='#ffffff'), title_font=dict(color='#d4af37')),
+                legend=dict(font=dict(color='#ffffff')),
+                margin=dict(t=80, b=40, l=40, r=40)
+            )
+            st.plotly_chart(fig, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(t('export_traces'), tracer.export_json(),
+                           f"chatbot_traces_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                           mime="application/json", use_container_width=True)
+    with col2:
+        if st.button(t('clear_traces'), use_container_width=True):
+            tracer.clear()
+            st.rerun()
+    
+    st.divider()
+    
+    st.markdown(f"### {t('live_status')}")
+    st.caption(t('live_status_caption'))
+    
+    services = [
+        (t('llm_scheduler'), get_scheduler().get_status),
+        (t('api_health'), get_api_health),
+        (t('context_cache'), get_context_cache_stats),
+        (t('order_queue'), get_order_queue().get_status)
+    ]
+    # Optional services are listed only when enabled (the first lookup starts them)
+    if config.SESSION_POOL_ENABLED:
+        services.append((t('session_pool'), get_session_pool().get_status))
+    if config.SESSION_STORE_ENABLED:
+        services.append((t('session_store'), get_session_store().get_status))
+    if config.IMAGE_THUMBNAILS_ENABLED:
+        services.append((t('image_cache'), get_image_cache().get_status))
+    for name, get_status in services:
+        with st.expander(name):
+            st.json(get_status())
+    
+    st.divider()
+    
+    # Token accounting (all server processes, kept for TOKEN_USAGE_RETENTION_DAYS)
+    st.markdown(f"### {t('token_usage')}")
+    st.caption(t('token_budgets_caption').format(
+        session=config.TOKEN_BUDGET_PER_SESSION,
+        table=config.TOKEN_BUDGET_PER_TABLE_PER_DAY,
+        compact=config.TOKEN_BUDGET_COMPACT_SHARE
+    ))
+    
+    ledger = get_token_ledger()
+    daily_tokens = pd.DataFrame(ledger.daily_totals())
+    
+    if daily_tokens.empty:
+        st.info(t('no_token_usage'))
+    else:
+        today_row = daily_tokens[daily_tokens['day'] == today()]
+        tokens_today = int(today_row['prompt_tokens'].sum() + today_row['response_tokens'].sum())
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric(t('tokens_today'), f"{tokens_today:,}")
+        with col2:
+            st.metric(t('calls'), int(today_row['calls'].sum()))
+        with col3:
+            st.metric(t('sessions'), int(today_row['sessions'].sum()))
+        
+        chart_data = daily_tokens.melt(id_vars='day', value_vars=['prompt_tokens', 'response_tokens'],
+                                       var_name='Type', value_name='Tokens')
+        fig = px.bar(chart_data, x='day', y='Tokens', color='Type',
+                    color_discrete_sequence=['#d4af37', '#f7e98e'])
+        fig.update_layout(
+            height=350,
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='#ffffff', family='Inter, sans-serif'),
+            title=dict(
+                text=f"<b>{t('tokens_per_day')}</b>",
+                font=dict(color='#d4af37', size=20),
+                x=0.5,
+                xanchor='center'
+            ),
+            xaxis=dict(tickfont=dict(color='#ffffff'), title_font=dict(color='#d4af37')),
+            yaxis=dict(tickfont=dict(color='#ffffff'), title_font=dict(color='#d4af37')),
+            legend=dict(font=dict(color='#ffffff')),
+            margin=dict(t=80, b=40, l=40, r=40)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        
+        days = list(reversed(daily_tokens['day'].tolist()))
+        selected_day = st.selectbox(t('select_day'), days, key="token_usage_day")
+        day_usage = ledger.day_usage(selected_day)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown(f"**{t('tokens_by_table')}**")
+            st.dataframe(pd.DataFrame(day_usage['tables']), use_container_width=True, hide_index=True)
+        with col2:
+            st.markdown(f"**{t('tokens_by_session')}**")
+            st.dataframe(pd.DataFrame(day_usage['sessions']), use_container_width=True, hide_index=True)
+
 # Footer
 st.divider()
 st.caption(f"🔐 {t('admin_panel')} | {t('restaurant_management')}")
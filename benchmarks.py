@@ -0,0 +1,557 @@
+"""
+Offline benchmarks for the restaurant chatbot.
+Uses the fake Gemini backend by default so they run in CI without network:
+
+    python -m utils.benchmarks chat --tables 20 --turns 6
+    python -m utils.benchmarks prompt
+    python -m utils.benchmarks orders --tag-error-rate 0.2
+    python -m utils.benchmarks recall --sizes 26,260,2600
+    python -m utils.benchmarks language
+    python -m utils.benchmarks hedge --latency lognormal:1.0,0.8
+    python -m utils.benchmarks grid --sizes 20,200,2000
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# config.py sits next to this file; the pages find it the same way (run with python -m utils.benchmarks)
+sys.path.insert(0, str(Path(__file__).parent))
+
+import config
+from utils.tracing import latency_summary
+
+# Times a customer repeats an order the assistant did not pick up
+MAX_ORDER_REPEATS = 2
+
+
+def load_benchmark_menu(menu_file: Optional[str] = None):
+    """Load menu and active deals, optionally from explicit files."""
+    from utils.database import load_menu, get_active_deals
+    if menu_file:
+        with open(menu_file, 'r', encoding='utf-8') as f:
+            return json.load(f), []
+    return load_menu(), get_active_deals()
+
+
+def build_conversation(menu: Dict, table_id: int, turns: int) -> List[Dict]:
+    """Scripted turns for one table: small talk, local questions and orders."""
+    items = [item for cat_items in menu.values() for item in cat_items if item.get('available', True)]
+    conversation = []
+    for turn in range(turns):
+        item = items[(table_id * 7 + turn) % len(items)]
+        name = item['name'].get('en', '')
+        kind = turn % 3
+        if kind == 0:
+            conversation.append({"message": f"Tell me about the {name}", "expected": []})
+        elif kind == 1:
+            qty = 1 + (table_id + turn) % 3
+            conversation.append({"message": f"I want {qty} {name}", "expected": [(item['item_id'], qty)],
+                                 "repeat": f"Please add {qty} {name} to my order"})
+        else:
+            conversation.append({"message": f"How much is the {name}?", "expected": None})
+    return conversation
+
+
+# =============================================================================
+# CHAT LOAD TEST
+# =============================================================================
+
+def run_chat_benchmark(tables: int, turns: int, menu: Dict, deals: List[Dict],
+                       prompt_encoding: Optional[str] = None,
+                       order_extraction: Optional[str] = None) -> Dict:
+    """
+    Run concurrent table conversations and report latency, context size per
+    turn, order accuracy and customer messages per completed order (missed
+    orders are repeated; questions asked before an order count towards it).
+    """
+    from utils.gemini_client import RestaurantChatbot
+
+    results = {"init": [], "llm": [], "local": [], "context": [], "orders_expected": 0, "orders_correct": 0,
+               "orders_completed": 0, "order_metrics": [], "errors": 0,
+               "hedged": 0, "hedge_wins": 0, "deadline_misses": 0}
+    lock = threading.Lock()
+
+    def send(chatbot, table_id: int, message: str) -> bool:
+        local_before = chatbot.local_answers
+        start = time.perf_counter()
+        try:
+            chatbot.send_message(message)
+        except Exception as e:
+            print(f"Table {table_id} error: {e}")
+            with lock:
+                results["errors"] += 1
+            return False
+        elapsed = time.perf_counter() - start
+        with lock:
+            results["local" if chatbot.local_answers > local_before else "llm"].append(elapsed)
+        return True
+
+    def run_table(table_id: int):
+        start = time.perf_counter()
+        chatbot = RestaurantChatbot(table_id, menu, deals, prompt_encoding=prompt_encoding,
+                                    order_extraction=order_extraction)
+        with lock:
+            results["init"].append(time.perf_counter() - start)
+
+        for turn in build_conversation(menu, table_id, turns):
+            if not send(chatbot, table_id, turn["message"]) or not turn["expected"]:
+                continue
+
+            added = sorted((item["item_id"], item["quantity"]) for item in chatbot.last_order_items)
+            correct = added == sorted(turn["expected"])
+            attempts = 1
+            while not added and attempts <= MAX_ORDER_REPEATS:
+                # The customer notices nothing reached the cart and asks again
+                attempts += 1
+                if not send(chatbot, table_id, turn["repeat"]):
+                    break
+                added = sorted((item["item_id"], item["quantity"]) for item in chatbot.last_order_items)
+
+            with lock:
+                results["orders_expected"] += 1
+                results["orders_correct"] += int(correct)
+                if added == sorted(turn["expected"]):
+                    results["orders_completed"] += 1
+
+        with lock:
+            for key, count in chatbot.deadline_stats.items():
+                results[key] += count
+            results["context"].extend(chatbot.get_context_metrics())
+            results["order_metrics"].append(chatbot.get_order_metrics())
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run_table, args=(t,)) for t in range(1, tables + 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    completed = len(results["llm"]) + len(results["local"])
+    # Customer messages per order as the sessions count them (questions before an order included)
+    orders = sum(metrics["completed_orders"] for metrics in results["order_metrics"])
+    order_turns = sum(metrics["turns"] for metrics in results["order_metrics"])
+    extraction = {}
+    for metrics in results["order_metrics"]:
+        for source, count in metrics["extraction"].items():
+            extraction[source] = extraction.get(source, 0) + count
+    return {
+        "backend": config.GEMINI_BACKEND,
+        "prompt_encoding": prompt_encoding or config.PROMPT_ENCODING,
+        "order_extraction": order_extraction or config.ORDER_EXTRACTION,
+        "tables": tables,
+        "turns_per_table": turns,
+        "wall_seconds": round(wall, 3),
+        "turns_per_second": round(completed / wall, 2) if wall else 0.0,
+        "init_latency": latency_summary(results["init"]),
+        "llm_turn_latency": latency_summary(results["llm"]),
+        "local_turn_latency": latency_summary(results["local"]),
+        "context_tokens": latency_summary([turn["context_tokens"] for turn in results["context"]]),
+        "max_folded_turns": max((turn["folded_turns"] for turn in results["context"]), default=0),
+        "order_accuracy": round(results["orders_correct"] / results["orders_expected"], 3) if results["orders_expected"] else None,
+        "order_completion_rate": round(results["orders_completed"] / results["orders_expected"], 3) if results["orders_expected"] else None,
+        "turns_per_completed_order": round(order_turns / orders, 3) if orders else None,
+        "order_extraction_sources": extraction,
+        "hedged_turns": results["hedged"],
+        "hedge_wins": results["hedge_wins"],
+        "deadline_misses": results["deadline_misses"],
+        "errors": results["errors"]
+    }
+
+
+# =============================================================================
+# DEADLINES AND HEDGING
+# =============================================================================
+
+def run_hedge_benchmark(tables: int, turns: int, menu: Dict, deals: List[Dict]) -> Dict:
+    """Compare chat latency with and without hedged requests under the same turn deadline."""
+    from utils import gemini_client
+
+    results = {"latency": config.FAKE_GEMINI_LATENCY if config.GEMINI_BACKEND == "fake" else None,
+               "turn_deadline": config.LLM_TURN_DEADLINE}
+    for hedging in (False, True):
+        config.LLM_HEDGE_ENABLED = hedging
+        # Each run learns its own hedge delay
+        gemini_client._reply_latencies.clear()
+        chat = run_chat_benchmark(tables, turns, menu, deals)
+        results["hedged" if hedging else "single"] = {
+            "llm_turn_latency": chat["llm_turn_latency"],
+            "hedged_turns": chat["hedged_turns"],
+            "hedge_wins": chat["hedge_wins"],
+            "deadline_misses": chat["deadline_misses"],
+            "order_accuracy": chat["order_accuracy"]
+        }
+    results["hedge_delay"] = round(gemini_client.get_hedge_delay(), 3)
+    return results
+
+
+# =============================================================================
+# PROMPT ENCODINGS
+# =============================================================================
+
+def run_prompt_benchmark(tables: int, turns: int, menu: Dict, deals: List[Dict]) -> Dict:
+    """Compare prompt size, chat latency and tag accuracy for each prompt encoding."""
+    from utils.chat_history import estimate_tokens
+    from utils.gemini_client import PROMPT_ENCODINGS, get_system_prompt, get_available_model, genai
+
+    model_name = get_available_model()
+    results = {}
+    for encoding in PROMPT_ENCODINGS:
+        prompt = get_system_prompt(1, menu, deals, encoding)
+        counted = None
+        if model_name:
+            try:
+                counted = genai.GenerativeModel(model_name).count_tokens(prompt).total_tokens
+            except Exception as e:
+                print(f"Error counting tokens: {e}")
+
+        chat = run_chat_benchmark(tables, turns, menu, deals, prompt_encoding=encoding)
+        results[encoding] = {
+            "prompt_chars": len(prompt),
+            "prompt_tokens_estimated": estimate_tokens(prompt),
+            "prompt_tokens_counted": counted,
+            "init_latency": chat["init_latency"],
+            "llm_turn_latency": chat["llm_turn_latency"],
+            "order_accuracy": chat["order_accuracy"]
+        }
+    return results
+
+
+# =============================================================================
+# ORDER EXTRACTION
+# =============================================================================
+
+def run_orders_benchmark(tables: int, turns: int, menu: Dict, deals: List[Dict]) -> Dict:
+    """Compare order accuracy and turns per completed order for each extraction mode."""
+    from utils.gemini_client import ORDER_EXTRACTION_MODES
+
+    results = {"tag_error_rate": config.FAKE_GEMINI_TAG_ERROR_RATE if config.GEMINI_BACKEND == "fake" else None}
+    for mode in ORDER_EXTRACTION_MODES:
+        chat = run_chat_benchmark(tables, turns, menu, deals, order_extraction=mode)
+        results[mode] = {
+            "order_accuracy_first_try": chat["order_accuracy"],
+            "order_completion_rate": chat["order_completion_rate"],
+            "turns_per_completed_order": chat["turns_per_completed_order"],
+            "order_extraction_sources": chat["order_extraction_sources"],
+            "llm_turn_latency": chat["llm_turn_latency"]
+        }
+    return results
+
+
+# =============================================================================
+# MENU RETRIEVAL
+# =============================================================================
+
+# Name words used to grow the menu into distinct synthetic variants
+VARIANT_STYLES = [
+    {"en": "Classic", "ur": "کلاسک", "ar": "كلاسيك"},
+    {"en": "Spicy", "ur": "مصالحہ", "ar": "حار"},
+    {"en": "Family", "ur": "فیملی", "ar": "عائلي"},
+    {"en": "Deluxe", "ur": "ڈیلکس", "ar": "فاخر"},
+    {"en": "Mini", "ur": "منی", "ar": "صغير"},
+    {"en": "Double", "ur": "ڈبل", "ar": "مزدوج"},
+    {"en": "Special", "ur": "اسپیشل", "ar": "خاص"},
+    {"en": "Royal", "ur": "شاہی", "ar": "ملكي"},
+    {"en": "Crispy", "ur": "کرسپی", "ar": "مقرمش"},
+    {"en": "Grilled", "ur": "گرلڈ", "ar": "مشوي"}
+]
+VARIANT_ORIGINS = [
+    {"en": "Lahori", "ur": "لاہوری", "ar": "لاهوري"},
+    {"en": "Karachi", "ur": "کراچی", "ar": "كراتشي"},
+    {"en": "Peshawari", "ur": "پشاوری", "ar": "بيشاوري"},
+    {"en": "Turkish", "ur": "ترکی", "ar": "تركي"},
+    {"en": "Italian", "ur": "اطالوی", "ar": "إيطالي"},
+    {"en": "Texas", "ur": "ٹیکساس", "ar": "تكساس"},
+    {"en": "Smoky", "ur": "دھواں", "ar": "مدخن"},
+    {"en": "Garden", "ur": "گارڈن", "ar": "حديقة"},
+    {"en": "Desert", "ur": "صحرائی", "ar": "صحراوي"},
+    {"en": "Harbour", "ur": "ساحلی", "ar": "ساحلي"}
+]
+
+
+def make_synthetic_menu(menu: Dict, size: int) -> Dict:
+    """Grow a menu to about `size` items with named variants of the real items."""
+    base = [(category, item) for category, items in menu.items() for item in items if item.get('available', True)]
+    synthetic = {category: [] for category in menu}
+    for i in range(min(size, len(base) * (1 + len(VARIANT_STYLES) * len(VARIANT_ORIGINS)))):
+        category, item = base[i % len(base)]
+        variant = i // len(base)
+        if variant == 0:
+            synthetic[category].append(item)
+            continue
+        style = VARIANT_STYLES[(variant - 1) % len(VARIANT_STYLES)]
+        origin = VARIANT_ORIGINS[(variant - 1) // len(VARIANT_STYLES)]
+        synthetic[category].append({
+            **item,
+            "item_id": f"{item['item_id']}-v{variant}",
+            "name": {
+                lang: f"{style[lang]} {origin[lang]} {name}" if name else ""
+                for lang, name in item['name'].items()
+            }
+        })
+    return synthetic
+
+
+def retrieval_queries(menu: Dict) -> List[Dict]:
+    """Customer-style queries for each item name in every language."""
+    templates = {"en": "I want 2 {}", "ur": "mujhe {} chahiye", "ar": "أريد {}"}
+    queries = []
+    for items in menu.values():
+        for item in items:
+            if not item.get('available', True):
+                continue
+            for lang, name in item['name'].items():
+                if name:
+                    queries.append({"language": lang, "query": templates.get(lang, "{}").format(name),
+                                    "item_id": item['item_id']})
+    return queries
+
+
+def run_recall_benchmark(sizes: List[int], k: int, tables: int, turns: int,
+                         menu: Dict, deals: List[Dict]) -> Dict:
+    """
+    Recall@k of the menu index per language, prompt size of the full and the
+    retrieval prompt, and order tags compared with the full-menu prompt.
+    """
+    from utils.chat_history import estimate_tokens
+    from utils.gemini_client import format_relevant_items, get_restaurant_context
+    from utils.menu_index import MenuIndex
+
+    config.RETRIEVAL_TOP_K = k
+    results = {"k": k, "sizes": []}
+    for size in sizes:
+        sized_menu = make_synthetic_menu(menu, size)
+        start = time.perf_counter()
+        index = MenuIndex(sized_menu)
+        build_seconds = time.perf_counter() - start
+
+        hits, totals, search_times, injected = {}, {}, [], []
+        for query in retrieval_queries(sized_menu):
+            start = time.perf_counter()
+            found = [item for item, _ in index.search(query["query"], k)]
+            search_times.append(time.perf_counter() - start)
+            injected.append(estimate_tokens(format_relevant_items(found)))
+            lang = query["language"]
+            totals[lang] = totals.get(lang, 0) + 1
+            hits[lang] = hits.get(lang, 0) + int(any(item['item_id'] == query["item_id"] for item in found))
+
+        full_prompt = get_restaurant_context(sized_menu, deals, "compact")
+        retrieval_prompt = get_restaurant_context(sized_menu, deals, "retrieval")
+        results["sizes"].append({
+            "items": len(index.items),
+            "index_build_seconds": round(build_seconds, 4),
+            "search_latency": latency_summary(search_times),
+            "recall_at_k": {lang: round(hits[lang] / totals[lang], 3) for lang in totals},
+            "full_prompt_tokens": estimate_tokens(full_prompt),
+            "retrieval_prompt_tokens": estimate_tokens(retrieval_prompt),
+            "retrieval_rows_tokens_per_turn": round(sum(injected) / len(injected), 1) if injected else 0.0
+        })
+
+    # End-to-end: the same conversations with the full menu and with retrieved rows
+    full = run_chat_benchmark(tables, turns, menu, deals, prompt_encoding="compact")
+    retrieval = run_chat_benchmark(tables, turns, menu, deals, prompt_encoding="retrieval")
+    results["order_accuracy"] = {
+        "full_menu": full["order_accuracy"],
+        "retrieval": retrieval["order_accuracy"]
+    }
+    results["llm_turn_latency"] = {
+        "full_menu": full["llm_turn_latency"],
+        "retrieval": retrieval["llm_turn_latency"]
+    }
+    return results
+
+
+# Labeled customer messages, including short and mixed ones
+LANGUAGE_SAMPLES = {
+    "en": [
+        "I want 2 zinger burgers please", "What deals do you have today?", "Show me the menu",
+        "How much is the chicken tikka pizza?", "Can I get a karak chai?", "Is the biryani spicy?",
+        "Add one more please", "yes please", "Thank you", "What's in my cart?"
+    ],
+    "roman_ur": [
+        "mujhe 2 zinger burger chahiye", "aaj ki deals kya hain?", "menu dikhao",
+        "chicken tikka pizza kitne ka hai?", "ek karak chai de dijiye", "kya biryani mirch wali hai?",
+        "aur ek dedo", "haan theek hai", "shukriya bhai", "meri cart mein kya hai?"
+    ],
+    "ur": [
+        "مجھے دو زنگر برگر چاہیے", "آج کی ڈیلز کیا ہیں؟", "مینو دکھائیں",
+        "چکن تکہ پیزا کتنے کا ہے؟", "ایک کڑک چائے دے دیں", "کیا بریانی تیکھی ہے؟",
+        "ایک اور دے دیں", "جی ہاں ٹھیک ہے", "شکریہ", "میری کارٹ میں کیا ہے؟"
+    ],
+    "ar": [
+        "أريد اثنين زنجر برجر من فضلك", "ما هي العروض اليوم؟", "أرني القائمة",
+        "كم سعر بيتزا تكا الدجاج؟", "أريد شاي كرك", "هل البرياني حار؟",
+        "واحد آخر من فضلك", "نعم شكرا", "شكرا جزيلا", "ماذا يوجد في سلتي؟"
+    ]
+}
+
+
+def run_language_benchmark(menu: Dict, deals: List[Dict], repeats: int = 200) -> Dict:
+    """Accuracy and latency of local language detection, and prompt size per language variant."""
+    from utils.chat_history import estimate_tokens
+    from utils.gemini_client import get_restaurant_context
+    from utils.language import LANGUAGES, detect_language
+
+    confusion = {lang: {other: 0 for other in LANGUAGES} for lang in LANGUAGES}
+    timings = []
+    for expected, messages in LANGUAGE_SAMPLES.items():
+        for message in messages:
+            confusion[expected][detect_language(message)] += 1
+            for _ in range(repeats):
+                start = time.perf_counter()
+                detect_language(message)
+                # Microseconds - detection is far below latency_summary's rounding
+                timings.append((time.perf_counter() - start) * 1e6)
+
+    return {
+        "accuracy": {
+            lang: round(confusion[lang][lang] / len(messages), 3)
+            for lang, messages in LANGUAGE_SAMPLES.items()
+        },
+        "confusion": confusion,
+        "detection_latency_us": latency_summary(timings),
+        "prompt_tokens": {
+            variant or "generic": estimate_tokens(get_restaurant_context(menu, deals, language=variant or None))
+            for variant in [None] + LANGUAGES
+        }
+    }
+
+
+def make_category(menu: Dict, size: int) -> Dict:
+    """A menu with one category of `size` items (variants of the real items)."""
+    items = [item for items in make_synthetic_menu(menu, size).values() for item in items]
+    return {"Benchmark": items[:size]}
+
+
+def run_grid_benchmark(sizes: List[int], menu: Dict, repeats: int = 20) -> Dict:
+    """
+    Time to produce the menu grid's card HTML for one category per rerun:
+    built for every card (as before) and looked up from the pre-rendered cards.
+    """
+    from utils.menu_cards import MenuCards, card_html
+
+    # Thumbnails would be fetched in the background; only the card work is timed
+    config.IMAGE_THUMBNAILS_ENABLED = False
+    results = {}
+    for size in sizes:
+        category = make_category(menu, size)
+        items = category["Benchmark"]
+        item_ids = [item['item_id'] for item in items]
+
+        start = time.perf_counter()
+        cards = MenuCards(category, "en")
+        build_ms = (time.perf_counter() - start) * 1000
+
+        timings = {"uncached": [], "cached": []}
+        for _ in range(repeats):
+            start = time.perf_counter()
+            [card_html(item, "en") for item in items]
+            timings["uncached"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            [cards.html(item_id) for item_id in item_ids]
+            timings["cached"].append(time.perf_counter() - start)
+
+        results[str(len(items))] = {
+            "build_ms": round(build_ms, 2),
+            "uncached_ms": latency_summary([t * 1000 for t in timings["uncached"]]),
+            "cached_ms": latency_summary([t * 1000 for t in timings["cached"]]),
+            "html_kb": round(len(cards.grid(item_ids).encode('utf-8')) / 1024, 1)
+        }
+    return results
+
+
+# =============================================================================
+# COMMAND LINE
+# =============================================================================
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Restaurant chatbot benchmarks")
+    parser.add_argument("--backend", default="fake", choices=["fake", "google"],
+                        help="Gemini backend (default: fake, no network needed)")
+    parser.add_argument("--menu", help="Menu JSON file (default: the configured menu)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--rpm", type=float, help="Override LLM_REQUESTS_PER_MINUTE")
+    parser.add_argument("--concurrency", type=int, help="Override LLM_MAX_CONCURRENCY")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    chat = subparsers.add_parser("chat", help="Concurrent chat throughput and latency")
+    chat.add_argument("--tables", type=int, default=10)
+    chat.add_argument("--turns", type=int, default=6)
+    chat.add_argument("--encoding", help="Prompt encoding (default: PROMPT_ENCODING)")
+    chat.add_argument("--extraction", help="Order extraction (default: ORDER_EXTRACTION)")
+
+    prompt = subparsers.add_parser("prompt", help="Prompt tokens and latency per prompt encoding")
+    prompt.add_argument("--tables", type=int, default=4)
+    prompt.add_argument("--turns", type=int, default=6)
+
+    orders = subparsers.add_parser("orders", help="Turns per completed order for tags vs function calling")
+    orders.add_argument("--tables", type=int, default=4)
+    orders.add_argument("--turns", type=int, default=6)
+    orders.add_argument("--tag-error-rate", type=float, default=0.2,
+                        help="Share of fake replies with missing or malformed tags")
+
+    recall = subparsers.add_parser("recall", help="Menu retrieval recall@k against the full-menu prompt")
+    recall.add_argument("--sizes", default="26,260,2600", help="Comma-separated menu sizes (items)")
+    recall.add_argument("--k", type=int, default=config.RETRIEVAL_TOP_K)
+    recall.add_argument("--tables", type=int, default=4)
+    recall.add_argument("--turns", type=int, default=6)
+
+    language = subparsers.add_parser("language", help="Local language detection accuracy and latency")
+    language.add_argument("--repeats", type=int, default=200, help="Timed detections per sample")
+
+    hedge = subparsers.add_parser("hedge", help="Tail latency with and without hedged requests")
+    hedge.add_argument("--tables", type=int, default=4)
+    hedge.add_argument("--turns", type=int, default=30)
+    hedge.add_argument("--latency", help="Fake backend latency, e.g. lognormal:1.0,0.8")
+    hedge.add_argument("--deadline", type=float, help="Override LLM_TURN_DEADLINE (seconds)")
+
+    grid = subparsers.add_parser("grid", help="Menu grid card rendering per category size")
+    grid.add_argument("--sizes", default="20,200,2000", help="Comma-separated category sizes (items)")
+    grid.add_argument("--repeats", type=int, default=20, help="Timed renders per size")
+
+    args = parser.parse_args(argv)
+    # Must be set before gemini_client is imported
+    config.GEMINI_BACKEND = args.backend
+    # Benchmark calls are not billed to the restaurant's tables
+    config.TOKEN_USAGE_IN_MEMORY = True
+    if args.rpm:
+        config.LLM_REQUESTS_PER_MINUTE = args.rpm
+        config.LLM_BURST = max(config.LLM_BURST, int(args.rpm / 6))
+    if args.concurrency:
+        config.LLM_MAX_CONCURRENCY = args.concurrency
+
+    menu, deals = load_benchmark_menu(args.menu)
+    if args.command == "chat":
+        results = run_chat_benchmark(args.tables, args.turns, menu, deals, args.encoding, args.extraction)
+    elif args.command == "prompt":
+        results = run_prompt_benchmark(args.tables, args.turns, menu, deals)
+    elif args.command == "orders":
+        config.FAKE_GEMINI_TAG_ERROR_RATE = args.tag_error_rate
+        results = run_orders_benchmark(args.tables, args.turns, menu, deals)
+    elif args.command == "recall":
+        sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+        results = run_recall_benchmark(sizes, args.k, args.tables, args.turns, menu, deals)
+    elif args.command == "language":
+        results = run_language_benchmark(menu, deals, args.repeats)
+    elif args.command == "hedge":
+        if args.latency:
+            config.FAKE_GEMINI_LATENCY = args.latency
+        if args.deadline:
+            config.LLM_TURN_DEADLINE = args.deadline
+        results = run_hedge_benchmark(args.tables, args.turns, menu, deals)
+    elif args.command == "grid":
+        sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+        results = run_grid_benchmark(sizes, menu, args.repeats)
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Customer cart keyed by item_id.
+Adding, changing and removing items are dictionary operations that keep a
+running subtotal, deal pricing is computed once per change, and each item's
+quantity widget keeps its key unless that item was changed from outside it.
+"""
+import uuid
+from typing import Dict, Iterator, List, Optional
+from utils.deal_engine import get_deal_engine
+
+
+class Cart:
+    """Cart lines ({item_id, name, price, quantity}) in the order they were added."""
+
+    def __init__(self, items: Optional[List[Dict]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self._lines = {}  # item_id -> line
+        self._key_revisions = {}  # item_id -> revision of its quantity widget key
+        self.subtotal = 0.0
+        self.revision = 0  # bumped by every change
+        self._pricing = None  # (revision, deals version, pricing)
+        for item in items or []:
+            self.add(item['item_id'], item['name'], item['price'], item['quantity'])
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __bool__(self) -> bool:
+        return bool(self._lines)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(list(self._lines.values()))
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._lines
+
+    def get(self, item_id: str) -> Optional[Dict]:
+        return self._lines.get(item_id)
+
+    def items(self) -> List[Dict]:
+        """The cart lines (shared, not copied)."""
+        return list(self._lines.values())
+
+    def to_list(self) -> List[Dict]:
+        """Copies of the cart lines, for orders and saved sessions."""
+        return [dict(line) for line in self._lines.values()]
+
+    @classmethod
+    def from_list(cls, items: List[Dict]) -> "Cart":
+        return cls(items)
+
+    def _changed(self, item_id: str, delta: float, new_key: bool = False):
+        self.subtotal = round(self.subtotal + delta, 2)
+        self.revision += 1
+        if new_key:
+            # The quantity widget shows its own state; a new key makes it show the new quantity
+            self._key_revisions[item_id] = self._key_revisions.get(item_id, 0) + 1
+
+    def add(self, item_id: str, name: str, price: float, quantity: int = 1) -> int:
+        """Add units of an item (an item already in the cart keeps its price). Returns its quantity."""
+        line = self._lines.get(item_id)
+        if line is None:
+            line = self._lines[item_id] = {
+                "item_id": item_id,
+                "name": name,
+                "price": round(float(price), 2),
+                "quantity": 0
+            }
+        line['quantity'] += quantity
+        self._changed(item_id, line['price'] * quantity, new_key=True)
+        return line['quantity']
+
+    def set_quantity(self, item_id: str, quantity: int):
+        """Set an item's quantity from its quantity widget (0 removes it)."""
+        line = self._lines.get(item_id)
+        if line is None:
+            return
+        if quantity <= 0:
+            self.remove(item_id)
+            return
+        delta = line['price'] * (quantity - line['quantity'])
+        line['quantity'] = quantity
+        self._changed(item_id, delta)
+
+    def remove(self, item_id: str):
+        line = self._lines.pop(item_id, None)
+        if line is not None:
+            self._changed(item_id, -line['price'] * line['quantity'], new_key=True)
+
+    def remove_items(self, items: List[Dict]):
+        """Take submitted lines ({item_id, quantity}) out of the cart; units added since stay."""
+        for item in items:
+            line = self._lines.get(item['item_id'])
+            if line is None:
+                continue
+            if item['quantity'] >= line['quantity']:
+                self.remove(item['item_id'])
+                continue
+            line['quantity'] -= item['quantity']
+            self._changed(item['item_id'], -line['price'] * item['quantity'], new_key=True)
+        if not self._lines:
+            self.clear()
+
+    def clear(self):
+        for item_id in list(self._lines):
+            self.remove(item_id)
+        self.subtotal = 0.0
+        self.id = uuid.uuid4().hex[:12]
+
+    @property
+    def checkout_key(self) -> str:
+        """Same for repeated checkouts of an unchanged cart (the order's idempotency key)."""
+        return f"{self.id}-{self.revision}"
+
+    def widget_key(self, item_id: str) -> str:
+        """Key of the item's quantity widget; only changes when the item is changed elsewhere."""
+        return f"cart_qty_{item_id}_r{self._key_revisions.get(item_id, 0)}"
+
+    def pricing(self) -> Dict:
+        """{'subtotal', 'discounts', 'total'} with the current deals, computed once per change."""
+        engine = get_deal_engine()
+        version = getattr(engine, "version", None)
+        if self._pricing is None or self._pricing[:2] != (self.revision, version):
+            self._pricing = (self.revision, version, engine.price_cart(self.items()))
+        return self._pricing[2]
+
+    @property
+    def total(self) -> float:
+        return self.pricing()['total']
@@ -0,0 +1,154 @@
+"""
+Bounded conversation history for the restaurant chatbot.
+Keeps the system context plus the last few turns and folds older turns
+(especially confirmed orders) into a compact summary, so each Gemini call
+sends a context of roughly constant size.
+"""
+import re
+from typing import Dict, List, Optional
+import config
+
+ORDER_TAG_PATTERN = re.compile(r'\[ORDER:\s*([^,\]]+),\s*(\d+)\]')
+
+# Number of earlier customer requests kept in the summary
+MAX_SUMMARY_NOTES = 8
+SUMMARY_NOTE_LENGTH = 80
+
+# Characters of a locally answered reply kept in the history
+LOCAL_ANSWER_LENGTH = 300
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about 4 characters per token)."""
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
+
+
+class ConversationHistory:
+    """Keeps the system context, a rolling summary and the most recent turns."""
+
+    def __init__(self, context_message: str, max_turns: Optional[int] = None,
+                 token_budget: Optional[int] = None, prefix_tokens: int = 0):
+        self.context_message = context_message
+        # Tokens of a shared system instruction sent alongside the history
+        self.prefix_tokens = prefix_tokens
+        self.welcome = ""
+        self.max_turns = max_turns or config.CHAT_HISTORY_MAX_TURNS
+        self.token_budget = token_budget or config.CHAT_CONTEXT_TOKEN_BUDGET
+        self.turns = []  # [{"user": str, "model": str}]
+        self.summary_notes = []
+        self.confirmed_orders = {}
+        self.folded_turns = 0
+        self.metrics = []
+
+    def set_welcome(self, text: str):
+        """Store the model's greeting (the reply to the context message)."""
+        self.welcome = text
+
+    def summary(self) -> str:
+        """Compact summary of the turns that were folded out of the history."""
+        if not self.confirmed_orders and not self.summary_notes:
+            return ""
+
+        summary = "[EARLIER CONVERSATION SUMMARY]\n"
+        if self.confirmed_orders:
+            orders = ", ".join(f"{item_id} x{qty}" for item_id, qty in self.confirmed_orders.items())
+            summary += f"Items already confirmed and added to the cart (do not add again): {orders}\n"
+        if self.summary_notes:
+            summary += "Earlier customer requests: " + "; ".join(f'"{note}"' for note in self.summary_notes) + "\n"
+        return summary
+
+    def build_history(self) -> List[Dict]:
+        """Build the history for `GenerativeModel.start_chat(history=...)`."""
+        context = self.context_message
+        summary = self.summary()
+        if summary:
+            context += "\n\n" + summary
+
+        history = [{"role": "user", "parts": [context]}]
+        if self.welcome:
+            history.append({"role": "model", "parts": [self.welcome]})
+        for turn in self.turns:
+            history.append({"role": "user", "parts": [turn["user"]]})
+            history.append({"role": "model", "parts": [turn["model"]]})
+        return history
+
+    def context_tokens(self, pending_message: str = "") -> int:
+        """Estimated tokens sent when `pending_message` is added to the history."""
+        total = self.prefix_tokens + estimate_tokens(pending_message)
+        for content in self.build_history():
+            total += sum(estimate_tokens(part) for part in content["parts"])
+        return total
+
+    def add_turn(self, user_text: str, model_text: str):
+        """Record a completed exchange and enforce the turn and token limits."""
+        sent_tokens = self.context_tokens(user_text)
+        self.turns.append({"user": user_text, "model": model_text})
+        self._enforce_limits()
+
+        self.metrics.append({
+            "turn": len(self.metrics) + 1,
+            "context_tokens": sent_tokens,
+            "response_tokens": estimate_tokens(model_text),
+            "kept_turns": len(self.turns),
+            "folded_turns": self.folded_turns,
+            "summary_tokens": estimate_tokens(self.summary())
+        })
+
+    def add_local_turn(self, user_text: str, reply: str):
+        """
+        Record a question the app answered from the menu without the model,
+        so follow-ups like "add two of those" have their context.
+        """
+        note = " ".join(reply.split())
+        if len(note) > LOCAL_ANSWER_LENGTH:
+            note = note[:LOCAL_ANSWER_LENGTH] + "..."
+        self.turns.append({"user": user_text, "model": f"[Answered by the app from the menu] {note}"})
+        self._enforce_limits()
+
+    def _enforce_limits(self):
+        """Fold the oldest turns until the history fits the limits."""
+        while len(self.turns) > self.max_turns:
+            self._fold_oldest()
+        # Always keep the latest exchange so the model can follow up on it
+        while len(self.turns) > 1 and self.context_tokens() > self.token_budget:
+            self._fold_oldest()
+
+    def _fold_oldest(self):
+        """Move the oldest turn into the summary."""
+        turn = self.turns.pop(0)
+        self.folded_turns += 1
+
+        for item_id, qty in ORDER_TAG_PATTERN.findall(turn["model"]):
+            item_id = item_id.strip()
+            self.confirmed_orders[item_id] = self.confirmed_orders.get(item_id, 0) + int(qty)
+
+        note = " ".join(turn["user"].split())
+        if len(note) > SUMMARY_NOTE_LENGTH:
+            note = note[:SUMMARY_NOTE_LENGTH] + "..."
+        self.summary_notes.append(note)
+        self.summary_notes = self.summary_notes[-MAX_SUMMARY_NOTES:]
+
+    def get_metrics(self) -> List[Dict]:
+        """Context size metrics for each turn."""
+        return list(self.metrics)
+
+    def to_state(self) -> Dict:
+        """JSON-serializable conversation state (the context message is rebuilt on restore)."""
+        return {
+            "welcome": self.welcome,
+            "turns": list(self.turns),
+            "summary_notes": list(self.summary_notes),
+            "confirmed_orders": dict(self.confirmed_orders),
+            "folded_turns": self.folded_turns
+        }
+
+    def load_state(self, state: Dict):
+        """Restore a state saved with `to_state()`."""
+        self.welcome = state.get("welcome", "")
+        self.turns = list(state.get("turns", []))
+        self.summary_notes = list(state.get("summary_notes", []))
+        self.confirmed_orders = dict(state.get("confirmed_orders", {}))
+        self.folded_turns = state.get("folded_turns", 0)
+        self._enforce_limits()
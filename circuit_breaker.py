@@ -0,0 +1,154 @@
+"""
+Circuit breaker for upstream API calls.
+Opens after consecutive failures or latency spikes so callers can switch to
+local answers instantly, and probes the upstream from a background thread
+until it is healthy again.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+import config
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is attempted while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Tracks upstream health and short-circuits calls while it is unhealthy."""
+
+    def __init__(self, name: str, probe: Optional[Callable[[], bool]] = None,
+                 failure_threshold: int = None, slow_call_seconds: float = None,
+                 reset_timeout: float = None, probe_interval: float = None):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold or config.CIRCUIT_FAILURE_THRESHOLD
+        self.slow_call_seconds = slow_call_seconds or config.CIRCUIT_SLOW_CALL_SECONDS
+        self.reset_timeout = reset_timeout or config.CIRCUIT_RESET_TIMEOUT
+        self.probe_interval = probe_interval or config.CIRCUIT_PROBE_INTERVAL
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.last_latency = None
+        self.stats = {"successes": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0, "probes": 0}
+        self._lock = threading.Lock()
+        self._probe_thread = None
+
+    # -------------------------------------------------------------------------
+    # State
+    # -------------------------------------------------------------------------
+
+    def allow_request(self) -> bool:
+        """True if calls may go to the upstream."""
+        return self.state == CLOSED
+
+    def _open(self):
+        """Open the circuit (caller holds the lock)."""
+        if self.state != OPEN:
+            self.stats["opened"] += 1
+            print(f"Circuit '{self.name}' opened: {self.last_error}")
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+
+    def record_success(self, latency: float):
+        """Record a finished call; slow calls count as failures."""
+        with self._lock:
+            self.last_latency = latency
+            if latency > self.slow_call_seconds:
+                self.stats["slow_calls"] += 1
+                self.consecutive_failures += 1
+                self.last_error = f"slow call ({latency:.1f}s)"
+                if self.consecutive_failures >= self.failure_threshold:
+                    self._open()
+                return
+            self.stats["successes"] += 1
+            self.consecutive_failures = 0
+            self.state = CLOSED
+
+    def record_failure(self, error: Exception = None):
+        """Record a failed call."""
+        with self._lock:
+            self.stats["failures"] += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error) if error else "failure"
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Run `fn` through the breaker."""
+        if not self.allow_request():
+            self.stats["rejected"] += 1
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        start = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    # -------------------------------------------------------------------------
+    # Probing
+    # -------------------------------------------------------------------------
+
+    def probe_now(self) -> bool:
+        """Run the health probe once and update the state."""
+        if self.probe is None:
+            return self.allow_request()
+        self.stats["probes"] += 1
+        start = time.monotonic()
+        try:
+            healthy = bool(self.probe())
+            if not healthy:
+                self.last_error = "health probe failed"
+        except Exception as e:
+            healthy = False
+            self.last_error = str(e)
+
+        with self._lock:
+            if healthy:
+                self.last_latency = time.monotonic() - start
+                self.consecutive_failures = 0
+                if self.state != CLOSED:
+                    print(f"Circuit '{self.name}' closed after successful probe")
+                self.state = CLOSED
+            else:
+                self._open()
+        return healthy
+
+    def _probe_loop(self):
+        """Background loop: move an open circuit to half-open and probe it."""
+        while True:
+            time.sleep(self.probe_interval)
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                with self._lock:
+                    self.state = HALF_OPEN
+                self.probe_now()
+
+    def start_probing(self):
+        """Start the background probe thread (once per process)."""
+        with self._lock:
+            if self._probe_thread is None and self.probe is not None:
+                self._probe_thread = threading.Thread(
+                    target=self._probe_loop,
+                    name=f"{self.name}-health-probe",
+                    daemon=True
+                )
+                self._probe_thread.start()
+
+    def get_status(self) -> Dict:
+        """Snapshot of the breaker state for dashboards."""
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "last_latency": self.last_latency,
+            **self.stats
+        }
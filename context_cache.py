@@ -0,0 +1,113 @@
+"""
+Shared restaurant context for all tables.
+The menu/deals prompt is identical for every table, so it is built once per
+version and shared: through the provider's context caching when available,
+otherwise through a local stand-in that reuses one configured model object.
+"""
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+from utils.chat_history import estimate_tokens
+
+
+class SharedContext:
+    """A versioned static prefix and the model configured with it."""
+
+    def __init__(self, version: str, text: str, model: Any, provider_cached: bool = False,
+                 inline_prefix: str = "", expires_at: Optional[float] = None):
+        self.version = version
+        self.text = text
+        self.model = model
+        self.provider_cached = provider_cached
+        # Text that must still be sent in the history (models without system instructions)
+        self.inline_prefix = inline_prefix
+        self.expires_at = expires_at
+        self.tokens = estimate_tokens(text)
+        self.created_at = time.time()
+        self.sessions = 0
+
+    def is_expired(self) -> bool:
+        """True if the provider cache entry is about to expire."""
+        return self.expires_at is not None and time.time() >= self.expires_at
+
+
+def context_version(text: str) -> str:
+    """Short content hash identifying a context version."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+
+_contexts = {}
+_building = {}  # key -> Future of a context being created
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_shared_context(model_name: str, text: str,
+                       factory: Callable[[str, str, str], SharedContext],
+                       variant: str = "") -> SharedContext:
+    """
+    Get the shared context for a model and prefix text, creating it with
+    `factory(model_name, text, version)` the first time each version is seen.
+    Variants (e.g. one per language) are cached side by side. The factory
+    runs without holding the lock (it may call the provider); sessions asking
+    for the same context meanwhile wait for that one creation.
+    """
+    version = context_version(text)
+    key = (model_name, variant, version)
+    with _lock:
+        context = _contexts.get(key)
+        if context is not None and not context.is_expired():
+            _stats["hits"] += 1
+            context.sessions += 1
+            return context
+        future = _building.get(key)
+        building = future is None
+        if building:
+            _stats["misses"] += 1
+            future = _building[key] = Future()
+        else:
+            _stats["hits"] += 1
+
+    if not building:
+        context = future.result()
+        with _lock:
+            context.sessions += 1
+        return context
+
+    try:
+        context = factory(model_name, text, version)
+    except BaseException as e:
+        with _lock:
+            del _building[key]
+        future.set_exception(e)
+        raise
+    with _lock:
+        context.sessions += 1
+        # Older versions of this model's context variant are no longer needed
+        for old_key in [k for k in _contexts if k[:2] == (model_name, variant) and k != key]:
+            del _contexts[old_key]
+        _contexts[key] = context
+        del _building[key]
+    future.set_result(context)
+    return context
+
+
+def get_context_cache_stats() -> Dict:
+    """Cached context versions and hit counts for dashboards."""
+    with _lock:
+        return {
+            **_stats,
+            "contexts": [
+                {
+                    "model": model_name,
+                    "variant": variant,
+                    "version": context.version,
+                    "tokens": context.tokens,
+                    "provider_cached": context.provider_cached,
+                    "sessions": context.sessions
+                }
+                for (model_name, variant, _), context in _contexts.items()
+            ]
+        }
@@ -5,14 +5,17 @@ Uses JSON files with file locking for thread safety.
 import json
 import os
 import filelock
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
 import config
 
 # File locks for thread safety
 menu_lock = filelock.FileLock(str(config.MENU_FILE) + ".lock")
 orders_lock = filelock.FileLock(str(config.ORDERS_FILE) + ".lock")
 deals_lock = filelock.FileLock(str(config.DEALS_FILE) + ".lock")
+token_usage_lock = filelock.FileLock(str(config.TOKEN_USAGE_FILE) + ".lock")
+_usage_locks = {str(config.TOKEN_USAGE_FILE): token_usage_lock}
 
 
 # =============================================================================
@@ -53,6 +56,20 @@ def get_menu_item(item_id: str) -> Optional[Dict]:
     return None
 
 
+def get_menu_items(item_ids: List[str], available_only: bool = True) -> Dict[str, Dict]:
+    """
+    Look up several menu items with one menu load: {item_id: item}.
+    Unknown (and, by default, unavailable) IDs are left out.
+    """
+    wanted = set(item_ids)
+    found = {}
+    for items in load_menu().values():
+        for item in items:
+            if item['item_id'] in wanted and (item.get('available', True) or not available_only):
+                found[item['item_id']] = item
+    return found
+
+
 def add_menu_item(category: str, item: Dict) -> bool:
     """Add a new item to a category."""
     menu = load_menu()
@@ -97,10 +114,40 @@ def get_available_items(category: str = None) -> Dict[str, List[Dict]]:
     return result
 
 
+def get_menu_version() -> str:
+    """
+    Version of the menu, deals and categories data, based on the files'
+    modification times. Changes whenever one of the files is saved.
+    """
+    parts = []
+    for path in (config.MENU_FILE, config.DEALS_FILE, CATEGORIES_FILE):
+        try:
+            parts.append(str(os.stat(path).st_mtime_ns))
+        except OSError:
+            parts.append("0")
+    return "-".join(parts)
+
+
 # =============================================================================
 # ORDER MANAGEMENT
 # =============================================================================
 
+# Functions called with the orders created or changed by each order write
+_order_listeners = []
+
+
+def add_order_listener(listener: Callable[[List[Dict]], None]):
+    """Call `listener(orders)` after every order write in this process."""
+    _order_listeners.append(listener)
+
+
+def _notify_order_listeners(orders: List[Dict]):
+    for listener in _order_listeners:
+        try:
+            listener(orders)
+        except Exception as e:
+            print(f"Error notifying order listener: {e}")
+
 def load_orders() -> List[Dict]:
     """Load all orders from JSON file."""
     try:
@@ -134,25 +181,71 @@ def get_next_order_id() -> int:
     return max_id + 1
 
 
-def create_order(table_id: int, items: List[Dict], total_price: float) -> Dict:
-    """Create a new order with Pending status."""
-    order = {
-        "order_id": get_next_order_id(),
+def _new_order(order_id: int, table_id: int, items: List[Dict], total_price: float,
+               discounts: Optional[List[Dict]] = None) -> Dict:
+    """A new order with Pending status."""
+    return {
+        "order_id": order_id,
         "table_id": table_id,
         "items": items,
+        "subtotal": round(sum(item['price'] * item['quantity'] for item in items), 2),
+        "discounts": discounts or [],
         "total_price": round(total_price, 2),
         "status": "Pending",
         "payment_method": None,
         "timestamp": datetime.now().isoformat(),
         "paid_timestamp": None
     }
+
+
+def create_order(table_id: int, items: List[Dict], total_price: float,
+                 discounts: Optional[List[Dict]] = None) -> Dict:
+    """
+    Create a new order with Pending status.
+    `discounts` are the deals applied to the items (see DealEngine.price_cart).
+    """
+    order = _new_order(get_next_order_id(), table_id, items, total_price, discounts)
     
     orders = load_orders()
     orders.append(order)
-    save_orders(orders)
+    if save_orders(orders):
+        _notify_order_listeners([order])
     return order
 
 
+def create_orders(requests: List[Dict]) -> Optional[List[Dict]]:
+    """
+    Create several orders (dicts with table_id, items, total_price and optional
+    discounts and idempotency_key) in one locked read-modify-write.
+    A request whose idempotency_key is already saved gets the saved order
+    instead of a new one. Returns the orders, or None if they could not be saved.
+    """
+    with orders_lock:
+        orders = load_orders()
+        saved = {order['idempotency_key']: order for order in orders if order.get('idempotency_key')}
+        next_id = max((order.get('order_id', 1000) for order in orders), default=1000) + 1
+        results = []
+        created = False
+        for request in requests:
+            key = request.get('idempotency_key')
+            if key and key in saved:
+                results.append(saved[key])
+                continue
+            order = _new_order(next_id, request['table_id'], request['items'],
+                               request['total_price'], request.get('discounts'))
+            if key:
+                order['idempotency_key'] = key
+                saved[key] = order
+            next_id += 1
+            orders.append(order)
+            results.append(order)
+            created = True
+        if created and not save_orders(orders):
+            return None
+    _notify_order_listeners(results)
+    return results
+
+
 def update_order_status(order_id: int, status: str, payment_method: str = None) -> bool:
     """Update order status (e.g., mark as Paid)."""
     orders = load_orders()
@@ -162,7 +255,10 @@ def update_order_status(order_id: int, status: str, payment_method: str = None)
             if status == "Paid":
                 order['payment_method'] = payment_method
                 order['paid_timestamp'] = datetime.now().isoformat()
-            return save_orders(orders)
+            if not save_orders(orders):
+                return False
+            _notify_order_listeners([order])
+            return True
     return False
 
 
@@ -343,6 +439,84 @@ def get_next_category_order() -> int:
     return max(c.get('order', 0) for c in categories) + 1
 
 
+# =============================================================================
+# TOKEN USAGE
+# =============================================================================
+
+def _token_usage_lock(path: Path) -> filelock.FileLock:
+    """File lock of a token usage file (one per file, shared by its callers)."""
+    lock = _usage_locks.get(str(path))
+    if lock is None:
+        lock = _usage_locks.setdefault(str(path), filelock.FileLock(str(path) + ".lock"))
+    return lock
+
+
+def load_token_usage(path: Optional[Path] = None) -> Dict[str, Dict]:
+    """
+    Load chatbot token usage: {day: {"tables": {table_id: totals},
+    "sessions": {session_id: totals}}}, with day as YYYY-MM-DD.
+    `path` defaults to TOKEN_USAGE_FILE.
+    """
+    path = Path(path or config.TOKEN_USAGE_FILE)
+    try:
+        with _token_usage_lock(path):
+            if path.exists():
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+    except Exception as e:
+        print(f"Error loading token usage: {e}")
+    return {}
+
+
+def save_token_usage(usage: Dict[str, Dict], path: Optional[Path] = None) -> bool:
+    """Save chatbot token usage to JSON file."""
+    path = Path(path or config.TOKEN_USAGE_FILE)
+    try:
+        with _token_usage_lock(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(usage, f, ensure_ascii=False, indent=4)
+        return True
+    except Exception as e:
+        print(f"Error saving token usage: {e}")
+        return False
+
+
+def merge_token_usage(usage: Dict[str, Dict], entries: List[Dict]) -> Dict[str, Dict]:
+    """
+    Add token counts (dicts with day, table_id, session_id, model, prompt_tokens,
+    response_tokens, calls) to usage. Days older than the retention are dropped.
+    """
+    counters = ("prompt_tokens", "response_tokens", "calls")
+    for entry in entries:
+        day = usage.setdefault(entry['day'], {"tables": {}, "sessions": {}})
+        table = day['tables'].setdefault(str(entry['table_id']), dict.fromkeys(counters, 0))
+        session = day['sessions'].setdefault(entry['session_id'], {
+            "table_id": entry['table_id'], **dict.fromkeys(counters, 0)
+        })
+        for key in counters:
+            table[key] += entry.get(key, 0)
+            session[key] += entry.get(key, 0)
+        session['model'] = entry.get('model') or session.get('model')
+        session['last_seen'] = entry.get('last_seen') or datetime.now().isoformat()
+
+    cutoff = (datetime.now() - timedelta(days=config.TOKEN_USAGE_RETENTION_DAYS)).date().isoformat()
+    return {day: data for day, data in usage.items() if day >= cutoff}
+
+
+def add_token_usage(entries: List[Dict], path: Optional[Path] = None) -> Optional[Dict[str, Dict]]:
+    """
+    Add token counts to the usage file in one locked read-modify-write, so
+    several server processes can share the file.
+    Returns the updated usage, or None if it could not be saved.
+    """
+    path = Path(path or config.TOKEN_USAGE_FILE)
+    with _token_usage_lock(path):
+        usage = merge_token_usage(load_token_usage(path), entries)
+        if not save_token_usage(usage, path):
+            return None
+    return usage
+
+
 # =============================================================================
 # ORDER SEARCH
 # =============================================================================
@@ -0,0 +1,115 @@
+"""
+Deal expansion and cart pricing.
+Each active deal's line items and discounted prices are worked out once per
+menu/deals version. Carts are priced in one pass that applies the best
+eligible deals, so "Order Full Deal" only has to add regular menu items.
+"""
+from typing import Dict, List, Optional
+from utils.database import load_menu, get_active_deals, get_menu_version
+from utils.versioned_cache import VersionedCache
+
+
+class DealEngine:
+    """Active deals of one menu/deals version, expanded to menu items."""
+
+    def __init__(self, menu: Dict, deals: List[Dict]):
+        items = {item['item_id']: item for category in menu.values() for item in category}
+        self.deals = {}
+        for deal in deals:
+            if not deal.get('active', False):
+                continue
+            percent = deal.get('discount_percent', 0)
+            lines = []
+            for item_id in deal.get('applicable_items', []):
+                item = items.get(item_id)
+                if item and item.get('available', True):
+                    lines.append({
+                        "item_id": item_id,
+                        "name": item['name'].get('en', 'Item'),
+                        "price": round(float(item['price']), 2),
+                        "quantity": 1
+                    })
+            price = sum(line['price'] for line in lines)
+            self.deals[deal['deal_id']] = {
+                "deal_id": deal['deal_id'],
+                "name": deal.get('name', {}).get('en', 'Special Deal'),
+                "percent": percent,
+                "min_items": deal.get('min_items', 1),
+                "item_ids": set(deal.get('applicable_items', [])),
+                "lines": lines,
+                "price": round(price, 2),
+                "deal_price": round(price * (1 - percent / 100), 2)
+            }
+
+    def expand(self, deal_id: str) -> List[Dict]:
+        """Cart lines of the deal's available items (one of each, at menu price)."""
+        deal = self.deals.get(deal_id)
+        return [dict(line) for line in deal['lines']] if deal else []
+
+    def deal_price(self, deal_id: str) -> Optional[Dict]:
+        """{'price', 'deal_price'} of the full deal, or None for unknown deals."""
+        deal = self.deals.get(deal_id)
+        if deal is None:
+            return None
+        return {"price": deal['price'], "deal_price": deal['deal_price']}
+
+    def price_cart(self, cart_items: List[Dict]) -> Dict:
+        """
+        Price a cart: {'subtotal', 'discounts', 'total'}.
+        Deals are applied best saving first; each unit counts towards at most
+        one deal and a deal needs at least `min_items` units of its items.
+        """
+        subtotal = round(sum(item['price'] * item['quantity'] for item in cart_items), 2)
+        remaining = [item['quantity'] for item in cart_items]
+
+        def claim(deal):
+            """Units of the cart still free for a deal: [(line index, quantity)]."""
+            return [(i, remaining[i]) for i, item in enumerate(cart_items)
+                    if remaining[i] and item['item_id'] in deal['item_ids']]
+
+        def saving(deal, units):
+            return sum(cart_items[i]['price'] * qty for i, qty in units) * deal['percent'] / 100
+
+        candidates = []
+        for deal in self.deals.values():
+            units = claim(deal)
+            if deal['percent'] > 0 and sum(qty for _, qty in units) >= deal['min_items']:
+                candidates.append((saving(deal, units), deal))
+        candidates.sort(key=lambda pair: pair[0], reverse=True)
+
+        discounts = []
+        for _, deal in candidates:
+            # Earlier deals may have taken some of the units
+            units = claim(deal)
+            if sum(qty for _, qty in units) < deal['min_items']:
+                continue
+            amount = round(saving(deal, units), 2)
+            items = {}
+            for i, qty in units:
+                remaining[i] = 0
+                items[cart_items[i]['item_id']] = items.get(cart_items[i]['item_id'], 0) + qty
+            discounts.append({
+                "deal_id": deal['deal_id'],
+                "name": deal['name'],
+                "percent": deal['percent'],
+                "amount": amount,
+                "items": items
+            })
+
+        total = round(subtotal - sum(d['amount'] for d in discounts), 2)
+        return {"subtotal": subtotal, "discounts": discounts, "total": total}
+
+
+_engines = VersionedCache(4)
+
+
+def get_deal_engine() -> DealEngine:
+    """Get the deal engine for the current menu/deals version, built once per version."""
+    version = get_menu_version()
+
+    def build() -> DealEngine:
+        engine = DealEngine(load_menu(), get_active_deals())
+        engine.version = version
+        return engine
+
+    return _engines.get(version, build)
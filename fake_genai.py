@@ -0,0 +1,346 @@
+"""
+Local stand-in for the subset of google.generativeai used by gemini_client.
+Select it with GEMINI_BACKEND=fake to load test the chat path without network
+access. Latency, error rate and scripted replies are configurable in config.py;
+replies to ordering messages call the add_to_order tool when it is provided,
+otherwise they include [ORDER: item_id, quantity] tags.
+"""
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+import config
+
+DEFAULT_MODELS = ["gemini-1.5-flash", "gemini-1.5-pro"]
+
+# Verbose prompt menu lines: "- Zinger Burger (ID: ff01) - 25 SAR"
+MENU_LINE_PATTERN = re.compile(r"^- (.+?) \(ID: ([^)]+)\)", re.MULTILINE)
+# Compact prompt menu rows: "ff01|Zinger Burger|25"
+COMPACT_LINE_PATTERN = re.compile(r"^([\w-]+)\|([^|\n]+)\|\d+(?:\.\d+)?\s*$", re.MULTILINE)
+
+ORDER_WORDS = ["want", "order", "add", "have", "get", "give", "bring", "chahiye", "أريد", "اريد", "چاہیے"]
+NUMBER_WORDS = {"one": 1, "a": 1, "an": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6}
+
+_rng = random.Random(config.FAKE_GEMINI_SEED)
+_rng_lock = threading.Lock()
+_settings = {"api_key": None}
+_script = None
+
+
+class FakeAPIError(Exception):
+    """Simulated API error with an HTTP status `code` (e.g. 429 or 503)."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+def configure(api_key: str = None, **kwargs):
+    """Accept the same arguments as genai.configure."""
+    _settings["api_key"] = api_key
+    _settings.update(kwargs)
+
+
+def _random() -> float:
+    with _rng_lock:
+        return _rng.random()
+
+
+def sample_latency(spec: str = None) -> float:
+    """
+    Sample a latency in seconds from a distribution spec:
+    'constant:1.0', 'uniform:0.5,2.0' or 'lognormal:median,sigma'.
+    """
+    spec = spec or config.FAKE_GEMINI_LATENCY
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()]
+    with _rng_lock:
+        if kind == "constant":
+            return values[0]
+        if kind == "uniform":
+            return _rng.uniform(values[0], values[1])
+        if kind == "lognormal":
+            return values[0] * math.exp(values[1] * _rng.gauss(0, 1))
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _maybe_fail():
+    """Raise a simulated rate limit or server error at the configured rate."""
+    if _random() < config.FAKE_GEMINI_ERROR_RATE:
+        code = config.FAKE_GEMINI_ERROR_CODES[int(_random() * len(config.FAKE_GEMINI_ERROR_CODES))]
+        message = "Resource has been exhausted" if code == 429 else "Service Unavailable"
+        raise FakeAPIError(code, message)
+
+
+def _load_script() -> List[Dict]:
+    """Load scripted replies: [{"match": regex, "reply": text}, ...]."""
+    global _script
+    if _script is None:
+        _script = []
+        if config.FAKE_GEMINI_SCRIPT:
+            try:
+                with open(config.FAKE_GEMINI_SCRIPT, 'r', encoding='utf-8') as f:
+                    _script = json.load(f)
+            except Exception as e:
+                print(f"Error loading fake Gemini script: {e}")
+    return _script
+
+
+# =============================================================================
+# RESPONSE OBJECTS
+# =============================================================================
+
+class FunctionCall:
+    """A function call requested by the model."""
+
+    def __init__(self, name: str, args: Dict):
+        self.name = name
+        self.args = args
+
+
+class Part:
+    """A text or function call part of a message."""
+
+    def __init__(self, text: str = "", function_call: Optional[FunctionCall] = None):
+        self.text = text
+        self.function_call = function_call
+
+
+class Content:
+    """A message in the chat history."""
+
+    def __init__(self, role: str, parts: List[Part]):
+        self.role = role
+        self.parts = parts
+
+
+class Candidate:
+    """A generated candidate."""
+
+    def __init__(self, content: Content):
+        self.content = content
+        self.finish_reason = 1
+
+
+class UsageMetadata:
+    """Token counts reported with a response."""
+
+    def __init__(self, prompt_tokens: int, response_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = response_tokens
+        self.total_token_count = prompt_tokens + response_tokens
+
+
+class GenerateContentResponse:
+    """Response with `.text`, `.parts`, `.candidates` and streaming iteration."""
+
+    def __init__(self, parts: List[Part], prompt_tokens: int, latency: float, stream: bool):
+        self._parts = parts
+        self._latency = latency
+        self._stream = stream
+        self._resolved = not stream
+        text = "".join(part.text for part in parts)
+        self.usage_metadata = UsageMetadata(prompt_tokens, _count_tokens(text))
+
+    @property
+    def parts(self) -> List[Part]:
+        return self._parts
+
+    @property
+    def candidates(self) -> List[Candidate]:
+        return [Candidate(Content("model", self._parts))]
+
+    @property
+    def text(self) -> str:
+        texts = [part.text for part in self._parts if part.text]
+        if not texts:
+            raise ValueError("The response does not contain text (only function calls).")
+        return "".join(texts)
+
+    def __iter__(self):
+        """Yield chunks, spreading the remaining latency after the first token."""
+        if not self._stream:
+            yield self
+            return
+        text = "".join(part.text for part in self._parts)
+        words = text.split(" ")
+        chunk_size = max(1, len(words) // 4)
+        chunks = [" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size)] or [""]
+        rest = self._latency * (1 - config.FAKE_GEMINI_TTFT_FRACTION)
+        for i, chunk in enumerate(chunks):
+            if i > 0:
+                time.sleep(rest / max(1, len(chunks) - 1))
+                chunk = " " + chunk
+            parts = [Part(chunk)]
+            if i == len(chunks) - 1:
+                parts += [part for part in self._parts if part.function_call]
+            yield GenerateContentResponse(parts, 0, 0, stream=False)
+        self._resolved = True
+
+    def resolve(self):
+        """Consume a streamed response."""
+        if not self._resolved:
+            for _ in self:
+                pass
+
+
+# =============================================================================
+# MODELS
+# =============================================================================
+
+class ModelInfo:
+    """Entry returned by list_models()."""
+
+    def __init__(self, name: str):
+        self.name = f"models/{name}"
+        self.supported_generation_methods = ["generateContent", "countTokens"]
+
+
+def list_models(**kwargs):
+    """List the fake models."""
+    time.sleep(sample_latency("constant:0.01"))
+    _maybe_fail()
+    for name in DEFAULT_MODELS:
+        yield ModelInfo(name)
+
+
+def get_model(name: str) -> ModelInfo:
+    """Get a fake model by name."""
+    return ModelInfo(name.replace("models/", ""))
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+def _content_text(content) -> str:
+    """Text of a str, dict or Content message."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, dict):
+        return "".join(str(part) for part in content.get("parts", []))
+    if isinstance(content, list):
+        return "".join(_content_text(c) for c in content)
+    return "".join(getattr(part, "text", "") or "" for part in getattr(content, "parts", []))
+
+
+def parse_menu(text: str) -> Dict[str, str]:
+    """Extract {item name (lowercase): item_id} from a system prompt."""
+    rows = [(item_id, name) for name, item_id in MENU_LINE_PATTERN.findall(text)]
+    rows += COMPACT_LINE_PATTERN.findall(text)
+    menu = {}
+    for item_id, names in rows:
+        # Localized prompts list "English / local" names
+        for name in names.split(" / "):
+            if name.strip():
+                menu[name.strip().lower()] = item_id.strip()
+    return menu
+
+
+def _quantity_before(message: str, position: int) -> int:
+    """Quantity written just before an item name ("2 zinger", "two pizzas")."""
+    words = message[:position].split()
+    if words:
+        last = words[-1].lower()
+        if last.isdigit():
+            return max(1, int(last))
+        if last in NUMBER_WORDS:
+            return NUMBER_WORDS[last]
+    return 1
+
+
+class GenerativeModel:
+    """Fake model producing scripted or rule-based replies."""
+
+    def __init__(self, model_name: str = "gemini-1.5-flash", system_instruction=None,
+                 tools=None, generation_config=None, safety_settings=None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = _content_text(system_instruction) if system_instruction else ""
+        self.tools = tools
+
+    def start_chat(self, history: Optional[List] = None, **kwargs) -> "ChatSession":
+        return ChatSession(self, history or [])
+
+    def count_tokens(self, contents):
+        class TokenCount:
+            pass
+        result = TokenCount()
+        result.total_tokens = _count_tokens(self.system_instruction + _content_text(contents))
+        return result
+
+    def generate_content(self, contents, stream: bool = False, tools=None, **kwargs) -> GenerateContentResponse:
+        return self._generate(self.system_instruction + _content_text(contents), _content_text(contents), stream,
+                              tools or self.tools)
+
+    def _generate(self, context: str, message: str, stream: bool, tools=None) -> GenerateContentResponse:
+        """Simulate latency and errors, then build the reply."""
+        prompt_tokens = _count_tokens(context + message)
+        latency = sample_latency() + prompt_tokens / 1000.0 * config.FAKE_GEMINI_SECONDS_PER_1K_PROMPT_TOKENS
+        _maybe_fail()
+        # Streaming returns after the first token; the rest arrives while iterating
+        time.sleep(latency * config.FAKE_GEMINI_TTFT_FRACTION if stream else latency)
+        parts = self._reply(context, message, tools)
+        return GenerateContentResponse(parts, prompt_tokens, latency, stream)
+
+    def _reply(self, context: str, message: str, tools=None) -> List[Part]:
+        """Scripted reply if one matches, otherwise a rule-based one."""
+        for entry in _load_script():
+            if re.search(entry["match"], message, re.IGNORECASE):
+                return [Part(entry["reply"])]
+
+        if "greet the customer" in message.lower():
+            return [Part("Hey there! Welcome to our restaurant! 🎉 What would you like to order today? "
+                         "We have Fast Food, Pizza, Meat & BBQ, Tea and Ice Cream.")]
+
+        menu = parse_menu(context + "\n" + self.system_instruction)
+        # Only the customer's own words count, not menu rows or item details added by the client
+        message = re.sub(r"\[Relevant menu items\].*?\[/Relevant menu items\]", "", message, flags=re.DOTALL)
+        message = re.sub(r"\[Item details:.*?\]", "", message, flags=re.DOTALL)
+        message = re.sub(r"\[Not added to the cart:.*?\]", "", message, flags=re.DOTALL)
+        lower = message.lower()
+        orders = []
+        for name in sorted(menu, key=len, reverse=True):
+            position = lower.find(name)
+            if position >= 0:
+                orders.append((menu[name], _quantity_before(lower, position)))
+                lower = lower.replace(name, " ")
+
+        if orders and any(word in message.lower() for word in ORDER_WORDS):
+            if tools and "add_to_order" in str(tools):
+                items = [{"item_id": item_id, "quantity": qty} for item_id, qty in orders]
+                return [Part(function_call=FunctionCall("add_to_order", {"items": items}))]
+            if _random() < config.FAKE_GEMINI_TAG_ERROR_RATE:
+                # Forgotten or malformed tags, as real models sometimes produce
+                tags = "" if _random() < 0.5 else " ".join(f"[ORDER {item_id} x{qty}]" for item_id, qty in orders)
+            else:
+                tags = " ".join(f"[ORDER: {item_id}, {qty}]" for item_id, qty in orders)
+            return [Part(f"Great choice! I've added that to your order. 😊 {tags}".strip())]
+        if orders:
+            return [Part("That's one of our favourites! Would you like me to add it to your order? 😊")]
+        return [Part("I'd be happy to help! Tell me what you'd like to eat or drink. 🍽️")]
+
+
+class ChatSession:
+    """Fake chat session keeping history like genai.ChatSession."""
+
+    def __init__(self, model: GenerativeModel, history: List):
+        self.model = model
+        self.history = [
+            h if isinstance(h, Content) else Content(h["role"], [Part(str(p)) for p in h.get("parts", [])])
+            for h in history
+        ]
+
+    def send_message(self, content, stream: bool = False, tools=None, **kwargs) -> GenerateContentResponse:
+        message = _content_text(content)
+        context = "\n".join(_content_text(h) for h in self.history)
+        response = self.model._generate(context + "\n" + message, message, stream, tools or self.model.tools)
+        self.history.append(Content("user", [Part(message)]))
+        self.history.append(Content("model", response.parts))
+        return response
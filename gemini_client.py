@@ -1,20 +1,94 @@
 """
 Google Gemini API client for the multilingual restaurant chatbot.
 Handles conversation management and language detection.
+Common questions are answered locally by the intent engine before any API call.
 Includes fallback mode when API is unavailable.
 """
-import google.generativeai as genai
-from typing import List, Dict, Optional
+import datetime
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Dict, Optional, Tuple
 import config
+from utils.chat_history import ConversationHistory, ORDER_TAG_PATTERN, estimate_tokens
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.context_cache import SharedContext, get_shared_context
+from utils.database import get_orders_by_table
+from utils.intent_engine import answer_locally, answer_intent, answer_offline, find_items
+from utils.language import LANGUAGE_NAMES, detect_language, menu_language
+from utils.llm_scheduler import get_scheduler, is_retryable, SchedulerTimeout
+from utils.menu_index import get_menu_index
+from utils.token_ledger import get_token_ledger
+from utils.tracing import get_tracer, percentile
+
+if config.GEMINI_BACKEND == "fake":
+    # Offline stand-in for load testing
+    from utils import fake_genai as genai
+else:
+    import google.generativeai as genai
 
 # Configure Gemini API
 genai.configure(api_key=config.GEMINI_API_KEY)
 
+# Seconds between attempts to set up a chat that failed to initialize
+REINITIALIZE_INTERVAL = 60
+
+# Older models without system instruction support get the context in the history
+MODELS_WITHOUT_SYSTEM_INSTRUCTION = ['gemini-pro', 'gemini-1.0-pro']
+
+
+def _probe_api() -> bool:
+    """Cheap health check - lists models instead of generating content."""
+    return any(True for _ in genai.list_models())
+
+
+# Shared by all sessions so one unhealthy upstream is detected once
+gemini_breaker = CircuitBreaker("gemini", probe=_probe_api)
+
+# Threads running chat attempts (they mostly wait for the scheduler or the API)
+_turn_executor = ThreadPoolExecutor(max_workers=max(8, config.NUMBER_OF_TABLES * 2),
+                                    thread_name_prefix="chat-turn")
+
+# Recent reply times of all sessions, for the hedge delay
+_reply_latencies = deque(maxlen=500)
+
+
+def get_hedge_delay() -> float:
+    """Seconds to wait for a reply before sending a hedged second request."""
+    latencies = list(_reply_latencies)
+    if len(latencies) < config.LLM_HEDGE_MIN_SAMPLES:
+        delay = config.LLM_HEDGE_DEFAULT_DELAY
+    else:
+        delay = max(config.LLM_HEDGE_MIN_DELAY, percentile(latencies, config.LLM_HEDGE_PERCENTILE))
+    # Leave the hedge at least half of the turn to answer
+    return min(delay, config.LLM_TURN_DEADLINE / 2)
 
-def get_available_model() -> Optional[str]:
+
+_discovered_model = {"name": None, "expires_at": 0.0}
+_discovery_lock = threading.Lock()
+
+
+def get_available_model(refresh: bool = False) -> Optional[str]:
+    """Get the chat model, reusing the last discovery for MODEL_DISCOVERY_TTL seconds."""
+    with _discovery_lock:
+        if not refresh and _discovered_model["name"] and time.monotonic() < _discovered_model["expires_at"]:
+            return _discovered_model["name"]
+        
+        model_name = _discover_model()
+        if model_name:
+            _discovered_model["name"] = model_name
+            _discovered_model["expires_at"] = time.monotonic() + config.MODEL_DISCOVERY_TTL
+        return model_name
+
+
+def _discover_model() -> Optional[str]:
     """Find an available Gemini model for chat."""
     try:
-        models = genai.list_models()
+        with get_tracer().span("model_discovery"):
+            models = gemini_breaker.call(lambda: list(genai.list_models()))
         # Preferred models in order
         preferred = ['gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-pro', 'gemini-1.0-pro']
         
@@ -38,34 +112,201 @@ def get_available_model() -> Optional[str]:
         return None
 
 
-def get_system_prompt(table_id: int, menu: Dict, deals: List[Dict]) -> str:
-    """Generate the system prompt for the restaurant chatbot."""
-    
-    # Format menu for the prompt
+PROMPT_ENCODINGS = ["verbose", "compact", "retrieval"]
+
+ORDER_EXTRACTION_MODES = ["function", "tags"]
+
+# Function the model calls to record confirmed items (ORDER_EXTRACTION = "function")
+ORDER_TOOL_NAME = "add_to_order"
+ORDER_TOOL = {
+    "function_declarations": [{
+        "name": ORDER_TOOL_NAME,
+        "description": "Add the items the customer has confirmed to their order.",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "items": {
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": {
+                            "item_id": {"type": "STRING", "description": "Menu item ID"},
+                            "quantity": {"type": "INTEGER", "description": "Number of portions"}
+                        },
+                        "required": ["item_id", "quantity"]
+                    }
+                }
+            },
+            "required": ["items"]
+        }
+    }]
+}
+
+# Upper limit for one item in a single request
+MAX_ITEM_QUANTITY = 20
+
+
+def _format_number(value: float) -> str:
+    """Format a price without a trailing .0."""
+    value = float(value)
+    return f"{value:.0f}" if value == int(value) else f"{value:g}"
+
+
+def _item_name(item: Dict, language: Optional[str] = None) -> str:
+    """English name, followed by the Urdu/Arabic name in localized prompts ("Zinger Burger / زنگر برگر")."""
+    name = item['name'].get('en', 'Unknown')
+    local = item['name'].get(menu_language(language), '')
+    if local and local != name:
+        return f"{name} / {local}"
+    return name
+
+
+def _description(item: Dict, language: Optional[str] = None) -> str:
+    """Description in the prompt language, falling back to English."""
+    descriptions = item.get('description', {})
+    return descriptions.get(menu_language(language)) or descriptions.get('en', '')
+
+
+def format_menu_verbose(menu: Dict, deals: List[Dict], language: Optional[str] = None) -> str:
+    """One markdown line per item, with its description."""
     menu_text = ""
     for category, items in menu.items():
         menu_text += f"\n### {category}:\n"
         for item in items:
             if item.get('available', True):
-                name = item['name'].get('en', 'Unknown')
+                name = _item_name(item, language)
                 price = item['price']
-                desc = item.get('description', {}).get('en', '')
+                desc = _description(item, language)
                 menu_text += f"- {name} (ID: {item['item_id']}) - {price} SAR"
                 if desc:
                     menu_text += f" - {desc}"
                 menu_text += "\n"
     
-    # Format deals
     deals_text = ""
     if deals:
         deals_text = "\n### Current Deals & Offers:\n"
         for deal in deals:
             if deal.get('active', False):
-                name = deal['name'].get('en', 'Special Deal')
-                desc = deal.get('description', {}).get('en', '')
+                name = _item_name({'name': deal.get('name', {'en': 'Special Deal'})}, language)
+                desc = _description(deal, language)
                 deals_text += f"- {name}: {desc}\n"
     
-    return f"""You are a warm, friendly, and enthusiastic restaurant assistant! 🌟 The customer is at Table {table_id}.
+    return menu_text + "\n" + deals_text
+
+
+def _compact_row(item: Dict, language: Optional[str] = None) -> str:
+    """One id|name|price row."""
+    return f"{item['item_id']}|{_item_name(item, language)}|{_format_number(item['price'])}"
+
+
+def _format_deals_compact(deals: List[Dict], language: Optional[str] = None) -> str:
+    """Active deals as name|% off|item ids|min items rows."""
+    menu_text = ""
+    active = [deal for deal in deals if deal.get('active', False)]
+    if active:
+        menu_text += "\nDEALS (name|% off|item ids|min items):\n"
+        for deal in active:
+            menu_text += (f"{_item_name({'name': deal.get('name', {'en': 'Special Deal'})}, language)}|"
+                          f"{deal.get('discount_percent', 0)}|"
+                          f"{','.join(deal.get('applicable_items', []))}|{deal.get('min_items', 1)}\n")
+    return menu_text
+
+
+def format_menu_compact(menu: Dict, deals: List[Dict], language: Optional[str] = None) -> str:
+    """Grouped id|name|price rows without descriptions."""
+    menu_text = f"Rows are id|name|price ({config.CURRENCY}). Descriptions are sent with the customer's message when needed.\n"
+    for category, items in menu.items():
+        rows = [_compact_row(item, language) for item in items if item.get('available', True)]
+        if rows:
+            menu_text += f"## {category}\n" + "\n".join(rows) + "\n"
+    return menu_text + _format_deals_compact(deals, language)
+
+
+def format_menu_retrieval(menu: Dict, deals: List[Dict], language: Optional[str] = None) -> str:
+    """Categories and deals only; the relevant items are sent with each message."""
+    menu_text = ("The menu is too large to list here. Each customer message is followed by the most "
+                 "relevant items as [Relevant menu items] rows (id|name|price). Only use item IDs from "
+                 "those rows or from earlier in the conversation in [ORDER:] tags; if an item is not "
+                 "listed, ask the customer to describe it or check the Quick Menu.\n\nCATEGORIES:\n")
+    for category, items in menu.items():
+        count = sum(1 for item in items if item.get('available', True))
+        if count:
+            menu_text += f"- {category} ({count} items)\n"
+    return menu_text + _format_deals_compact(deals, language)
+
+
+def format_relevant_items(items: List[Dict], language: Optional[str] = None) -> str:
+    """Compact rows of retrieved items, appended to a message in retrieval mode."""
+    if not items:
+        return ""
+    rows = "\n".join(_compact_row(item, language) for item in items)
+    return f"[Relevant menu items]\n{rows}\n[/Relevant menu items]"
+
+
+def describe_items(items: List[Dict], language: Optional[str] = None) -> str:
+    """Descriptions of the given items, appended to a message on demand."""
+    lines = [
+        f"{item['item_id']}: {_description(item, language)}"
+        for item in items if _description(item, language)
+    ]
+    if not lines:
+        return ""
+    return "[Item details: " + "; ".join(lines) + "]"
+
+
+def get_order_instructions(order_extraction: Optional[str] = None) -> str:
+    """Prompt section telling the model how to record confirmed items."""
+    if (order_extraction or config.ORDER_EXTRACTION) == "function":
+        return f"""IMPORTANT - ORDER TAKING:
+- When a customer confirms they want to order specific items, call the {ORDER_TOOL_NAME} function with the ID and quantity of every confirmed item so the system can record it.
+- Only use item IDs from the menu. Do not show the IDs to the user.
+- If you cannot call functions, add a hidden tag per item at the end of your reply instead: [ORDER: item_id, quantity]"""
+    
+    return """IMPORTANT - ORDER TAKING:
+- When a customer confirms they want to order specific items, you MUST output a special hidden tag so the system can record it.
+- Format: [ORDER: item_id, quantity]
+- Example: If they want 2 Burgers (ID: 101) and 1 Pepsi (ID: 205), output:
+  "Great choice! I've added those to your order. 🍔🥤 [ORDER: 101, 2] [ORDER: 205, 1]"
+- ALWAYS include these tags when an order is confirmed. Do not show the ID to the user in the text, just the tag at the end."""
+
+
+def get_language_instructions(language: Optional[str] = None) -> str:
+    """Prompt section on reply language; `language` is the locally detected one, if known."""
+    if language not in LANGUAGE_NAMES:
+        return """LANGUAGE HANDLING:
+- Detect the customer's language (English, Urdu/Roman Urdu, or Arabic) 
+- ALWAYS respond in the SAME language they use
+- If they write in Urdu, respond in Urdu
+- If they write in Arabic, respond in Arabic"""
+    
+    name = LANGUAGE_NAMES[language]
+    instructions = f"""LANGUAGE HANDLING:
+- The customer is writing in {name}. ALWAYS respond in {name}.
+- If they clearly switch to another language, respond in that language instead."""
+    local = {"ur": "Urdu", "ar": "Arabic"}.get(menu_language(language))
+    if local:
+        instructions += (f"\n- Menu items are listed as \"English name / {local} name\"; "
+                         f"use the {local} name when talking to the customer.")
+    return instructions
+
+
+def get_restaurant_context(menu: Dict, deals: List[Dict], encoding: Optional[str] = None,
+                           order_extraction: Optional[str] = None, language: Optional[str] = None) -> str:
+    """
+    Static system prompt shared by every table (no table-specific text).
+    With a `language`, the prompt is the variant for customers writing in it.
+    """
+    encoding = encoding or config.PROMPT_ENCODING
+    
+    # Format menu and deals for the prompt
+    if encoding == "compact":
+        menu_text = format_menu_compact(menu, deals, language)
+    elif encoding == "retrieval":
+        menu_text = format_menu_retrieval(menu, deals, language)
+    else:
+        menu_text = format_menu_verbose(menu, deals, language)
+    
+    return f"""You are a warm, friendly, and enthusiastic restaurant assistant! 🌟 Each conversation is with the customer at one table; the table number is given at the start of the conversation.
 
 YOUR PERSONALITY:
 - Be genuinely warm and welcoming - like greeting a friend!
@@ -74,11 +315,7 @@ YOUR PERSONALITY:
 - Be helpful and patient
 - Add appropriate emojis to make the chat lively 😊🍽️
 
-LANGUAGE HANDLING:
-- Detect the customer's language (English, Urdu/Roman Urdu, or Arabic) 
-- ALWAYS respond in the SAME language they use
-- If they write in Urdu, respond in Urdu
-- If they write in Arabic, respond in Arabic
+{get_language_instructions(language)}
 
 YOUR ROLE:
 - Help customers explore our menu and find dishes they'll love
@@ -86,114 +323,559 @@ YOUR ROLE:
 - Mention deals when they might benefit the customer
 - Confirm orders before finalizing
 
-IMPORTANT - ORDER TAKING:
-- When a customer confirms they want to order specific items, you MUST output a special hidden tag so the system can record it.
-- Format: [ORDER: item_id, quantity]
-- Example: If they want 2 Burgers (ID: 101) and 1 Pepsi (ID: 205), output:
-  "Great choice! I've added those to your order. 🍔🥤 [ORDER: 101, 2] [ORDER: 205, 1]"
-- ALWAYS include these tags when an order is confirmed. Do not show the ID to the user in the text, just the tag at the end.
+{get_order_instructions(order_extraction)}
 
 GREETING STYLE EXAMPLES:
-- "Hey there! Welcome to our restaurant! 🎉 So happy to have you at Table {table_id}!"
-- "Assalam o Alaikum! Table {table_id} پر خوش آمدید! 😊"
+- "Hey there! Welcome to our restaurant! 🎉 So happy to have you at Table 5!"
+- "Assalam o Alaikum! Table 5 پر خوش آمدید! 😊"
 - "!أهلاً وسهلاً 🌟"
 
 AVAILABLE MENU:
 {menu_text}
-{deals_text}
 
 Remember: Be warm, be helpful, make them feel special! 💫"""
 
 
+def get_table_context(table_id: int) -> str:
+    """Small per-table message that starts each conversation."""
+    return f"""[TABLE CONTEXT - Do not repeat this to users]
+The customer is at Table {table_id}.
+
+Now, greet the customer at Table {table_id} and ask what they would like to order. Show the main categories."""
+
+
+def get_system_prompt(table_id: int, menu: Dict, deals: List[Dict], encoding: Optional[str] = None,
+                      order_extraction: Optional[str] = None) -> str:
+    """Generate the full system prompt (shared context plus the table context)."""
+    return get_restaurant_context(menu, deals, encoding, order_extraction) + "\n\n" + get_table_context(table_id)
+
+
+def _to_python(value):
+    """Convert function call arguments (proto maps and lists) to plain Python values."""
+    if isinstance(value, (str, bytes, int, float)):
+        return value
+    if hasattr(value, "items"):
+        return {key: _to_python(val) for key, val in value.items()}
+    if hasattr(value, "__iter__"):
+        return [_to_python(val) for val in value]
+    return value
+
+
+def _response_parts(response) -> List:
+    """Parts of the first candidate (empty if the response was blocked)."""
+    try:
+        return list(response.parts)
+    except Exception:
+        return []
+
+
+def parse_response(response) -> Tuple[str, List[Tuple[str, int]], str]:
+    """
+    Split a Gemini response into display text and requested (item_id, quantity) pairs.
+    Uses add_to_order function calls when present, otherwise [ORDER:] tags in the text.
+    Returns (text, pairs, source) where source is "function", "tags" or "".
+    """
+    texts, pairs = [], []
+    for part in _response_parts(response):
+        function_call = getattr(part, "function_call", None)
+        if function_call and function_call.name == ORDER_TOOL_NAME:
+            args = _to_python(function_call.args) or {}
+            for entry in args.get("items", []):
+                if isinstance(entry, dict):
+                    pairs.append((entry.get("item_id", ""), entry.get("quantity", 1)))
+        elif getattr(part, "text", ""):
+            texts.append(part.text)
+    
+    text = "".join(texts)
+    source = "function" if pairs else ""
+    if not pairs:
+        pairs = [(item_id, qty) for item_id, qty in ORDER_TAG_PATTERN.findall(text)]
+        source = "tags" if pairs else ""
+    # Tags are never shown to the customer, even when malformed
+    text = re.sub(r'\[ORDER\b[^\]]*\]', '', text).strip()
+    return text, pairs, source
+
+
+def validate_order_items(pairs: List[Tuple[str, int]], menu_index) -> Tuple[List[Dict], List[str]]:
+    """
+    Check requested items against the menu index in one pass.
+    Returns the cart-ready items (duplicates merged) and the rejected item IDs.
+    """
+    merged = {}
+    rejected = []
+    for item_id, quantity in pairs:
+        item_id = str(item_id).strip()
+        item = menu_index.get(item_id)
+        try:
+            quantity = int(float(quantity))
+        except (TypeError, ValueError):
+            quantity = 0
+        if item is None or quantity < 1:
+            rejected.append(item_id)
+            continue
+        
+        if item_id in merged:
+            merged[item_id]["quantity"] = min(merged[item_id]["quantity"] + quantity, MAX_ITEM_QUANTITY)
+        else:
+            merged[item_id] = {
+                "item_id": item_id,
+                "name": item['name'].get('en', 'Unknown'),
+                "price": item['price'],
+                "quantity": min(quantity, MAX_ITEM_QUANTITY)
+            }
+    return list(merged.values()), rejected
+
+
+def _response_text(response) -> str:
+    """Text of a response without raising for function-call-only replies."""
+    return "".join(getattr(part, "text", "") or "" for part in _response_parts(response))
+
+
+def format_order_tags(items: List[Dict]) -> str:
+    """[ORDER:] tags for validated items (kept in the history so confirmed orders are summarized)."""
+    return " ".join(f"[ORDER: {item['item_id']}, {item['quantity']}]" for item in items)
+
+
+def _create_shared_context(model_name: str, text: str, version: str,
+                           tools: Optional[List[Dict]] = None) -> SharedContext:
+    """
+    Create the shared context, using provider context caching when possible.
+    Cached contexts must carry their `tools`; requests using them can't add any.
+    """
+    if model_name in MODELS_WITHOUT_SYSTEM_INSTRUCTION:
+        return SharedContext(version, text, genai.GenerativeModel(model_name),
+                             inline_prefix=f"[SYSTEM CONTEXT - Do not repeat this to users]\n{text}\n\n")
+    
+    caching = getattr(genai, "caching", None)
+    # Smaller contexts are rejected by the provider - don't spend a request finding out
+    if (config.USE_PROVIDER_CONTEXT_CACHE and caching is not None
+            and estimate_tokens(text) >= config.CONTEXT_CACHE_MIN_TOKENS):
+        try:
+            ttl = config.CONTEXT_CACHE_TTL
+            # Not counted by the breaker: a rejected cache entry says nothing about chat health
+            cached = caching.CachedContent.create(
+                model=f"models/{model_name}",
+                display_name=f"restaurant-context-{version}",
+                system_instruction=text,
+                tools=tools,
+                ttl=datetime.timedelta(seconds=ttl)
+            )
+            model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+            # Recreate a minute before the provider drops the cache entry
+            return SharedContext(version, text, model, provider_cached=True,
+                                 expires_at=time.time() + ttl - 60)
+        except Exception as e:
+            print(f"Context caching unavailable, using local shared context: {e}")
+    
+    return SharedContext(version, text, genai.GenerativeModel(model_name, system_instruction=text))
+
+
 class RestaurantChatbot:
     """Manages the restaurant ordering chatbot using Gemini."""
     
-    def __init__(self, table_id: int, menu: Dict, deals: List[Dict]):
+    def __init__(self, table_id: int, menu: Dict, deals: List[Dict], prompt_encoding: Optional[str] = None,
+                 order_extraction: Optional[str] = None, state: Optional[Dict] = None):
         self.table_id = table_id
         self.menu = menu
         self.deals = deals
+        self.prompt_encoding = prompt_encoding or config.PROMPT_ENCODING
+        self.order_extraction = order_extraction or config.ORDER_EXTRACTION
+        self.menu_index = get_menu_index(menu)
         self.chat = None
+        self.history = None
+        self.shared_context = None
+        # Token accounting for the budgets ("normal", "compact" or "local")
+        self.session_id = uuid.uuid4().hex[:12]
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.budget_mode = "normal"
+        # Language of the prompt variant in use (None: the generic prompt)
+        self.language = None
+        self._contexts = {}
         self.order_items = []
-        self.api_available = False
+        # Validated items from the latest reply, ready for the cart
+        self.last_order_items = []
+        self.last_rejected_ids = []
+        # Item IDs the model ordered that never reached the cart, reported on the next turn
+        self._unavailable_ids = []
+        # Customer messages needed for each order that reached the cart
+        self.order_turns = []
+        self._turns_since_order = 0
+        self.extraction_counts = {"function": 0, "tags": 0}
         self.model = None
+        self.model_name = None
+        self.local_answers = 0
+        self.deadline_stats = {"hedged": 0, "hedge_wins": 0, "deadline_misses": 0}
+        self._chat_ready = False
+        self._last_init_attempt = 0.0
+        # Conversation restored from a session store, applied once the chat is set up
+        self._saved_history = None
+        if state:
+            self._load_state(state)
+        gemini_breaker.start_probing()
         self._initialize_chat()
     
+    @property
+    def api_available(self) -> bool:
+        """True if the chat is set up and the Gemini API is currently healthy."""
+        return self._chat_ready and gemini_breaker.allow_request()
+    
     def _initialize_chat(self):
         """Initialize the chat session with system context."""
+        self._last_init_attempt = time.monotonic()
+        if not gemini_breaker.allow_request():
+            # Upstream is known to be down - don't wait for it
+            self._chat_ready = False
+            return
+        
+        tracer = get_tracer()
         try:
-            # Try to find an available model
-            model_name = get_available_model()
-            
-            if model_name:
-                self.model = genai.GenerativeModel(model_name)
-                system_prompt = get_system_prompt(self.table_id, self.menu, self.deals)
-                self.chat = self.model.start_chat(history=[])
-                # Send system context as first message
-                self.chat.send_message(f"""[SYSTEM CONTEXT - Do not repeat this to users]
-{system_prompt}
-
-Now, greet the customer at Table {self.table_id} and ask what they would like to order. Show the main categories.""")
-                self.api_available = True
-            else:
-                self.api_available = False
+            with tracer.span("init", table_id=self.table_id, restored=self._saved_history is not None) as init_span:
+                # Try to find an available model
+                model_name = get_available_model()
+                init_span.model = model_name
+                
+                if model_name:
+                    self.model_name = model_name
+                    self._contexts = {}
+                    self.shared_context = self._get_context(self.language)
+                    self.model = self.shared_context.model
+                    prefix_tokens = 0 if self.shared_context.inline_prefix else self.shared_context.tokens
+                    self.history = ConversationHistory(
+                        self.shared_context.inline_prefix + get_table_context(self.table_id),
+                        prefix_tokens=prefix_tokens
+                    )
+                    self.chat = self.model.start_chat(history=[])
+                    if self._saved_history and self._saved_history.get("welcome"):
+                        # Restored conversation - the greeting already happened
+                        self.history.load_state(self._saved_history)
+                        self._saved_history = None
+                        self._chat_ready = True
+                        return
+                    # Send the table context as first message
+                    with tracer.span("send", table_id=self.table_id, model=model_name, kind="welcome") as span:
+                        message = self.history.context_message
+                        response = self._call(lambda: self._send(message, span))
+                        span.set_sizes(message, _response_text(response), getattr(response, "usage_metadata", None),
+                                       prompt_tokens=self.history.context_tokens(message))
+                    self._record_usage(span)
+                    self.history.set_welcome(response.text)
+                    self._chat_ready = True
+                else:
+                    self._chat_ready = False
                 
         except Exception as e:
             print(f"Failed to initialize Gemini chat: {e}")
-            self.api_available = False
+            self._chat_ready = False
+    
+    def _send(self, message: str, span, chat=None, cancel: Optional[threading.Event] = None, **kwargs):
+        """
+        Send a message, streaming the reply to measure the time to first token.
+        Returns None if `cancel` is set before the reply is complete.
+        """
+        chat = chat or self.chat
+        if not config.LLM_STREAM_RESPONSES:
+            return chat.send_message(message, **kwargs)
+        response = chat.send_message(message, stream=True, **kwargs)
+        for _ in response:
+            if cancel is not None and cancel.is_set():
+                # Another attempt already answered - stop reading this one
+                return None
+            span.mark_first_token()
+        return response
+    
+    def _call(self, fn, on_wait=None, timeout: Optional[float] = None,
+              cancel: Optional[threading.Event] = None):
+        """Run a Gemini call through the circuit breaker and the shared scheduler."""
+        if not gemini_breaker.allow_request():
+            raise CircuitOpenError("Gemini API is currently unavailable")
+        return get_scheduler().submit(self.table_id, fn, on_wait=on_wait, timeout=timeout,
+                                      breaker=gemini_breaker, cancel=cancel)
     
-    def send_message(self, user_message: str) -> str:
-        """Send a message and get response from the chatbot."""
+    def _send_turn(self, message: str, span, tools: Dict, on_wait=None):
+        """
+        Send a turn within LLM_TURN_DEADLINE. When no reply has arrived after the
+        hedge delay, the same request is sent again on a second chat; the first
+        reply wins and the other attempt is cancelled. Raises SchedulerTimeout
+        when the deadline passes without a reply. The number of requests that
+        reached the API is left in span.attributes["requests_sent"].
+        """
+        deadline = time.monotonic() + config.LLM_TURN_DEADLINE
+        # Each call starts from the bounded history instead of the full transcript
+        history = self.history.build_history()
+        cancel = threading.Event()
+        sent_lock = threading.Lock()
+        span.attributes["requests_sent"] = 0
+        
+        def send(chat):
+            with sent_lock:
+                if cancel.is_set():
+                    return None
+                span.attributes["requests_sent"] += 1
+            return self._send(message, span, chat=chat, cancel=cancel, **tools)
+        
+        def stop():
+            """Cancel the other attempt; attempts still queued leave the scheduler."""
+            with sent_lock:
+                cancel.set()
+            get_scheduler().wake()
+        
+        def attempt():
+            start = time.monotonic()
+            if deadline - start <= 0:
+                return None, None, 0.0
+            chat = self.model.start_chat(history=history)
+            response = self._call(lambda: send(chat), timeout=deadline - start, cancel=cancel)
+            return chat, response, time.monotonic() - start
+        
+        attempts = [_turn_executor.submit(attempt)]
+        hedge = None
+        hedge_at = time.monotonic() + get_hedge_delay()
+        error = None
+        while time.monotonic() < deadline:
+            if on_wait is not None:
+                # Attempts run on worker threads; UI callbacks stay on this one
+                position = get_scheduler().queue_position(self.table_id)
+                if position is not None:
+                    on_wait(position)
+            done, _ = wait(attempts, timeout=min(0.25, max(0.0, deadline - time.monotonic())),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                attempts.remove(future)
+                try:
+                    chat, response, latency = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if response is None:
+                    continue
+                stop()
+                _reply_latencies.append(latency)
+                if future is hedge:
+                    self.deadline_stats["hedge_wins"] += 1
+                self.chat = chat
+                return response
+            if not attempts:
+                if isinstance(error, SchedulerTimeout):
+                    # The scheduler gave up at the deadline
+                    break
+                # Every attempt failed
+                raise error or SchedulerTimeout("No reply from Gemini")
+            if hedge is None and time.monotonic() >= hedge_at and self._can_hedge():
+                hedge = _turn_executor.submit(attempt)
+                attempts.append(hedge)
+                span.attributes["hedged"] = True
+                self.deadline_stats["hedged"] += 1
+        
+        stop()
+        # Missed deadlines count as the slowest replies for the hedge delay
+        _reply_latencies.append(config.LLM_TURN_DEADLINE)
+        self.deadline_stats["deadline_misses"] += 1
+        span.attributes["deadline_missed"] = True
+        raise SchedulerTimeout(f"No reply within the {config.LLM_TURN_DEADLINE:.0f}s turn deadline")
+    
+    @staticmethod
+    def _can_hedge() -> bool:
+        """Hedge only while the API is healthy and no other table is waiting for a slot."""
+        return (config.LLM_HEDGE_ENABLED and gemini_breaker.allow_request()
+                and get_scheduler().queue_depth() == 0)
+    
+    def send_message(self, user_message: str, cart_items: Optional[List[Dict]] = None,
+                     on_wait=None) -> str:
+        """
+        Send a message and get response from the chatbot.
+        `on_wait(position)` is called while the request is queued behind other tables.
+        Items the reply added to the order are in `last_order_items` afterwards.
+        """
+        self.last_order_items = []
+        self.last_rejected_ids = []
+        self._turns_since_order += 1
+        
+        tracer = get_tracer()
+        # Menu, price, deal, cart and status questions are answered locally
+        with tracer.span("local_answer", table_id=self.table_id, model="local") as span:
+            local_reply = answer_locally(
+                user_message, self.menu, self.deals,
+                cart_items=cart_items,
+                get_orders=lambda: get_orders_by_table(self.table_id)
+            )
+            span.attributes["answered"] = local_reply is not None
+            if local_reply is not None:
+                span.set_sizes(user_message, local_reply)
+        if local_reply is not None:
+            self.local_answers += 1
+            if self.history is not None:
+                # Follow-ups ("add two of those") go to the model, which needs this turn
+                self.history.add_local_turn(user_message, local_reply)
+            return local_reply
+        
+        if (not self._chat_ready and gemini_breaker.allow_request()
+                and time.monotonic() - self._last_init_attempt > REINITIALIZE_INTERVAL):
+            # The API has recovered since this session started
+            self._initialize_chat()
+        
         if not self.api_available:
-            return self._fallback_response(user_message)
+            return self._fallback_response(user_message, cart_items)
         
         try:
-            response = self.chat.send_message(user_message)
-            return response.text
+            if self._apply_budget() == "local":
+                # Token budget used up - no more Gemini calls for this session
+                return self._fallback_response(user_message, cart_items)
+            self._use_language(detect_language(user_message, default=self.language or "en"))
+            outgoing = self._augment_message(user_message)
+            tools = self._request_tools()
+            with tracer.span("send", table_id=self.table_id, model=self.model_name, kind="chat") as span:
+                response = self._send_turn(outgoing, span, tools, on_wait=on_wait)
+                span.set_sizes(outgoing, _response_text(response), getattr(response, "usage_metadata", None),
+                               prompt_tokens=self.history.context_tokens(outgoing))
+            self._record_usage(span)
+            with tracer.span("parse_order", table_id=self.table_id, model=self.model_name) as span:
+                reply = self._handle_response(user_message, response)
+                span.attributes["items"] = len(self.last_order_items)
+                span.attributes["rejected"] = len(self.last_rejected_ids)
+            return reply
         except Exception as e:
+            if isinstance(e, (SchedulerTimeout, CircuitOpenError)) or is_retryable(e):
+                # Upstream is overloaded - keep the customer moving with a local answer
+                return self._fallback_response(user_message, cart_items)
             return f"I apologize, but I'm having trouble processing your request. Please use the Quick Menu tab to place your order. (Error: {str(e)})"
     
-    def _fallback_response(self, user_message: str) -> str:
-        """Provide basic responses when API is unavailable."""
-        msg_lower = user_message.lower()
-        
-        if any(word in msg_lower for word in ['menu', 'food', 'order', 'eat', 'hungry']):
-            return """📋 **Our Menu Categories:**
-
-• 🍔 **Fast Food** - Burgers, Chicken, Fries
-• 🍕 **Pizza** - Pepperoni, BBQ Chicken, Veggie
-• 🥩 **Meat & BBQ** - Steaks, Ribs, Grilled Items
-• 🍵 **Tea** - Karak, Green Tea, Masala Chai
-• 🍨 **Ice Cream** - Vanilla, Chocolate, Mango
-
-Please use the **Quick Menu** tab above to browse items and place your order!"""
-        
-        elif any(word in msg_lower for word in ['deal', 'offer', 'discount', 'combo']):
-            return """🎁 **Current Deals:**
-
-• Family Feast - 20% OFF on combo orders
-• Tea Time Special - Buy 2 Teas, Get 1 Free
-• Pizza Combo - Pizza + Ice Cream at 15% OFF
-
-Check the Quick Menu for more details!"""
+    def _get_context(self, language: Optional[str]) -> SharedContext:
+        """The shared restaurant context (prompt variant) for a language, built once per session."""
+        context = self._contexts.get(language)
+        if context is not None and not context.is_expired():
+            return context
+        with get_tracer().span("prompt_build", table_id=self.table_id, model=self.model_name,
+                               language=language or "-") as span:
+            # The restaurant context is shared by all tables; only the table context is per session
+            static_context = get_restaurant_context(self.menu, self.deals, self.prompt_encoding,
+                                                    self.order_extraction, language)
+            tools = [ORDER_TOOL] if self.order_extraction == "function" else None
+            context = get_shared_context(
+                self.model_name, static_context,
+                lambda name, text, version: _create_shared_context(name, text, version, tools),
+                variant=language or ""
+            )
+            span.set_sizes(static_context)
+            span.attributes["context_version"] = context.version
+        self._contexts[language] = context
+        return context
+    
+    def _use_language(self, language: str):
+        """Switch to the prompt variant for the customer's language."""
+        if (not config.PROMPT_LANGUAGE_VARIANTS or language == self.language
+                or self.shared_context.inline_prefix):
+            # Models without system instructions carry the prompt in the history
+            return
+        self._set_context(self._get_context(language))
+        self.language = language
+    
+    def _set_context(self, context: SharedContext):
+        self.shared_context = context
+        self.model = context.model
+        self.history.prefix_tokens = context.tokens
+    
+    def _record_usage(self, span):
+        """Count a call's tokens for the session, its table and the day."""
+        self.prompt_tokens += span.prompt_tokens or 0
+        self.response_tokens += span.response_tokens or 0
+        get_token_ledger().record(self.table_id, self.session_id, span.prompt_tokens,
+                                  span.response_tokens, self.model_name)
+        losers = span.attributes.get("requests_sent", 1) - 1
+        if losers > 0:
+            # The losing request reached the API, so its prompt is billed too
+            self.prompt_tokens += (span.prompt_tokens or 0) * losers
+            get_token_ledger().record(self.table_id, self.session_id, (span.prompt_tokens or 0) * losers, 0,
+                                      self.model_name)
+    
+    def _apply_budget(self) -> str:
+        """Check the token budgets and switch the session to a cheaper mode when they run low."""
+        mode = get_token_ledger().budget_mode(self.table_id, self.prompt_tokens + self.response_tokens)
+        if mode != "normal" and self.budget_mode == "normal":
+            # Smaller prompt, history and message extras for the rest of the session
+            self.history.max_turns = min(self.history.max_turns, config.TOKEN_BUDGET_COMPACT_HISTORY_TURNS)
+            if self.prompt_encoding == "verbose" and not self.shared_context.inline_prefix:
+                self.prompt_encoding = "compact"
+                self._contexts = {}
+                self._set_context(self._get_context(self.language))
+        self.budget_mode = mode
+        return mode
+    
+    def _request_tools(self) -> Dict:
+        """Tools to send with a request (provider-cached contexts already carry them)."""
+        if self.order_extraction != "function" or self.shared_context.provider_cached:
+            return {}
+        return {"tools": [ORDER_TOOL]}
+    
+    def _handle_response(self, user_message: str, response) -> str:
+        """Extract and validate ordered items, record the turn and return the display text."""
+        text, requested, source = parse_response(response)
+        items, rejected = validate_order_items(requested, self.menu_index)
+        if rejected:
+            print(f"Table {self.table_id}: ignored unknown order items {rejected}")
+            self.report_unavailable_items(rejected)
+        if items:
+            self.extraction_counts[source] += 1
+            self.order_turns.append(self._turns_since_order)
+            self._turns_since_order = 0
+        if not text:
+            # Function calls often come without text - answer in the customer's language
+            intent = "order_added" if items else "categories"
+            language = self.language or detect_language(user_message)
+            text = answer_intent(intent, language, self.menu, self.deals, items=items)
         
-        else:
-            return f"""Welcome to our restaurant! You are at **Table {self.table_id}**.
-
-I'm currently in offline mode, but you can still order easily!
-
-👉 Use the **Quick Menu** tab to browse our menu and add items to your cart.
-
-Our categories: Fast Food, Pizza, Meat & BBQ, Tea, Ice Cream"""
+        self.history.add_turn(user_message, f"{text} {format_order_tags(items)}".strip())
+        self.last_order_items = items
+        self.last_rejected_ids = rejected
+        return text
+    
+    def report_unavailable_items(self, item_ids: List[str]):
+        """Item IDs that could not be added to the cart; the model is told with the next message."""
+        for item_id in item_ids:
+            if item_id not in self._unavailable_ids:
+                self._unavailable_ids.append(item_id)
+    
+    def _augment_message(self, user_message: str) -> str:
+        """Add the menu rows and descriptions the prompt encoding leaves out."""
+        extras = []
+        if self._unavailable_ids:
+            extras.append(f"[Not added to the cart: {', '.join(self._unavailable_ids)} - unknown or "
+                          f"unavailable item IDs. Only order IDs from the menu.]")
+            self._unavailable_ids = []
+        if self.prompt_encoding == "retrieval":
+            # Follow-ups like "yes, add two" refer to items from the previous turn
+            query = user_message
+            if self.history.turns:
+                query = self.history.turns[-1]["user"] + " " + user_message
+            relevant = [item for item, _ in self.menu_index.search(query, config.RETRIEVAL_TOP_K)]
+            extras.append(format_relevant_items(relevant, self.language))
+        if self.prompt_encoding in ("compact", "retrieval") and self.budget_mode == "normal":
+            # The compact menu has no descriptions - send them for dishes the customer mentions
+            # (left out once the session is on a token budget)
+            extras.append(describe_items(find_items(user_message, self.menu), self.language))
+        extras = [extra for extra in extras if extra]
+        if not extras:
+            return user_message
+        return user_message + "\n\n" + "\n".join(extras)
+    
+    def quick_action(self, intent: str, language: str = "en", cart_items: Optional[List[Dict]] = None,
+                     discounts: Optional[List[Dict]] = None) -> str:
+        """Answer a quick-action button (menu, categories, deals, cart, order_status) locally."""
+        orders = get_orders_by_table(self.table_id) if intent == "order_status" else None
+        self.local_answers += 1
+        return answer_intent(intent, language, self.menu, self.deals, cart_items=cart_items, orders=orders,
+                             discounts=discounts)
+    
+    def _fallback_response(self, user_message: str, cart_items: Optional[List[Dict]] = None) -> str:
+        """Answer from the menu in the customer's language when Gemini can't be used."""
+        language = detect_language(user_message, default=self.language or "en")
+        return answer_offline(user_message, self.menu, self.deals, cart_items=cart_items, language=language)
     
     def get_welcome_message(self) -> str:
         """Get the initial welcome message."""
-        if self.api_available:
-            try:
-                # The welcome was sent during initialization, get it from history
-                if self.chat.history and len(self.chat.history) >= 2:
-                    return self.chat.history[1].parts[0].text
-            except:
-                pass
+        if self.api_available and self.history and self.history.welcome:
+            # The welcome was generated during initialization
+            return self.history.welcome
         
         # Fallback welcome message - warm and friendly
         return f"""🌟 **Hey there! Welcome to our restaurant!** 🌟
@@ -212,6 +894,58 @@ I'm your friendly assistant, and I'm here to help you discover some amazing dish
 
 Just tell me what sounds good, or ask me anything! I'm here to help! ✨"""
     
+    def to_state(self) -> Dict:
+        """JSON-serializable session state for the session store."""
+        return {
+            "table_id": self.table_id,
+            "prompt_encoding": self.prompt_encoding,
+            "order_extraction": self.order_extraction,
+            "language": self.language,
+            "session_id": self.session_id,
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+            "history": self.history.to_state() if self.history else self._saved_history,
+            "local_answers": self.local_answers,
+            "order_turns": list(self.order_turns),
+            "turns_since_order": self._turns_since_order,
+            "extraction_counts": dict(self.extraction_counts)
+        }
+    
+    def _load_state(self, state: Dict):
+        """Restore counters and keep the saved conversation for `_initialize_chat`."""
+        self._saved_history = state.get("history")
+        self.language = state.get("language")
+        self.session_id = state.get("session_id", self.session_id)
+        self.prompt_tokens = state.get("prompt_tokens", 0)
+        self.response_tokens = state.get("response_tokens", 0)
+        self.local_answers = state.get("local_answers", 0)
+        self.order_turns = list(state.get("order_turns", []))
+        self._turns_since_order = state.get("turns_since_order", 0)
+        self.extraction_counts.update(state.get("extraction_counts", {}))
+    
+    @classmethod
+    def from_state(cls, state: Dict, menu: Dict, deals: List[Dict]) -> "RestaurantChatbot":
+        """Rehydrate a session saved with `to_state()` without a new greeting round trip."""
+        return cls(state["table_id"], menu, deals,
+                   prompt_encoding=state.get("prompt_encoding"),
+                   order_extraction=state.get("order_extraction"),
+                   state=state)
+    
+    def get_order_metrics(self) -> Dict:
+        """Customer messages per completed order and how the items were extracted."""
+        return {
+            "completed_orders": len(self.order_turns),
+            "turns": sum(self.order_turns),
+            "turns_per_order": round(sum(self.order_turns) / len(self.order_turns), 2) if self.order_turns else None,
+            "extraction": dict(self.extraction_counts)
+        }
+    
+    def get_context_metrics(self) -> List[Dict]:
+        """Context size sent to Gemini on each turn."""
+        if self.history is None:
+            return []
+        return self.history.get_metrics()
+    
     def parse_order_from_conversation(self, conversation: List[Dict]) -> List[Dict]:
         """Extract ordered items from the conversation (for manual parsing if needed)."""
         # This is a placeholder - in practice, we'll use structured order selection
@@ -259,23 +993,21 @@ Just tell me what sounds good, or ask me anything! I'm here to help! ✨"""
 
 
 def test_connection() -> bool:
-    """Test the Gemini API connection."""
-    try:
-        model_name = get_available_model()
-        if model_name:
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content("Say 'API Connected' in exactly 2 words.")
-            return "connected" in response.text.lower()
-        return False
-    except Exception as e:
-        print(f"Gemini API connection error: {e}")
+    """Test the Gemini API connection without spending a generation call."""
+    if not gemini_breaker.allow_request():
         return False
+    return gemini_breaker.probe_now()
+
+
+def get_api_health() -> Dict:
+    """Current circuit breaker state of the Gemini API."""
+    return gemini_breaker.get_status()
 
 
 def list_available_models() -> List[str]:
     """List all available models for debugging."""
     try:
-        models = genai.list_models()
+        models = gemini_breaker.call(lambda: list(genai.list_models()))
         return [model.name for model in models]
     except Exception as e:
         print(f"Error listing models: {e}")
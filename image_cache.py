@@ -0,0 +1,226 @@
+"""
+Local thumbnails for menu and category images.
+Each image (remote URL or admin upload) is fetched once, resized to the
+sizes the customer page shows and stored by content hash in the static
+folder, so tablets load small local files instead of the originals.
+A background thread prepares the thumbnails whenever the menu or the
+categories change.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.request
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from PIL import Image, ImageOps
+import config
+from utils.database import get_menu_version, load_categories, load_menu
+
+# Thumbnail sizes (width, height) - twice the size shown for high-density screens
+THUMBNAIL_SIZES = {
+    "category": (120, 120),
+    "menu": (600, 360)
+}
+
+DEFAULT_MENU_IMAGE = "https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=400"
+DEFAULT_CATEGORY_IMAGE = "https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=200"
+
+# Images for categories without their own image
+CATEGORY_IMAGES = {
+    "Fast Food": "https://images.unsplash.com/photo-1568901346375-23c9450c58cd?w=200",
+    "Pizza": "https://images.unsplash.com/photo-1565299624946-b28f40a0ae38?w=200",
+    "Meat & BBQ": "https://images.unsplash.com/photo-1544025162-d76694265947?w=200",
+    "Tea": "https://images.unsplash.com/photo-1571934811356-5cc061b6821f?w=200",
+    "Ice Cream": "https://images.unsplash.com/photo-1570197571499-166b36435e9f?w=200",
+    "naan": "https://images.unsplash.com/photo-1565557623262-b51c2513a641?w=200"
+}
+
+
+def category_image(category: Dict) -> str:
+    """Image of a category card (its own image or the default for its name)."""
+    return category.get('image') or CATEGORY_IMAGES.get(category['name'], DEFAULT_CATEGORY_IMAGE)
+
+
+def menu_image(item: Dict) -> str:
+    """Image of a menu item card."""
+    return item.get('image') or DEFAULT_MENU_IMAGE
+
+
+def _is_remote(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+
+class ImageCache:
+    """Thumbnails by content hash, with an index of which source has which content."""
+
+    def __init__(self, directory: Optional[Path] = None, url_prefix: Optional[str] = None):
+        self.directory = Path(directory or config.IMAGE_CACHE_DIR)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.url_prefix = url_prefix or config.IMAGE_CACHE_URL
+        self.extension = "webp" if config.IMAGE_THUMBNAIL_FORMAT.upper() == "WEBP" else "jpg"
+        self._index_file = self.directory / "index.json"
+        self._index = self._load_index()  # source -> sha256 of the original
+        self._failed = {}  # source -> time of the last failed fetch
+        self._pending = set()  # sources asked for before they were cached
+        self.version = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.fetched = 0
+        self.errors = 0
+
+    def _load_index(self) -> Dict[str, str]:
+        try:
+            if self._index_file.exists():
+                with open(self._index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading image index: {e}")
+        return {}
+
+    def _save_index(self):
+        """Write the index (caller holds the lock)."""
+        tmp = self._index_file.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self._index_file)
+
+    def _filename(self, digest: str, size: str) -> str:
+        width, height = THUMBNAIL_SIZES[size]
+        return f"{digest[:24]}_{width}x{height}.{self.extension}"
+
+    def _read(self, source: str) -> bytes:
+        """Original image bytes from a URL or a local file."""
+        if not _is_remote(source):
+            return Path(source).read_bytes()
+        request = urllib.request.Request(source, headers={"User-Agent": "restaurant-image-cache"})
+        with urllib.request.urlopen(request, timeout=config.IMAGE_FETCH_TIMEOUT) as response:
+            data = response.read(config.IMAGE_FETCH_MAX_BYTES + 1)
+        if len(data) > config.IMAGE_FETCH_MAX_BYTES:
+            raise ValueError(f"image larger than {config.IMAGE_FETCH_MAX_BYTES} bytes")
+        return data
+
+    def _write_thumbnails(self, digest: str, data: bytes):
+        """Resize an original to every thumbnail size (existing files are kept)."""
+        image = None
+        for size, dimensions in THUMBNAIL_SIZES.items():
+            path = self.directory / self._filename(digest, size)
+            if path.exists():
+                continue
+            if image is None:
+                image = ImageOps.exif_transpose(Image.open(BytesIO(data))).convert("RGB")
+            thumbnail = ImageOps.fit(image, dimensions, Image.LANCZOS)
+            tmp = path.with_suffix(".tmp")
+            thumbnail.save(tmp, format=config.IMAGE_THUMBNAIL_FORMAT, quality=config.IMAGE_THUMBNAIL_QUALITY)
+            os.replace(tmp, path)
+
+    def ingest(self, source: str) -> Optional[str]:
+        """Fetch an image once and create its thumbnails. Returns the content hash."""
+        with self._lock:
+            digest = self._index.get(source)
+            failed_at = self._failed.get(source)
+        if digest and all((self.directory / self._filename(digest, size)).exists() for size in THUMBNAIL_SIZES):
+            return digest
+        if failed_at is not None and time.time() - failed_at < config.IMAGE_RETRY_INTERVAL:
+            return None
+        try:
+            data = self._read(source)
+            digest = hashlib.sha256(data).hexdigest()
+            self._write_thumbnails(digest, data)
+        except Exception as e:
+            print(f"Error caching image {source}: {e}")
+            with self._lock:
+                self._failed[source] = time.time()
+                self.errors += 1
+            return None
+        with self._lock:
+            self._index[source] = digest
+            self._failed.pop(source, None)
+            self.fetched += 1
+            self._save_index()
+        return digest
+
+    def url(self, source: str, size: str) -> str:
+        """
+        URL to show for an image: the local thumbnail when it is ready,
+        otherwise the original (remote) source while the thumbnail is prepared.
+        """
+        if not source:
+            return source
+        with self._lock:
+            digest = self._index.get(source)
+            if digest is None:
+                self._pending.add(source)
+        if digest is None:
+            self._wake.set()
+            return source
+        return f"{self.url_prefix}/{self._filename(digest, size)}"
+
+    def warm(self, sources: Iterable[str]) -> int:
+        """Prepare thumbnails for several images. Returns how many are ready."""
+        return sum(1 for source in set(sources) if source and self.ingest(source))
+
+    def start(self):
+        """Start the background thread (once)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="image-cache", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self._refresh()
+            except Exception as e:
+                print(f"Error preparing thumbnails: {e}")
+            self._wake.wait(config.IMAGE_CACHE_REFRESH_INTERVAL)
+            self._wake.clear()
+
+    def _refresh(self):
+        """Thumbnails for all menu and category images after a change, and for images asked for since."""
+        version = get_menu_version()
+        sources = set()
+        if version != self.version:
+            sources.update(menu_image(item) for items in load_menu().values() for item in items)
+            sources.update(category_image(category) for category in load_categories())
+            sources.update((DEFAULT_MENU_IMAGE, DEFAULT_CATEGORY_IMAGE))
+            self.version = version
+        with self._lock:
+            sources |= self._pending
+            self._pending = set()
+        self.warm(sources)
+
+    def get_status(self) -> Dict:
+        """Cached images and fetch counts for dashboards."""
+        with self._lock:
+            return {
+                "images": len(self._index),
+                "fetched": self.fetched,
+                "errors": self.errors,
+                "failing": len(self._failed)
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_image_cache() -> ImageCache:
+    """Get the process-wide image cache, starting its background thread on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ImageCache()
+            _cache.start()
+        return _cache
+
+
+def thumbnail_url(source: str, size: str) -> str:
+    """URL of an image's thumbnail (or the image itself when thumbnails are off or not ready)."""
+    if not config.IMAGE_THUMBNAILS_ENABLED:
+        return source
+    return get_image_cache().url(source, size)
@@ -0,0 +1,494 @@
+"""
+Local intent router for the restaurant chatbot.
+Answers common questions (menu, categories, prices, deals, cart, order status)
+directly from the menu snapshot in English, Roman Urdu, Urdu and Arabic,
+so these turns never need a Gemini round trip.
+"""
+import re
+from typing import Callable, Dict, List, Optional
+import config
+from utils.language import detect_language
+
+
+# =============================================================================
+# KEYWORDS
+# =============================================================================
+
+# Phrases that mean the customer wants to order something - these turns
+# are left to the LLM so it can confirm the order and emit [ORDER:] tags.
+ORDER_WORDS = [
+    "want", "add", "i'll have", "ill have", "give me", "get me", "bring", "i'd like", "id like",
+    "chahiye", "chahye", "de do", "dedo", "lao", "mangwa", "laga do",
+    "چاہیے", "دے دو", "لاؤ", "منگوا",
+    "أريد", "اريد", "ابغى", "أبغى", "أبي", "ابي", "اطلب", "أطلب", "أضف", "اضف"
+]
+
+INTENT_KEYWORDS = {
+    "order_status": [
+        "order status", "status", "is my order ready", "my order ready", "been paid",
+        "order kahan", "order ka kya", "اسٹیٹس", "آرڈر کی صورتحال", "آرڈر کا کیا",
+        "حالة الطلب", "وين طلبي", "أين طلبي", "اين طلبي"
+    ],
+    "cart": [
+        "cart", "basket", "my order so far", "what did i order",
+        "mera order", "meri cart", "کارٹ", "ٹوکری", "میرا آرڈر",
+        "السلة", "سلة", "سلتي", "طلبي الحالي"
+    ],
+    "deals": [
+        "deal", "deals", "offer", "offers", "discount", "discounts", "combo", "combos",
+        "promotion", "ڈیل", "ڈیلز", "آفر", "رعایت", "عرض", "عروض", "خصم", "تخفيض"
+    ],
+    "price": [
+        "price", "prices", "cost", "how much", "rate", "kitne", "kitna", "kitni",
+        "qeemat", "keemat", "قیمت", "کتنے", "کتنا", "کتنی", "ریٹ",
+        "سعر", "أسعار", "اسعار", "بكم", "كم سعر", "ثمن", "كم ثمن"
+    ],
+    "categories": [
+        "categories", "category", "sections", "types of food", "qisam", "aqsam",
+        "زمرے", "اقسام", "الفئات", "الأقسام", "الاقسام", "أصناف", "اصناف"
+    ],
+    "menu": [
+        "menu", "dishes", "what do you have", "what do you serve", "food list",
+        "khana kya", "kya milta", "مینو", "کیا ملتا", "قائمة", "القائمة", "منيو",
+        "المنيو", "الأطباق", "الاطباق", "ماذا لديكم"
+    ]
+}
+
+# Order status keywords that mean the cart when it is named too ("cart status")
+GENERIC_STATUS_WORDS = {"status", "اسٹیٹس"}
+
+# Words that do not change what a lookup asks for ("show me the menu please").
+# Any other word left over after the intent keyword and the dishes or category
+# ("recommend", "spicy", "without onions") sends the message to the LLM.
+LOOKUP_FILLER_WORDS = {
+    "what", "whats", "what's", "which", "is", "are", "the", "a", "an", "your", "you", "do", "does",
+    "have", "has", "show", "see", "list", "tell", "me", "us", "please", "pls", "can", "could", "i",
+    "of", "for", "all", "any", "today", "now", "current", "currently", "available", "there", "some",
+    "on", "in", "at", "my", "our", "about", "let", "know", "check", "to", "this", "that", "it", "its",
+    "they", "them", "and", "how", "much", "many", "here", "ok", "okay", "hi", "hello", "full", "again",
+    "kya", "hai", "hain", "ka", "ki", "ke", "ko", "mujhe", "muje", "dikhao", "dikhayen", "dikha",
+    "batao", "bataen", "bata", "aap", "ap", "apka", "apki", "apke", "humein", "hamein", "plz", "yeh",
+    "ye", "wo", "woh", "sab", "abhi", "aaj", "koi", "mein", "par", "se", "ho",
+    "کیا", "ہے", "ہیں", "کا", "کی", "کے", "کو", "مجھے", "دکھائیں", "دکھاؤ", "بتائیں", "بتاؤ",
+    "آپ", "یہ", "وہ", "سب", "ابھی", "آج", "کوئی", "میں", "پر", "سے", "ہمیں", "براہ", "کرم",
+    "ما", "ماذا", "هي", "هو", "هل", "عندكم", "لديكم", "لديك", "عندك", "اعرض", "ارني", "اريني",
+    "من", "في", "على", "كل", "جميع", "الان", "اليوم", "لو", "سمحت", "يوجد", "فيه", "كم", "اي",
+    "ايش", "شو", "وش", "عن", "لي"
+}
+
+# Longer messages are conversations, not lookups
+MAX_LOOKUP_WORDS = 10
+
+# Localized names for the default categories; other categories still match
+# on their English name.
+CATEGORY_ALIASES = {
+    "Fast Food": ["fast food", "فاسٹ فوڈ", "وجبات سريعة", "الوجبات السريعة"],
+    "Pizza": ["pizza", "pizzas", "پیزا", "بيتزا"],
+    "Meat & BBQ": ["bbq", "barbecue", "grill", "meat", "بی بی کیو", "گوشت", "باربيكيو", "مشاوي", "لحوم"],
+    "Tea": ["tea", "teas", "chai", "chaye", "چائے", "شاي"],
+    "Ice Cream": ["ice cream", "icecream", "dessert", "آئس کریم", "آيس كريم", "ايس كريم", "حلويات"]
+}
+
+# Words shared by many dishes are ignored when matching partial item names
+GENERIC_NAME_WORDS = {
+    "pizza", "chicken", "tea", "ice", "cream", "burger", "beef", "bbq", "special",
+    "grilled", "green", "milk", "mixed", "meat", "with", "the"
+}
+
+
+# =============================================================================
+# RESPONSE TEMPLATES
+# =============================================================================
+
+TEXTS = {
+    "menu_header": {
+        "en": "📋 **Our Menu**",
+        "roman_ur": "📋 **Hamara Menu**",
+        "ur": "📋 **ہمارا مینو**",
+        "ar": "📋 **قائمة الطعام**"
+    },
+    "categories_header": {
+        "en": "🍽️ **Our Categories**",
+        "roman_ur": "🍽️ **Hamari Categories**",
+        "ur": "🍽️ **ہمارے زمرے**",
+        "ar": "🍽️ **أقسامنا**"
+    },
+    "items_count": {
+        "en": "{count} items",
+        "roman_ur": "{count} items",
+        "ur": "{count} آئٹمز",
+        "ar": "{count} أصناف"
+    },
+    "order_prompt": {
+        "en": "Just tell me what you'd like and I'll add it to your order! 😊",
+        "roman_ur": "Jo pasand ho batayein, main aap ke order mein shamil kar doon ga! 😊",
+        "ur": "جو پسند ہو بتائیں، میں آپ کے آرڈر میں شامل کر دوں گا! 😊",
+        "ar": "أخبرني بما تحب وسأضيفه إلى طلبك! 😊"
+    },
+    "order_added": {
+        "en": "Great choice! I've added these to your order: 😊",
+        "roman_ur": "Zabardast! Main ne ye aap ke order mein shamil kar diya: 😊",
+        "ur": "بہترین انتخاب! میں نے یہ آپ کے آرڈر میں شامل کر دیا: 😊",
+        "ar": "اختيار رائع! أضفت هذه إلى طلبك: 😊"
+    },
+    "price_header": {
+        "en": "💰 **Prices**",
+        "roman_ur": "💰 **Qeematein**",
+        "ur": "💰 **قیمتیں**",
+        "ar": "💰 **الأسعار**"
+    },
+    "deals_header": {
+        "en": "🎁 **Current Deals & Offers**",
+        "roman_ur": "🎁 **Aaj ki Deals aur Offers**",
+        "ur": "🎁 **موجودہ ڈیلز اور آفرز**",
+        "ar": "🎁 **العروض الحالية**"
+    },
+    "deal_off": {
+        "en": "{percent}% OFF",
+        "roman_ur": "{percent}% OFF",
+        "ur": "{percent}% رعایت",
+        "ar": "خصم {percent}%"
+    },
+    "no_deals": {
+        "en": "There are no active deals right now, but our menu has plenty of great options! 😊",
+        "roman_ur": "Abhi koi deal active nahi hai, lekin menu mein bohat kuch hai! 😊",
+        "ur": "ابھی کوئی ڈیل دستیاب نہیں، لیکن مینو میں بہت کچھ ہے! 😊",
+        "ar": "لا توجد عروض حالياً، لكن قائمتنا مليئة بالخيارات الرائعة! 😊"
+    },
+    "cart_empty": {
+        "en": "🛒 Your cart is empty. Would you like to see the menu?",
+        "roman_ur": "🛒 Aap ki cart khali hai. Kya aap menu dekhna chahenge?",
+        "ur": "🛒 آپ کی کارٹ خالی ہے۔ کیا آپ مینو دیکھنا چاہیں گے؟",
+        "ar": "🛒 سلتك فارغة. هل تود رؤية القائمة؟"
+    },
+    "cart_header": {
+        "en": "🛒 **Your Cart**",
+        "roman_ur": "🛒 **Aap ki Cart**",
+        "ur": "🛒 **آپ کی کارٹ**",
+        "ar": "🛒 **سلتك**"
+    },
+    "total": {
+        "en": "**Total: {total} {currency}**",
+        "roman_ur": "**Total: {total} {currency}**",
+        "ur": "**کل: {total} {currency}**",
+        "ar": "**المجموع: {total} {currency}**"
+    },
+    "cart_footer": {
+        "en": "Click **'Confirm Order'** in the sidebar when you're ready.",
+        "roman_ur": "Tayyar hon to sidebar mein **'Confirm Order'** dabayein.",
+        "ur": "تیار ہوں تو سائیڈبار میں **'Confirm Order'** دبائیں۔",
+        "ar": "اضغط **'Confirm Order'** في الشريط الجانبي عندما تكون جاهزاً."
+    },
+    "no_orders": {
+        "en": "You haven't placed an order at this table yet.",
+        "roman_ur": "Is table se abhi tak koi order nahi diya gaya.",
+        "ur": "اس ٹیبل سے ابھی تک کوئی آرڈر نہیں دیا گیا۔",
+        "ar": "لم يتم تقديم أي طلب من هذه الطاولة بعد."
+    },
+    "order_line": {
+        "en": "Order #{order_id}: {status}",
+        "roman_ur": "Order #{order_id}: {status}",
+        "ur": "آرڈر #{order_id}: {status}",
+        "ar": "الطلب #{order_id}: {status}"
+    },
+    "status_Pending": {
+        "en": "⏳ Pending - please proceed to the cashier for payment",
+        "roman_ur": "⏳ Pending - payment ke liye cashier ke paas tashreef le jayein",
+        "ur": "⏳ زیر التوا - ادائیگی کے لیے کیشیئر کے پاس تشریف لے جائیں",
+        "ar": "⏳ قيد الانتظار - يرجى التوجه إلى الكاشير للدفع"
+    },
+    "status_Paid": {
+        "en": "✅ Paid - thank you!",
+        "roman_ur": "✅ Paid - shukriya!",
+        "ur": "✅ ادا شدہ - شکریہ!",
+        "ar": "✅ مدفوع - شكراً لك!"
+    },
+    "offline_note": {
+        "en": "⚠️ Our assistant can't answer that right now, but you can still order from the **📋 Menu** tab.",
+        "roman_ur": "⚠️ Hamara assistant abhi iska jawab nahi de sakta, lekin aap **📋 Menu** tab se order kar sakte hain.",
+        "ur": "⚠️ ہمارا اسسٹنٹ ابھی اس کا جواب نہیں دے سکتا، لیکن آپ **📋 Menu** ٹیب سے آرڈر کر سکتے ہیں۔",
+        "ar": "⚠️ لا يستطيع مساعدنا الإجابة الآن، لكن يمكنك الطلب من تبويب **📋 Menu**."
+    }
+}
+
+
+def _text(key: str, language: str, **kwargs) -> str:
+    """Get a localized response string."""
+    options = TEXTS[key]
+    return options.get(language, options["en"]).format(**kwargs)
+
+
+def _localized(names: Dict, language: str) -> str:
+    """Pick the localized name of an item or deal, falling back to English."""
+    lang = "en" if language == "roman_ur" else language
+    return names.get(lang) or names.get("en", "Unknown")
+
+
+def _format_price(value: float) -> str:
+    """Format a price without a trailing .0 for whole numbers."""
+    value = float(value)
+    return f"{value:.0f}" if value == int(value) else f"{value:.2f}"
+
+
+# =============================================================================
+# MATCHING
+# =============================================================================
+
+def normalize_text(text: str) -> str:
+    """Lowercase and unify Arabic-script letter variants for matching."""
+    text = text.lower()
+    text = re.sub(r"[ً-ٰٟ]", "", text)  # diacritics
+    text = re.sub(r"[أإآ]", "ا", text)
+    text = text.replace("ى", "ي").replace("ة", "ه")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _contains(message: str, phrase: str) -> bool:
+    """Check for a phrase, using word boundaries for Latin text."""
+    phrase = normalize_text(phrase)
+    if re.match(r"^[a-z0-9' ]+$", phrase):
+        return re.search(r"\b" + re.escape(phrase) + r"\b", message) is not None
+    return phrase in message
+
+
+def find_items(message: str, menu: Dict) -> List[Dict]:
+    """Find available menu items mentioned in a message (any language)."""
+    text = normalize_text(message)
+    full_matches = []
+    partial_matches = {}
+
+    for category, items in menu.items():
+        for item in items:
+            if not item.get('available', True):
+                continue
+            names = [n for n in item.get('name', {}).values() if n]
+            if any(_contains(text, name) for name in names):
+                full_matches.append(item)
+                continue
+            for word in re.findall(r"[a-z]{4,}", normalize_text(item['name'].get('en', ''))):
+                if word not in GENERIC_NAME_WORDS and _contains(text, word):
+                    partial_matches.setdefault(word, []).append(item)
+
+    if full_matches:
+        return full_matches
+
+    # A distinctive word (e.g. "zinger") is enough when it points to few dishes
+    result = []
+    for word, items in partial_matches.items():
+        if len(items) <= 3:
+            for item in items:
+                if item not in result:
+                    result.append(item)
+    return result
+
+
+def find_category(message: str, menu: Dict) -> Optional[str]:
+    """Find a menu category mentioned in a message."""
+    text = normalize_text(message)
+    for category in menu.keys():
+        aliases = [category] + CATEGORY_ALIASES.get(category, [])
+        if any(_contains(text, alias) for alias in aliases):
+            return category
+    return None
+
+
+def _is_plain_lookup(text: str, items: List[Dict], category: Optional[str]) -> bool:
+    """
+    True when nothing but intent keywords, the matched dishes or category and
+    filler words is left in the message, i.e. it is a single-purpose lookup.
+    """
+    if len(text.split()) > MAX_LOOKUP_WORDS:
+        return False
+    phrases = [keyword for keywords in INTENT_KEYWORDS.values() for keyword in keywords]
+    for item in items:
+        phrases.extend(name for name in item.get('name', {}).values() if name)
+    if category:
+        phrases.extend([category] + CATEGORY_ALIASES.get(category, []))
+    # Longest first, so "how much" goes before "much" and "القائمة" before "قائمة"
+    for phrase in sorted((normalize_text(p) for p in phrases), key=len, reverse=True):
+        if _contains(text, phrase):
+            text = text.replace(phrase, " ")
+    filler = {normalize_text(word) for word in LOOKUP_FILLER_WORDS}
+    leftover = [word for word in re.findall(r"[^\W\d_]+", text)
+                if word not in filler and word.strip("'") not in filler and len(word) > 2]
+    return not leftover
+
+
+def detect_intent(message: str, menu: Dict) -> Optional[Dict]:
+    """
+    Classify a message into a locally answerable intent.
+    Returns None when the message should go to the LLM instead.
+    """
+    text = normalize_text(message)
+    # "I want to see the menu" is a question, not an order
+    order_text = re.sub(r"\bwant to (see|know|check)\b", "", text)
+    if not text or any(_contains(order_text, word) for word in ORDER_WORDS):
+        return None
+
+    language = detect_language(message)
+    for intent, keywords in INTENT_KEYWORDS.items():
+        matched = {keyword for keyword in keywords if _contains(text, keyword)}
+        if not matched:
+            continue
+        if (intent == "order_status" and matched <= GENERIC_STATUS_WORDS
+                and any(_contains(text, keyword) for keyword in INTENT_KEYWORDS["cart"])):
+            continue
+
+        result = {"intent": intent, "language": language, "items": [], "category": None}
+        if intent in ("price", "menu"):
+            result["items"] = find_items(message, menu)
+            result["category"] = find_category(message, menu)
+            if intent == "price" and not result["items"] and not result["category"]:
+                # "How much?" without a dish needs conversational context,
+                # unless another intent (e.g. "menu with prices") also matches
+                continue
+        if not _is_plain_lookup(text, result["items"], result["category"]):
+            # "Can you recommend something spicy from the menu?" - a question for the LLM
+            return None
+        return result
+
+    return None
+
+
+# =============================================================================
+# ANSWERS
+# =============================================================================
+
+def _item_lines(items: List[Dict], language: str) -> List[str]:
+    """Format item lines with localized names and prices."""
+    return [
+        f"• {_localized(item['name'], language)} - {_format_price(item['price'])} {config.CURRENCY}"
+        for item in items
+    ]
+
+
+def _available(items: List[Dict]) -> List[Dict]:
+    """Filter out unavailable items."""
+    return [item for item in items if item.get('available', True)]
+
+
+def answer_intent(intent: str, language: str, menu: Dict, deals: List[Dict],
+                  cart_items: Optional[List[Dict]] = None,
+                  orders: Optional[List[Dict]] = None,
+                  items: Optional[List[Dict]] = None,
+                  category: Optional[str] = None,
+                  discounts: Optional[List[Dict]] = None) -> str:
+    """
+    Build a localized answer for an intent from the menu snapshot.
+    `discounts` are the deals applied to the cart (DealEngine.price_cart).
+    """
+    lines = []
+
+    if intent == "menu":
+        lines.append(_text("menu_header", language))
+        categories = [category] if category else list(menu.keys())
+        for cat in categories:
+            available = _available(menu.get(cat, []))
+            if not available:
+                continue
+            lines.append(f"\n**{cat}**")
+            lines.extend(_item_lines(available, language))
+        lines.append("\n" + _text("order_prompt", language))
+
+    elif intent == "categories":
+        lines.append(_text("categories_header", language) + "\n")
+        for cat, cat_items in menu.items():
+            count = len(_available(cat_items))
+            if count:
+                lines.append(f"• **{cat}** ({_text('items_count', language, count=count)})")
+        lines.append("\n" + _text("order_prompt", language))
+
+    elif intent == "price":
+        lines.append(_text("price_header", language) + "\n")
+        if items:
+            lines.extend(_item_lines(items, language))
+        else:
+            lines.extend(_item_lines(_available(menu.get(category, [])), language))
+        lines.append("\n" + _text("order_prompt", language))
+
+    elif intent == "order_added":
+        lines.append(_text("order_added", language) + "\n")
+        for item in items or []:
+            lines.append(f"• {item['quantity']}x {item['name']}")
+
+    elif intent == "deals":
+        active = [d for d in deals if d.get('active', False)]
+        if not active:
+            return _text("no_deals", language)
+        lines.append(_text("deals_header", language) + "\n")
+        for deal in active:
+            name = _localized(deal.get('name', {}), language)
+            desc = _localized(deal.get('description', {}), language) if deal.get('description') else ""
+            off = _text("deal_off", language, percent=deal.get('discount_percent', 0))
+            lines.append(f"• **{name}** ({off})" + (f" - {desc}" if desc else ""))
+
+    elif intent == "cart":
+        if not cart_items:
+            return _text("cart_empty", language)
+        lines.append(_text("cart_header", language) + "\n")
+        total = 0
+        for item in cart_items:
+            subtotal = item['price'] * item['quantity']
+            total += subtotal
+            lines.append(f"• {item['name']} x{item['quantity']} = {_format_price(subtotal)} {config.CURRENCY}")
+        for discount in discounts or []:
+            total -= discount['amount']
+            off = _text("deal_off", language, percent=discount['percent'])
+            lines.append(f"• {discount['name']} ({off}) = -{_format_price(discount['amount'])} {config.CURRENCY}")
+        lines.append("\n" + _text("total", language, total=_format_price(round(total, 2)), currency=config.CURRENCY))
+        lines.append(_text("cart_footer", language))
+
+    elif intent == "order_status":
+        if not orders:
+            return _text("no_orders", language)
+        recent = sorted(orders, key=lambda o: o.get('order_id', 0), reverse=True)[:3]
+        for order in recent:
+            status_key = f"status_{order.get('status', 'Pending')}"
+            status = _text(status_key, language) if status_key in TEXTS else order.get('status', '')
+            lines.append(_text("order_line", language, order_id=order['order_id'], status=status))
+
+    return "\n".join(lines)
+
+
+def answer_locally(message: str, menu: Dict, deals: List[Dict],
+                   cart_items: Optional[List[Dict]] = None,
+                   get_orders: Optional[Callable[[], List[Dict]]] = None) -> Optional[str]:
+    """
+    Answer a message locally if it matches a known intent.
+    Returns None when the message needs the LLM.
+    """
+    detected = detect_intent(message, menu)
+    if detected is None:
+        return None
+
+    orders = None
+    if detected["intent"] == "order_status":
+        if get_orders is None:
+            return None
+        orders = get_orders()
+
+    return answer_intent(
+        detected["intent"], detected["language"], menu, deals,
+        cart_items=cart_items,
+        orders=orders,
+        items=detected["items"],
+        category=detected["category"]
+    )
+
+
+def answer_offline(message: str, menu: Dict, deals: List[Dict],
+                   cart_items: Optional[List[Dict]] = None,
+                   language: Optional[str] = None) -> str:
+    """
+    Answer a message the LLM can't take (API down or overloaded, turn deadline
+    missed, token budget used up): the closest lookup, in the customer's language.
+    """
+    language = language or detect_language(message)
+    text = normalize_text(message)
+    intent = next(
+        (name for name in ("deals", "cart", "menu")
+         if any(_contains(text, keyword) for keyword in INTENT_KEYWORDS[name])),
+        "categories"
+    )
+    answer = answer_intent(intent, language, menu, deals, cart_items=cart_items)
+    return _text("offline_note", language) + "\n\n" + answer
@@ -0,0 +1,81 @@
+"""
+Local language detection for customer messages.
+Tells English, Roman Urdu, Urdu and Arabic apart from Unicode script ranges
+and a Roman-Urdu word list, so replies and prompts can be localized without
+asking the model.
+"""
+import re
+from typing import Optional
+
+LANGUAGES = ["en", "roman_ur", "ur", "ar"]
+
+LANGUAGE_NAMES = {
+    "en": "English",
+    "roman_ur": "Roman Urdu (Urdu written in English letters)",
+    "ur": "Urdu (in Urdu script)",
+    "ar": "Arabic"
+}
+
+# Arabic script blocks: Arabic, Arabic Supplement and the presentation forms
+ARABIC_SCRIPT_RANGES = [
+    ("؀", "ۿ"),
+    ("ݐ", "ݿ"),
+    ("ﭐ", "﷿"),
+    ("ﹰ", "﻿")
+]
+
+# Letters used by Urdu but not by Arabic (ٹ ڈ ڑ ں ہ ھ ے ۓ ک گ پ چ ژ ی)
+URDU_ONLY_CHARS = set("ٹڈڑںہھےۓکگپچژی")
+# Arabic letter forms that Urdu writes differently (ة ي ك ى)
+ARABIC_ONLY_CHARS = set("ةيكى")
+
+ROMAN_URDU_WORDS = {
+    "kya", "hai", "hain", "mujhe", "muje", "mujhay", "chahiye", "chahye", "chahie", "kitne", "kitna",
+    "kitni", "ka", "ki", "ke", "ko", "se", "dikhao", "dikhayen", "dikha", "batao", "bataen", "bata",
+    "mera", "meri", "mere", "hum", "humein", "hamein", "aap", "ap", "apka", "kahan", "hoga", "wala",
+    "wali", "walay", "konsi", "kaunsi", "kon", "kaun", "khana", "qeemat", "keemat", "acha", "achha",
+    "theek", "thik", "yeh", "ye", "woh", "wo", "nahi", "nahin", "haan", "han", "jee", "ji", "aur",
+    "bhi", "sirf", "zyada", "kam", "dedo", "dijiye", "lao", "laiye", "karo", "karein", "kar", "do",
+    "shukriya", "meherbani", "bohat", "bahut", "thanda", "garam", "mirch", "masaledar", "ek", "teen",
+    "char", "paanch", "aik", "salam", "assalam", "alaikum", "bhai", "jaldi", "abhi", "kab", "kyun"
+}
+
+# Common English words; Roman Urdu is only chosen when its words outnumber these
+ENGLISH_WORDS = {
+    "i", "you", "we", "the", "a", "an", "is", "are", "do", "does", "can", "could", "would", "want",
+    "like", "please", "what", "which", "how", "much", "many", "have", "has", "me", "my", "your",
+    "and", "or", "with", "without", "to", "for", "of", "in", "some", "any", "one", "two", "three",
+    "give", "get", "bring", "add", "order", "show", "tell", "about", "it", "this", "that", "yes",
+    "no", "thanks", "thank", "hello", "hi", "hey", "good", "more", "less", "spicy", "sweet"
+}
+
+
+def _is_arabic_script(ch: str) -> bool:
+    return any(start <= ch <= end for start, end in ARABIC_SCRIPT_RANGES)
+
+
+def detect_language(text: str, default: str = "en") -> str:
+    """
+    Detect the message language: 'en', 'roman_ur', 'ur' or 'ar'.
+    Returns `default` when the text gives no signal (e.g. "ok", "2", emojis).
+    """
+    arabic_script = [ch for ch in text if _is_arabic_script(ch)]
+    if arabic_script:
+        urdu = sum(1 for ch in arabic_script if ch in URDU_ONLY_CHARS)
+        arabic = sum(1 for ch in arabic_script if ch in ARABIC_ONLY_CHARS)
+        return "ur" if urdu > arabic else "ar"
+
+    words = re.findall(r"[a-z']+", text.lower())
+    roman_urdu = sum(1 for word in words if word in ROMAN_URDU_WORDS)
+    english = sum(1 for word in words if word in ENGLISH_WORDS)
+    if roman_urdu > english:
+        return "roman_ur"
+    if english:
+        return "en"
+    return default
+
+
+def menu_language(language: Optional[str]) -> str:
+    """Language of the menu names to show (Roman Urdu readers get the English names)."""
+    return language if language in ("ur", "ar") else "en"
+
@@ -0,0 +1,271 @@
+"""
+Process-wide scheduler for Gemini requests.
+All chatbot calls from every Streamlit session go through one scheduler that
+caps concurrency, rate limits with a token bucket, retries 429/5xx errors with
+jittered backoff, enforces per-call timeouts and queues tables fairly.
+"""
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import Any, Callable, Dict, Optional
+import config
+
+# HTTP status codes and gRPC status names worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_STATUS_NAMES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE", "INTERNAL", "DEADLINE_EXCEEDED"}
+RETRYABLE_MESSAGES = ["429", "resource has been exhausted", "rate limit", "503", "unavailable", "500 internal"]
+RATE_LIMIT_MESSAGES = ["429", "resource has been exhausted", "rate limit"]
+
+
+class SchedulerTimeout(Exception):
+    """Raised when a scheduled call does not finish within its timeout."""
+
+
+class SchedulerCancelled(Exception):
+    """Raised when a call is cancelled while it waits for a slot."""
+
+
+def _status_code(error: Exception):
+    """HTTP status code or gRPC status of an API error (None if it has none)."""
+    code = getattr(error, "code", None)
+    if callable(code):
+        try:
+            code = code()
+        except Exception:
+            code = None
+    return code
+
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether an API error is a rate limit or a transient server error."""
+    code = _status_code(error)
+    if isinstance(code, int) and code in RETRYABLE_STATUS_CODES:
+        return True
+    if getattr(code, "name", None) in RETRYABLE_STATUS_NAMES:
+        return True
+    message = str(error).lower()
+    return any(text in message for text in RETRYABLE_MESSAGES)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Check whether an API error is a rate limit (429 / RESOURCE_EXHAUSTED) rather than an outage."""
+    code = _status_code(error)
+    if code == 429 or getattr(code, "name", None) == "RESOURCE_EXHAUSTED":
+        return True
+    message = str(error).lower()
+    return any(text in message for text in RATE_LIMIT_MESSAGES)
+
+
+class TokenBucket:
+    """Token bucket rate limiter (not thread safe - callers hold the scheduler lock)."""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """Take a token. Returns 0 on success, otherwise seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class LLMScheduler:
+    """Fair, rate-limited, concurrency-capped executor for LLM calls."""
+
+    def __init__(self, max_concurrency: int = None, requests_per_minute: float = None,
+                 burst: int = None, max_retries: int = None, backoff_base: float = None,
+                 backoff_max: float = None, call_timeout: float = None):
+        self.max_concurrency = max_concurrency or config.LLM_MAX_CONCURRENCY
+        self.max_retries = config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base or config.LLM_BACKOFF_BASE
+        self.backoff_max = backoff_max or config.LLM_BACKOFF_MAX
+        self.call_timeout = call_timeout or config.LLM_CALL_TIMEOUT
+        self._bucket = TokenBucket(
+            requests_per_minute or config.LLM_REQUESTS_PER_MINUTE,
+            burst or config.LLM_BURST
+        )
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # table_id -> deque of waiting tickets
+        self._active = 0
+        # Extra workers so calls abandoned after a timeout don't block new ones
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency * 2,
+            thread_name_prefix="llm-scheduler"
+        )
+        self.stats = {"calls": 0, "retries": 0, "timeouts": 0, "failures": 0}
+
+    # -------------------------------------------------------------------------
+    # Queue
+    # -------------------------------------------------------------------------
+
+    def _next_ticket(self) -> Optional[object]:
+        """Head ticket of the next table in round-robin order."""
+        for queue in self._queues.values():
+            if queue:
+                return queue[0]
+        return None
+
+    def _position(self, table_id: Any, ticket: object) -> int:
+        """Number of calls that will be dispatched before this ticket."""
+        queue = self._queues.get(table_id)
+        if not queue or ticket not in queue:
+            return 0
+        index = queue.index(ticket)
+        # Each round dispatches one ticket per table, in rotation order
+        ahead = index
+        before_us = True
+        for other_id, other in self._queues.items():
+            if other_id == table_id:
+                before_us = False
+                continue
+            ahead += min(len(other), index)
+            if before_us and len(other) > index:
+                ahead += 1
+        return ahead
+
+    def _acquire_slot(self, table_id: Any, on_wait: Optional[Callable[[int], None]],
+                      cancel: Optional[threading.Event] = None):
+        """Wait for this table's turn, a free slot and a rate limit token."""
+        ticket = object()
+        granted = False
+        with self._cond:
+            self._queues.setdefault(table_id, deque()).append(ticket)
+            try:
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        # Leaves the queue without taking a slot or a rate limit token
+                        raise SchedulerCancelled("LLM call cancelled while queued")
+                    wait = 0.5
+                    if self._active < self.max_concurrency and self._next_ticket() is ticket:
+                        wait = self._bucket.try_acquire()
+                        if wait == 0:
+                            self._queues[table_id].popleft()
+                            # Round robin: this table goes to the back of the rotation
+                            self._queues.move_to_end(table_id)
+                            if not self._queues[table_id]:
+                                del self._queues[table_id]
+                            self._active += 1
+                            granted = True
+                            self._cond.notify_all()
+                            return
+                    if on_wait:
+                        on_wait(self._position(table_id, ticket))
+                    self._cond.wait(min(wait, 0.5))
+            finally:
+                if not granted:
+                    queue = self._queues.get(table_id)
+                    if queue and ticket in queue:
+                        queue.remove(ticket)
+                        if not queue:
+                            del self._queues[table_id]
+                    self._cond.notify_all()
+
+    def _release_slot(self):
+        """Free a concurrency slot."""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def wake(self):
+        """Let queued calls check their cancel events now."""
+        with self._cond:
+            self._cond.notify_all()
+
+    # -------------------------------------------------------------------------
+    # Calls
+    # -------------------------------------------------------------------------
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def submit(self, table_id: Any, fn: Callable[[], Any],
+               on_wait: Optional[Callable[[int], None]] = None,
+               timeout: Optional[float] = None, breaker=None,
+               cancel: Optional[threading.Event] = None) -> Any:
+        """
+        Run `fn` when the table's turn comes up and return its result.
+        `on_wait(position)` is called while queued (0 means "you're next").
+        The outcome is recorded once in `breaker` (a CircuitBreaker) after the
+        retries; rate limits are not counted as upstream failures.
+        Setting `cancel` (then calling wake()) drops the call from the queue
+        and stops its retries with SchedulerCancelled.
+        """
+        timeout = timeout or self.call_timeout
+        for attempt in range(self.max_retries + 1):
+            self._acquire_slot(table_id, on_wait, cancel)
+            error = None
+            try:
+                self.stats["calls"] += 1
+                start = time.monotonic()
+                future = self._executor.submit(fn)
+                try:
+                    result = future.result(timeout=timeout)
+                except FuturesTimeout:
+                    future.cancel()
+                    self.stats["timeouts"] += 1
+                    error = SchedulerTimeout(f"LLM call timed out after {timeout:.0f}s")
+                except Exception as e:
+                    error = e
+                else:
+                    if breaker is not None:
+                        breaker.record_success(time.monotonic() - start)
+                    return result
+            finally:
+                self._release_slot()
+
+            # Timeouts are not retried - the customer has already waited long enough
+            if (attempt == self.max_retries or isinstance(error, SchedulerTimeout) or not is_retryable(error)
+                    or (cancel is not None and cancel.is_set())):
+                self.stats["failures"] += 1
+                if breaker is not None and not is_rate_limited(error):
+                    breaker.record_failure(error)
+                raise error
+            self.stats["retries"] += 1
+            time.sleep(self._backoff(attempt))
+
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a slot."""
+        with self._cond:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def queue_position(self, table_id: Any) -> Optional[int]:
+        """Position of a table's oldest waiting call, or None if it has none."""
+        with self._cond:
+            queue = self._queues.get(table_id)
+            if not queue:
+                return None
+            return self._position(table_id, queue[0])
+
+    def get_status(self) -> Dict:
+        """Snapshot of scheduler load for dashboards."""
+        with self._cond:
+            return {
+                "active": self._active,
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "tables_waiting": len(self._queues),
+                "max_concurrency": self.max_concurrency,
+                **self.stats
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """Get the process-wide scheduler shared by all sessions."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
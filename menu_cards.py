@@ -0,0 +1,85 @@
+"""
+Pre-rendered HTML for the menu cards of the customer page.
+Each item's card (name, shortened description, price and image fallback)
+is built once per language and menu version, so rendering a category only
+looks the cards up and fills in the current thumbnail URLs.
+"""
+import html
+from typing import Dict, List, Tuple
+import config
+from utils.database import get_menu_version, load_menu
+from utils.image_cache import DEFAULT_MENU_IMAGE, menu_image, thumbnail_url
+from utils.versioned_cache import VersionedCache
+
+# Characters of the description shown on a card
+DESCRIPTION_LENGTH = 60
+
+RTL_LANGUAGES = ("ur", "ar")
+
+# Stands for the image URL in a pre-rendered card
+_IMAGE_URL = "\x00"
+
+
+def _localized(texts: Dict, language: str, default: str = "") -> str:
+    return texts.get(language) or texts.get('en') or default
+
+
+def _card_parts(item: Dict, language: str = "en") -> Tuple[str, str, str]:
+    """A card's HTML before and after the image URL, and the image source."""
+    name = html.escape(_localized(item['name'], language, "Unknown"))
+    desc = _localized(item.get('description', {}), language)
+    if len(desc) > DESCRIPTION_LENGTH:
+        desc = desc[:DESCRIPTION_LENGTH] + '...'
+    direction = ' dir="rtl"' if language in RTL_LANGUAGES else ''
+    card = f"""
+                <div class="menu-card">
+                    <img src="{_IMAGE_URL}" class="menu-image" alt="{name}" onerror="this.src='{DEFAULT_MENU_IMAGE}'">
+                    <div class="menu-info"{direction}>
+                        <div class="menu-name">{name}</div>
+                        <div class="menu-desc">{html.escape(desc)}</div>
+                        <div class="menu-price">{item['price']} {config.CURRENCY}</div>
+                    </div>
+                </div>
+                """
+    before, after = card.split(_IMAGE_URL, 1)
+    return before, menu_image(item), after
+
+
+def _join(parts: Tuple[str, str, str]) -> str:
+    """Card HTML with the image's current URL (the thumbnail once it is ready)."""
+    before, source, after = parts
+    return before + html.escape(thumbnail_url(source, "menu"), quote=True) + after
+
+
+def card_html(item: Dict, language: str = "en") -> str:
+    """HTML of one menu card."""
+    return _join(_card_parts(item, language))
+
+
+class MenuCards:
+    """Card HTML of every available item of a menu in one language."""
+
+    def __init__(self, menu: Dict, language: str = "en"):
+        self.language = language
+        # Image URLs are looked up per render, so cards switch to thumbnails as they become ready
+        self.cards = {
+            item['item_id']: _card_parts(item, language)
+            for items in menu.values() for item in items
+            if item.get('available', True)
+        }
+
+    def html(self, item_id: str) -> str:
+        parts = self.cards.get(item_id)
+        return _join(parts) if parts else ""
+
+    def grid(self, item_ids: List[str]) -> str:
+        """Cards of several items, in order."""
+        return "".join(self.html(item_id) for item_id in item_ids)
+
+
+_cards = VersionedCache(8)
+
+
+def get_menu_cards(language: str = "en") -> MenuCards:
+    """Get the cards of the current menu in a language, built once per menu version."""
+    return _cards.get((get_menu_version(), language), lambda: MenuCards(load_menu(), language))
@@ -0,0 +1,124 @@
+"""
+Local keyword index over the menu.
+BM25 search across item names, descriptions and categories in English,
+Urdu and Arabic, used to send only the relevant items with each chat turn
+instead of the full menu.
+"""
+import hashlib
+import json
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from utils.intent_engine import normalize_text
+from utils.versioned_cache import VersionedCache
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+# Item names count more than descriptions
+NAME_WEIGHT = 3
+
+# Urdu letter forms mapped to their Arabic equivalents so both scripts match
+URDU_TO_ARABIC = str.maketrans({"ی": "ي", "ے": "ي", "ک": "ك", "ہ": "ه", "ۃ": "ه"})
+
+STOP_WORDS = {
+    "i", "a", "an", "the", "and", "or", "with", "of", "to", "me", "please", "want", "some",
+    "is", "it", "for", "in", "on", "how", "much", "what", "do", "you", "have", "can", "get",
+    "ka", "ki", "ke", "hai", "mujhe", "aur", "کا", "کی", "کے", "ہے", "اور", "میں",
+    "من", "في", "و", "على", "مع"
+}
+STOP_WORDS = {word.translate(URDU_TO_ARABIC) for word in STOP_WORDS}
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalize and split text into index terms."""
+    tokens = []
+    for token in re.findall(r"\w+", normalize_text(text).translate(URDU_TO_ARABIC)):
+        if token in STOP_WORDS or token.isdigit():
+            continue
+        # Light stemming: English plurals and the Arabic article
+        if len(token) > 3 and token.isascii() and token.endswith("s"):
+            token = token[:-1]
+        elif len(token) > 4 and token.startswith("ال"):
+            token = token[2:]
+        tokens.append(token)
+    return tokens
+
+
+def menu_version(menu: Dict) -> str:
+    """Content hash of a menu."""
+    return hashlib.sha1(json.dumps(menu, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+
+
+class MenuIndex:
+    """BM25 index over available menu items."""
+
+    def __init__(self, menu: Dict):
+        self.items = {}
+        self.categories = {}
+        self.doc_terms = {}
+        self.doc_freq = Counter()
+
+        for category, items in menu.items():
+            for item in items:
+                if not item.get('available', True):
+                    continue
+                item_id = item['item_id']
+                self.items[item_id] = item
+                self.categories[item_id] = category
+
+                names = " ".join(n for n in item.get('name', {}).values() if n)
+                descriptions = " ".join(d for d in item.get('description', {}).values() if d)
+                terms = Counter(tokenize(names) * NAME_WEIGHT + tokenize(descriptions) + tokenize(category))
+                self.doc_terms[item_id] = terms
+                self.doc_freq.update(terms.keys())
+
+        lengths = [sum(terms.values()) for terms in self.doc_terms.values()]
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    def get(self, item_id: str) -> Optional[Dict]:
+        """Look up an available item by ID."""
+        return self.items.get(item_id)
+
+    def _idf(self, term: str) -> float:
+        n = len(self.doc_terms)
+        df = self.doc_freq.get(term, 0)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 8) -> List[Tuple[Dict, float]]:
+        """Top `k` items for a query as (item, score), best first."""
+        query_terms = tokenize(query)
+        if not query_terms:
+            return []
+
+        scores = {}
+        for item_id, terms in self.doc_terms.items():
+            length = sum(terms.values())
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term, 0)
+                if tf:
+                    norm = tf + K1 * (1 - B + B * length / self.avg_length)
+                    score += self._idf(term) * tf * (K1 + 1) / norm
+            if score > 0:
+                scores[item_id] = score
+
+        ranked = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)[:k]
+        return [(self.items[item_id], score) for item_id, score in ranked]
+
+
+_indexes = VersionedCache(4)
+
+
+def get_menu_index(menu: Dict) -> MenuIndex:
+    """Get the index for a menu, building it once per menu version."""
+    version = menu_version(menu)
+
+    def build() -> MenuIndex:
+        index = MenuIndex(menu)
+        index.version = version
+        return index
+
+    return _indexes.get(version, build)
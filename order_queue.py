@@ -0,0 +1,160 @@
+"""
+Order submission queue.
+"Confirm Order" hands the cart to an in-process queue and a background
+writer saves the queued orders in batches, so the customer page does not
+wait on the orders file. Every checkout has an idempotency key: submitting
+the same cart again (double taps, reruns, reloads) returns the same order.
+"""
+import atexit
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import config
+from utils.database import create_orders
+
+
+class Submission:
+    """One order waiting to be saved, or saved."""
+
+    def __init__(self, key: str, request: Dict):
+        self.key = key
+        self.request = request
+        self.status = "queued"  # queued, committed or failed
+        self.order = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.committed_at = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Wait until the order is saved (or failed). Returns the saved order."""
+        self._done.wait(timeout)
+        return self.order
+
+    def _finish(self, order: Optional[Dict], error: Optional[str] = None):
+        self.order = order
+        self.error = error
+        self.status = "committed" if order else "failed"
+        self.committed_at = time.time()
+        self._done.set()
+
+
+class OrderQueue:
+    """Queues order submissions and saves them from a background thread."""
+
+    def __init__(self):
+        self._submissions = OrderedDict()  # key -> Submission, most recent last
+        self._queue = []  # submissions not written yet
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self._write_times = []
+
+    def start(self):
+        """Start the background writer (once)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, key: str, table_id: int, items: List[Dict], total_price: float,
+               discounts: Optional[List[Dict]] = None) -> Submission:
+        """
+        Queue an order. A key that was already submitted returns its submission
+        (unless it failed, then the order is queued again).
+        """
+        with self._lock:
+            submission = self._submissions.get(key)
+            if submission is not None and submission.status != "failed":
+                return submission
+            submission = Submission(key, {
+                "idempotency_key": key,
+                "table_id": table_id,
+                "items": items,
+                "total_price": total_price,
+                "discounts": discounts or []
+            })
+            self._submissions[key] = submission
+            self._submissions.move_to_end(key)
+            self._queue.append(submission)
+            # Forget the oldest finished submissions; queued ones are still waited on by their pages
+            while len(self._submissions) > config.ORDER_QUEUE_HISTORY:
+                oldest = next((k for k, s in self._submissions.items() if s.status != "queued"), None)
+                if oldest is None:
+                    break
+                del self._submissions[oldest]
+        self._wake.set()
+        return submission
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error writing orders: {e}")
+
+    def flush(self) -> bool:
+        """Save all queued orders in one write of the orders file."""
+        with self._write_lock:
+            with self._lock:
+                batch, self._queue = self._queue, []
+            if not batch:
+                return True
+
+            start = time.perf_counter()
+            try:
+                orders = create_orders([submission.request for submission in batch])
+            except Exception as e:
+                print(f"Error saving orders: {e}")
+                orders = None
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self.batches += 1
+                self._write_times = (self._write_times + [elapsed])[-100:]
+                if orders is None:
+                    self.failures += len(batch)
+                else:
+                    self.written += len(batch)
+            for i, submission in enumerate(batch):
+                if orders is None:
+                    submission._finish(None, "The order could not be saved")
+                else:
+                    submission._finish(orders[i])
+            return orders is not None
+
+    def get_status(self) -> Dict:
+        """Queue length and write counts for dashboards."""
+        with self._lock:
+            times = self._write_times
+            return {
+                "queued": len(self._queue),
+                "written": self.written,
+                "batches": self.batches,
+                "failures": self.failures,
+                "avg_write_ms": round(sum(times) / len(times) * 1000, 1) if times else 0.0
+            }
+
+
+_order_queue = None
+_order_queue_lock = threading.Lock()
+
+
+def get_order_queue() -> OrderQueue:
+    """Get the process-wide order queue, starting its writer on first use."""
+    global _order_queue
+    with _order_queue_lock:
+        if _order_queue is None:
+            _order_queue = OrderQueue()
+            _order_queue.start()
+            # Orders queued just before shutdown are still saved
+            atexit.register(_order_queue.flush)
+        return _order_queue
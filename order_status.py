@@ -0,0 +1,71 @@
+"""
+Live order status for the customer page.
+Order writes in this process update the board directly; writes by other
+server processes are picked up from the orders file's modification time.
+Customer pages only compare a per-table change counter, so watching an
+order never loads the order list per table.
+"""
+import os
+import threading
+from typing import Dict, List, Optional
+import config
+from utils.database import add_order_listener, load_orders
+
+
+class OrderStatusBoard:
+    """Status of each table's orders and a change counter per table."""
+
+    def __init__(self):
+        self._statuses = {}  # table_id -> {order_id: status}
+        self._versions = {}  # table_id -> status changes seen
+        self._file_mtime = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def publish(self, orders: List[Dict]):
+        """Record order statuses; tables whose statuses changed get a new version."""
+        with self._lock:
+            for order in orders:
+                table_id = order.get('table_id')
+                statuses = self._statuses.setdefault(table_id, {})
+                if statuses.get(order['order_id']) != order.get('status'):
+                    statuses[order['order_id']] = order.get('status')
+                    self._versions[table_id] = self._versions.get(table_id, 0) + 1
+
+    def sync(self):
+        """Reload the statuses once after the orders file changed (e.g. written by another process)."""
+        try:
+            mtime = os.stat(config.ORDERS_FILE).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._file_mtime:
+            return
+        with self._sync_lock:
+            if mtime == self._file_mtime:
+                return
+            self.publish(load_orders())
+            self._file_mtime = mtime
+
+    def version(self, table_id: int) -> int:
+        """Changes to the table's order statuses so far."""
+        self.sync()
+        with self._lock:
+            return self._versions.get(table_id, 0)
+
+    def status(self, table_id: int, order_id: int) -> Optional[str]:
+        with self._lock:
+            return self._statuses.get(table_id, {}).get(order_id)
+
+
+_board = None
+_board_lock = threading.Lock()
+
+
+def get_order_status_board() -> OrderStatusBoard:
+    """Get the process-wide status board, subscribed to order writes."""
+    global _board
+    with _board_lock:
+        if _board is None:
+            _board = OrderStatusBoard()
+            add_order_listener(_board.publish)
+        return _board
@@ -0,0 +1,148 @@
+"""
+Pool of pre-warmed chat sessions for the tables in use.
+A table's first chat session is created inline; from then on a background
+thread keeps a ready RestaurantChatbot (model discovered, context sent,
+welcome generated) for it, so the next visit or new chat only checks one
+out. Idle tables are not kept warm, and warming waits while customers are
+queued for the API. Sessions are rebuilt when the menu or deals change.
+"""
+import threading
+import time
+from typing import Dict, Optional
+import config
+from utils.database import get_active_deals, get_menu_version, load_menu
+from utils.gemini_client import RestaurantChatbot, gemini_breaker
+from utils.llm_scheduler import get_scheduler
+
+
+class SessionPool:
+    """Keeps one warm chat session for each table in use."""
+
+    def __init__(self, size: Optional[int] = None):
+        self.size = size or config.NUMBER_OF_TABLES
+        self.version = None
+        self.menu = {}
+        self.deals = []
+        self._sessions = {}  # table_id -> (chatbot, created_at)
+        self._last_used = {}  # table_id -> time of its last checkout
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        """Start the background warming thread (once)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="chat-session-pool", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self._refresh()
+            except Exception as e:
+                print(f"Error warming chat sessions: {e}")
+            self._wake.wait(config.SESSION_POOL_REFRESH_INTERVAL)
+            self._wake.clear()
+
+    def _refresh(self):
+        """Drop stale sessions and warm the tables in use that have none."""
+        version = get_menu_version()
+        if version != self.version:
+            menu, deals = load_menu(), get_active_deals()
+            with self._lock:
+                self._sessions.clear()
+                self.version, self.menu, self.deals = version, menu, deals
+
+        now = time.time()
+        with self._lock:
+            for table_id, last_used in list(self._last_used.items()):
+                if now - last_used > config.SESSION_POOL_IDLE_TIMEOUT:
+                    # No chat for a while - don't spend quota keeping the table warm
+                    del self._last_used[table_id]
+                    self._sessions.pop(table_id, None)
+            for table_id, (_, created_at) in list(self._sessions.items()):
+                if now - created_at > config.SESSION_POOL_MAX_AGE:
+                    del self._sessions[table_id]
+            tables = sorted(self._last_used, key=self._last_used.get, reverse=True)[:self.size]
+
+        for table_id in tables:
+            if not gemini_breaker.allow_request():
+                # Sessions created now would only be offline ones
+                return
+            if get_scheduler().queue_depth() > 0:
+                # Customers are waiting for the API - warm up on a later round
+                return
+            with self._lock:
+                if table_id in self._sessions:
+                    continue
+                menu, deals = self.menu, self.deals
+
+            chatbot = RestaurantChatbot(table_id, menu, deals)
+            if not chatbot.api_available:
+                return
+
+            with self._lock:
+                if self.version == version:
+                    self._sessions[table_id] = (chatbot, time.time())
+
+    def checkout(self, table_id: int) -> Optional[RestaurantChatbot]:
+        """
+        Take the warm session for a table, or None if there is no usable one
+        (the caller then creates a session inline).
+        """
+        version = get_menu_version()
+        with self._lock:
+            self._last_used[table_id] = time.time()
+            entry = self._sessions.pop(table_id, None)
+            usable = (
+                entry is not None
+                and self.version == version
+                and time.time() - entry[1] <= config.SESSION_POOL_MAX_AGE
+                and entry[0].api_available
+            )
+            if usable:
+                self.hits += 1
+            else:
+                self.misses += 1
+        # Replace the session that was taken (or notice the new menu version)
+        self._wake.set()
+        return entry[0] if usable else None
+
+    def get_status(self) -> Dict:
+        """Warm sessions and checkout counts for dashboards."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "tables": len(self._last_used),
+                "warm": len(self._sessions),
+                "menu_version": self.version,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> SessionPool:
+    """Get the process-wide session pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SessionPool()
+            _pool.start()
+        return _pool
+
+
+def checkout_chatbot(table_id: int) -> RestaurantChatbot:
+    """A ready chat session for a table: a warm one from the pool when available."""
+    if config.SESSION_POOL_ENABLED:
+        chatbot = get_session_pool().checkout(table_id)
+        if chatbot is not None:
+            return chatbot
+    return RestaurantChatbot(table_id, load_menu(), get_active_deals())
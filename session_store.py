@@ -0,0 +1,157 @@
+"""
+Server-side store for customer chat sessions.
+Chat messages, cart and chatbot state are saved per visit in SQLite, so a
+page reload, tablet reconnect, server restart or another server process can
+pick the session up again. A visit is a table plus a token kept in the page
+URL: the next diner scanning the table's QR code starts a new visit instead
+of seeing the previous one. Recently used sessions are cached in memory and
+sessions idle for longer than SESSION_IDLE_TIMEOUT are removed.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import config
+
+# Seconds between idle session cleanups
+EVICTION_INTERVAL = 300
+
+
+class SessionStore:
+    """SQLite-backed per-visit session state with an in-memory LRU cache."""
+
+    def __init__(self, path=None, cache_size: Optional[int] = None, idle_timeout: Optional[float] = None):
+        self.path = str(path or config.SESSION_DB_FILE)
+        self.cache_size = cache_size or config.SESSION_CACHE_SIZE
+        self.idle_timeout = idle_timeout or config.SESSION_IDLE_TIMEOUT
+        self._cache = OrderedDict()  # (table_id, visit_id) -> (updated_at, state_json, state)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._last_eviction = 0.0
+        with self._connect() as conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]
+            if columns and "visit_id" not in columns:
+                # Sessions saved per table only - they would be restored for the next diner
+                conn.execute("DROP TABLE sessions")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "table_id INTEGER NOT NULL, visit_id TEXT NOT NULL, state TEXT NOT NULL, "
+                "updated_at REAL NOT NULL, PRIMARY KEY (table_id, visit_id))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread (SQLite connections can't be shared)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            # Readers don't block the writer when several processes share the file
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _cache_put(self, key: Tuple[int, str], updated_at: float, state_json: str, state: Dict):
+        self._cache[key] = (updated_at, state_json, state)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def load(self, table_id: int, visit_id: str) -> Optional[Dict]:
+        """Saved state of a visit, or None if there is none (or it went idle)."""
+        key = (table_id, visit_id)
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT updated_at FROM sessions WHERE table_id = ? AND visit_id = ?", key
+        ).fetchone()
+        if row is None:
+            with self._lock:
+                self._cache.pop(key, None)
+            return None
+        if time.time() - row[0] > self.idle_timeout:
+            self.delete(table_id, visit_id)
+            return None
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == row[0]:
+                # Unchanged since this process last saw it - skip decoding
+                self._cache.move_to_end(key)
+                return cached[2]
+
+        row = conn.execute(
+            "SELECT state, updated_at FROM sessions WHERE table_id = ? AND visit_id = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        state = json.loads(row[0])
+        with self._lock:
+            self._cache_put(key, row[1], row[0], state)
+        return state
+
+    def save(self, table_id: int, visit_id: str, state: Dict) -> bool:
+        """Save a visit's state; unchanged states are not written again."""
+        key = (table_id, visit_id)
+        state_json = json.dumps(state, ensure_ascii=False, sort_keys=True)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[1] == state_json:
+                return False
+
+        updated_at = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sessions (table_id, visit_id, state, updated_at) VALUES (?, ?, ?, ?)",
+                    (table_id, visit_id, state_json, updated_at)
+                )
+        except sqlite3.Error as e:
+            print(f"Error saving session for table {table_id}: {e}")
+            return False
+
+        with self._lock:
+            self._cache_put(key, updated_at, state_json, state)
+        self._maybe_evict()
+        return True
+
+    def delete(self, table_id: int, visit_id: str):
+        """Remove a visit's session (its order was paid or the diner started a new order)."""
+        with self._lock:
+            self._cache.pop((table_id, visit_id), None)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE table_id = ? AND visit_id = ?", (table_id, visit_id))
+
+    def _maybe_evict(self):
+        now = time.time()
+        if now - self._last_eviction >= EVICTION_INTERVAL:
+            self._last_eviction = now
+            self.evict_idle()
+
+    def evict_idle(self) -> int:
+        """Remove sessions idle for longer than the idle timeout. Returns the number removed."""
+        cutoff = time.time() - self.idle_timeout
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+        with self._lock:
+            for key in [k for k, (updated_at, _, _) in self._cache.items() if updated_at < cutoff]:
+                del self._cache[key]
+        return removed
+
+    def get_status(self) -> Dict:
+        """Stored and cached session counts for dashboards."""
+        count = self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        with self._lock:
+            return {"stored": count, "cached": len(self._cache), "cache_size": self.cache_size}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Get the process-wide session store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore()
+        return _store
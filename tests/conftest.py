@@ -0,0 +1,17 @@
+"""
+The modules import each other as `utils.<module>` (the repository is the
+`utils` package of the app), so make the repository importable under that name.
+"""
+import importlib.util
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(ROOT))
+if "utils" not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        "utils", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)]
+    )
+    sys.modules["utils"] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules["utils"])
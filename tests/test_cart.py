@@ -0,0 +1,23 @@
+from utils.cart import Cart
+
+
+def test_remove_items_keeps_units_added_after_submission():
+    cart = Cart()
+    cart.add("b1", "Burger", 10, 2)
+    submitted = cart.to_list()
+    # Added from the menu while the order is being saved
+    cart.add("b1", "Burger", 10, 1)
+    cart.add("t1", "Tea", 2.5)
+
+    cart.remove_items(submitted)
+    assert [(line["item_id"], line["quantity"]) for line in cart] == [("b1", 1), ("t1", 1)]
+    assert cart.subtotal == 12.5
+
+
+def test_remove_items_of_the_whole_cart_starts_a_new_cart():
+    cart = Cart([{"item_id": "p1", "name": "Pizza", "price": 30, "quantity": 1}])
+    key = cart.checkout_key
+    cart.remove_items(cart.to_list())
+    assert not cart
+    assert cart.subtotal == 0.0
+    assert cart.checkout_key != key
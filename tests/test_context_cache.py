@@ -0,0 +1,43 @@
+import threading
+from utils.context_cache import SharedContext, get_shared_context
+
+
+def test_concurrent_sessions_create_the_context_once():
+    created = []
+    release = threading.Event()
+
+    def factory(model_name, text, version):
+        created.append(version)
+        release.wait(5)
+        return SharedContext(version, text, model=None)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(get_shared_context("m", "once", factory, variant="once")))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    # Other contexts are served while this one is being created
+    other = get_shared_context("m", "other", lambda name, text, version: SharedContext(version, text, None))
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert other.text == "other"
+    assert len(created) == 1
+    assert len(results) == 4 and all(context is results[0] for context in results)
+    assert results[0].sessions == 4
+
+
+def test_failed_creation_is_retried():
+    def failing(model_name, text, version):
+        raise RuntimeError("provider error")
+
+    try:
+        get_shared_context("m", "retry", failing, variant="retry")
+    except RuntimeError:
+        pass
+    context = get_shared_context("m", "retry", lambda name, text, version: SharedContext(version, text, None),
+                                 variant="retry")
+    assert context.text == "retry"
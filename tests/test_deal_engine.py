@@ -0,0 +1,52 @@
+from utils.deal_engine import DealEngine
+
+MENU = {
+    "Fast Food": [
+        {"item_id": "b1", "name": {"en": "Burger"}, "price": 20.0},
+        {"item_id": "f1", "name": {"en": "Fries"}, "price": 10.0}
+    ],
+    "Drinks": [
+        {"item_id": "c1", "name": {"en": "Cola"}, "price": 5.0}
+    ]
+}
+
+
+def _deal(deal_id, items, percent, min_items=1, active=True):
+    return {"deal_id": deal_id, "name": {"en": deal_id}, "applicable_items": items,
+            "discount_percent": percent, "min_items": min_items, "active": active}
+
+
+def _line(item_id, price, quantity=1):
+    return {"item_id": item_id, "name": item_id, "price": price, "quantity": quantity}
+
+
+def test_deal_needs_min_items_units():
+    engine = DealEngine(MENU, [_deal("combo", ["b1", "f1", "c1"], 20, min_items=3)])
+    assert engine.price_cart([_line("b1", 20.0), _line("f1", 10.0)])["discounts"] == []
+
+    pricing = engine.price_cart([_line("b1", 20.0), _line("f1", 10.0), _line("c1", 5.0)])
+    assert [d["deal_id"] for d in pricing["discounts"]] == ["combo"]
+    assert pricing["total"] == 28.0
+
+
+def test_best_saving_deal_takes_the_shared_units():
+    engine = DealEngine(MENU, [
+        _deal("burger10", ["b1"], 10),
+        _deal("meal25", ["b1", "f1"], 25, min_items=2),
+        _deal("off", ["b1"], 50, active=False)
+    ])
+    pricing = engine.price_cart([_line("b1", 20.0, 2), _line("f1", 10.0)])
+    # 25% of 50 beats 10% of 40; the burgers can't be discounted twice
+    assert [(d["deal_id"], d["amount"]) for d in pricing["discounts"]] == [("meal25", 12.5)]
+    assert pricing["subtotal"] == 50.0
+    assert pricing["total"] == 37.5
+
+
+def test_deal_left_below_min_items_by_a_better_deal_is_skipped():
+    engine = DealEngine(MENU, [
+        _deal("burgers", ["b1"], 50),
+        _deal("meal", ["b1", "f1"], 10, min_items=2)
+    ])
+    pricing = engine.price_cart([_line("b1", 20.0), _line("f1", 10.0)])
+    assert [d["deal_id"] for d in pricing["discounts"]] == ["burgers"]
+    assert pricing["total"] == 20.0
@@ -0,0 +1,52 @@
+import pytest
+from utils.intent_engine import answer_intent, detect_intent
+
+MENU = {
+    "Fast Food": [
+        {"item_id": "ff01", "name": {"en": "Zinger Burger", "ur": "زنگر برگر", "ar": "زنجر برجر"},
+         "price": 25.0, "available": True},
+        {"item_id": "ff02", "name": {"en": "French Fries", "ur": "فرنچ فرائز", "ar": "بطاطس مقلية"},
+         "price": 10.0, "available": True}
+    ],
+    "Tea": [
+        {"item_id": "te01", "name": {"en": "Karak Tea", "ur": "کڑک چائے", "ar": "شاي كرك"},
+         "price": 8.0, "available": True}
+    ]
+}
+
+
+def _intent(message):
+    result = detect_intent(message, MENU)
+    return result and result["intent"]
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("Show me the menu", "menu"),
+    ("What deals do you have?", "deals"),
+    ("How much is the Zinger Burger?", "price"),
+    ("What's in my cart?", "cart"),
+    ("cart status", "cart"),
+    ("Order status", "order_status"),
+    ("Is my order ready?", "order_status"),
+    ("مینو دکھائیں", "menu"),
+    ("ما هي العروض", "deals")
+])
+def test_lookups_are_routed_to_their_intent(message, intent):
+    assert _intent(message) == intent
+
+
+@pytest.mark.parametrize("message", [
+    "I want 2 Zinger Burger",
+    "Can you recommend something spicy from the menu?",
+    "How much?"
+])
+def test_orders_and_open_questions_go_to_the_llm(message):
+    assert detect_intent(message, MENU) is None
+
+
+def test_cart_answer_includes_the_deal_discounts():
+    cart_items = [{"item_id": "ff01", "name": "Zinger Burger", "price": 25.0, "quantity": 2}]
+    discounts = [{"deal_id": "d1", "name": "Burger Deal", "percent": 10, "amount": 5.0, "items": ["ff01"]}]
+    answer = answer_intent("cart", "en", MENU, [], cart_items=cart_items, discounts=discounts)
+    assert "Burger Deal (10% OFF) = -5 SAR" in answer
+    assert "**Total: 45 SAR**" in answer
@@ -0,0 +1,31 @@
+import pytest
+from utils.language import detect_language, menu_language
+
+
+@pytest.mark.parametrize("message, language", [
+    ("Can I see the menu please?", "en"),
+    ("mujhe do zinger burger chahiye", "roman_ur"),
+    ("kitne ka hai ye pizza", "roman_ur"),
+    ("مجھے دو زنگر برگر چاہیے", "ur"),
+    ("کیا آپ کے پاس چائے ہے؟", "ur"),
+    ("أريد بيتزا كبيرة من فضلك", "ar"),
+    ("كم سعر الشاي؟", "ar")
+])
+def test_detects_script_and_roman_urdu(message, language):
+    assert detect_language(message) == language
+
+
+def test_english_words_outweigh_shared_roman_urdu_words():
+    # "do" is a Roman Urdu word too
+    assert detect_language("Do you have any spicy burgers?") == "en"
+
+
+def test_messages_without_words_keep_the_default():
+    assert detect_language("2 👍", default="ar") == "ar"
+    assert detect_language("ok") == "en"
+
+
+def test_roman_urdu_readers_get_the_english_menu_names():
+    assert menu_language("roman_ur") == "en"
+    assert menu_language("ur") == "ur"
+    assert menu_language(None) == "en"
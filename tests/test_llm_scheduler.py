@@ -0,0 +1,85 @@
+import threading
+import time
+import pytest
+from utils.circuit_breaker import CLOSED, CircuitBreaker
+from utils.llm_scheduler import LLMScheduler, SchedulerCancelled, is_rate_limited
+
+
+class APIError(Exception):
+    def __init__(self, code):
+        super().__init__(f"{code} error")
+        self.code = code
+
+
+def _scheduler():
+    return LLMScheduler(max_concurrency=2, requests_per_minute=6000, burst=100,
+                        max_retries=2, backoff_base=0.001, backoff_max=0.001, call_timeout=5)
+
+
+def _failing(code):
+    def fn():
+        raise APIError(code)
+    return fn
+
+
+def test_retries_record_one_breaker_failure():
+    breaker = CircuitBreaker("test", failure_threshold=3)
+    with pytest.raises(APIError):
+        _scheduler().submit(1, _failing(503), breaker=breaker)
+    assert breaker.stats["failures"] == 1
+    assert breaker.state == CLOSED
+
+
+def test_rate_limits_are_not_health_failures():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    with pytest.raises(APIError):
+        _scheduler().submit(1, _failing(429), breaker=breaker)
+    assert breaker.stats["failures"] == 0
+    assert breaker.state == CLOSED
+    assert is_rate_limited(Exception("429 Resource has been exhausted"))
+    assert not is_rate_limited(APIError(503))
+
+
+def test_success_after_retry_records_one_success():
+    breaker = CircuitBreaker("test")
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            raise APIError(503)
+        return "ok"
+
+    assert _scheduler().submit(1, fn, breaker=breaker) == "ok"
+    assert breaker.stats == {**breaker.stats, "successes": 1, "failures": 0}
+
+
+def test_cancel_drops_a_queued_call():
+    scheduler = LLMScheduler(max_concurrency=1, requests_per_minute=6000, burst=100, call_timeout=5)
+    release = threading.Event()
+    busy = threading.Thread(target=lambda: scheduler.submit(1, lambda: release.wait(5)))
+    busy.start()
+    while scheduler.get_status()["active"] == 0:
+        time.sleep(0.01)
+
+    cancel = threading.Event()
+    errors = []
+
+    def queued():
+        try:
+            scheduler.submit(2, lambda: "sent", cancel=cancel)
+        except SchedulerCancelled as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=queued)
+    waiter.start()
+    while scheduler.queue_depth() == 0:
+        time.sleep(0.01)
+    cancel.set()
+    scheduler.wake()
+    waiter.join(2)
+
+    assert len(errors) == 1
+    assert scheduler.queue_depth() == 0
+    release.set()
+    busy.join(5)
@@ -0,0 +1,47 @@
+from utils.menu_index import MenuIndex
+
+MENU = {
+    "BBQ": [
+        {"item_id": "bb01", "name": {"en": "Chicken Tikka", "ur": "چکن تکہ", "ar": "دجاج تكا"},
+         "description": {"en": "Charcoal grilled chicken pieces"}, "price": 30.0},
+        {"item_id": "bb02", "name": {"en": "Seekh Kabab", "ur": "سیخ کباب", "ar": "سيخ كباب"},
+         "description": {"en": "Minced beef skewers"}, "price": 28.0}
+    ],
+    "Tea": [
+        {"item_id": "te01", "name": {"en": "Karak Tea", "ur": "کڑک چائے", "ar": "شاي كرك"},
+         "description": {"ar": "شاي بالحليب والهيل"}, "price": 8.0},
+        {"item_id": "te02", "name": {"en": "Green Tea", "ur": "سبز چائے", "ar": "شاي أخضر"},
+         "price": 10.0, "available": False}
+    ],
+    "Fast Food": [
+        {"item_id": "ff01", "name": {"en": "Zinger Burger", "ur": "زنگر برگر", "ar": "زنجر برجر"},
+         "price": 25.0}
+    ]
+}
+
+
+def _top(query, k=1):
+    return [item["item_id"] for item, _ in MenuIndex(MENU).search(query, k)]
+
+
+def test_urdu_and_arabic_letter_forms_match_each_other():
+    # Only the Urdu name has تکہ: typed with the Arabic ك and ه
+    assert _top("تكه") == ["bb01"]
+    # Only the Arabic name has شاي: typed with the Urdu ی
+    assert _top("شای") == ["te01"]
+
+
+def test_arabic_article_and_english_plurals_are_stripped():
+    assert _top("الكرك") == ["te01"]
+    assert _top("two zinger burgers") == ["ff01"]
+
+
+def test_descriptions_and_categories_are_searched():
+    assert _top("skewers") == ["bb02"]
+    assert _top("بالحليب") == ["te01"]
+    assert sorted(_top("bbq", k=5)) == ["bb01", "bb02"]
+
+
+def test_unavailable_items_are_not_returned():
+    assert "te02" not in _top("شاي", k=5)
+    assert _top("please") == []
@@ -0,0 +1,43 @@
+import filelock
+import pytest
+import config
+from utils import database
+from utils.database import create_orders, load_orders
+from utils.order_queue import OrderQueue
+
+ITEMS = [{"item_id": "b1", "name": "Burger", "price": 20.0, "quantity": 2}]
+
+
+@pytest.fixture
+def orders_file(tmp_path, monkeypatch):
+    path = tmp_path / "orders.json"
+    monkeypatch.setattr(config, "ORDERS_FILE", path)
+    monkeypatch.setattr(database, "orders_lock", filelock.FileLock(str(path) + ".lock"))
+    return path
+
+
+def test_repeated_submissions_of_a_key_save_one_order(orders_file):
+    queue = OrderQueue()
+    first = queue.submit("table3-cart1", 3, ITEMS, 40.0)
+    # Double tap before the writer ran
+    assert queue.submit("table3-cart1", 3, ITEMS, 40.0) is first
+    assert queue.flush()
+    # Rerun after the order was saved
+    again = queue.submit("table3-cart1", 3, ITEMS, 40.0)
+    assert again is first and again.status == "committed"
+
+    orders = load_orders()
+    assert len(orders) == 1
+    assert orders[0]["idempotency_key"] == "table3-cart1"
+    assert first.order["order_id"] == orders[0]["order_id"]
+
+
+def test_create_orders_returns_the_saved_order_for_a_known_key(orders_file):
+    request = {"table_id": 5, "items": ITEMS, "total_price": 40.0, "idempotency_key": "table5-cart1"}
+    first, duplicate, other = create_orders([request, dict(request), dict(request, idempotency_key="table5-cart2")])
+    assert duplicate["order_id"] == first["order_id"]
+    assert other["order_id"] != first["order_id"]
+
+    # A later write (another server process or a reload) gets the same order back
+    assert create_orders([dict(request)])[0]["order_id"] == first["order_id"]
+    assert len(load_orders()) == 2
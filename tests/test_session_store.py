@@ -0,0 +1,37 @@
+from utils.session_store import SessionStore
+
+STATE = {
+    "chat_messages": [{"role": "user", "content": "مجھے چائے چاہیے"}],
+    "cart_items": [{"item_id": "te01", "name": "Karak Tea", "price": 8.0, "quantity": 2}],
+    "order_submitted": False,
+    "chatbot": {"language": "ur"}
+}
+
+
+def test_saved_session_is_loaded_by_another_process(tmp_path):
+    path = tmp_path / "sessions.db"
+    assert SessionStore(path).save(4, "visit1", STATE)
+    # A second store on the same file (restart or another server) sees the session
+    other = SessionStore(path)
+    assert other.load(4, "visit1") == STATE
+    assert other.load(4, "visit2") is None
+    assert other.load(5, "visit1") is None
+
+
+def test_unchanged_state_is_not_written_again(tmp_path):
+    store = SessionStore(tmp_path / "sessions.db")
+    assert store.save(4, "visit1", STATE)
+    assert not store.save(4, "visit1", dict(STATE))
+    assert store.save(4, "visit1", dict(STATE, order_submitted=True))
+    assert store.load(4, "visit1")["order_submitted"] is True
+
+
+def test_deleted_and_idle_sessions_are_not_restored(tmp_path):
+    store = SessionStore(tmp_path / "sessions.db", idle_timeout=60)
+    store.save(4, "visit1", STATE)
+    store.delete(4, "visit1")
+    assert store.load(4, "visit1") is None
+
+    store.save(4, "visit2", STATE)
+    store._connect().execute("UPDATE sessions SET updated_at = updated_at - 120")
+    assert store.load(4, "visit2") is None
@@ -0,0 +1,40 @@
+import json
+from utils.token_ledger import MEMORY, TokenLedger, today
+
+
+def test_record_is_written_by_flush_to_the_ledger_path(tmp_path):
+    path = tmp_path / "usage.json"
+    ledger = TokenLedger(path, flush_interval=3600)
+    ledger.record(4, "s1", 100, 20, "m")
+    # Counted right away, written later
+    assert not path.exists()
+    assert ledger.table_tokens(4) == 120
+
+    assert ledger.flush()
+    usage = json.loads(path.read_text(encoding="utf-8"))
+    assert usage[today()]["tables"]["4"]["prompt_tokens"] == 100
+    assert ledger.table_tokens(4) == 120
+
+
+def test_memory_ledger_writes_no_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ledger = TokenLedger(MEMORY, flush_interval=3600)
+    ledger.record(2, "s1", 50, 10)
+    ledger.record(2, "s2", 5, 5)
+    assert ledger.day_usage()["tables"][0]["calls"] == 2
+    assert ledger.daily_totals()[-1]["sessions"] == 2
+    assert ledger.table_tokens(2) == 70
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_reports_include_pending_counts_without_writing(tmp_path):
+    path = tmp_path / "usage.json"
+    ledger = TokenLedger(path, flush_interval=3600)
+    ledger.record(3, "s1", 40, 10)
+    ledger.flush()
+    ledger.record(3, "s1", 60, 10)
+    assert ledger.day_usage()["tables"][0]["prompt_tokens"] == 100
+    assert ledger.daily_totals()[-1]["calls"] == 2
+    # Only the first call is on disk until the next flush
+    usage = json.loads(path.read_text(encoding="utf-8"))
+    assert usage[today()]["tables"]["3"]["calls"] == 1
@@ -0,0 +1,28 @@
+from utils.tracing import latency_summary, percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 11))
+    assert percentile(values, 50) == 5
+    assert percentile(values, 90) == 9
+    assert percentile(values, 95) == 10
+    assert percentile(values, 100) == 10
+    assert percentile(values, 0) == 1
+
+
+def test_percentile_p95_of_twenty_is_not_the_max():
+    values = list(range(1, 21))
+    assert percentile(values, 95) == 19
+    assert percentile(values, 99) == 20
+
+
+def test_percentile_unsorted_and_empty():
+    assert percentile([3.0, 1.0, 2.0], 50) == 2.0
+    assert percentile([], 95) == 0.0
+
+
+def test_latency_summary():
+    summary = latency_summary([0.1, 0.2, 0.3, 0.4])
+    assert summary["count"] == 4
+    assert summary["p50"] == 0.2
+    assert summary["max"] == 0.4
@@ -0,0 +1,47 @@
+import threading
+import time
+from utils.versioned_cache import VersionedCache
+
+
+def test_builds_once_per_version_and_keeps_the_latest():
+    cache = VersionedCache(2)
+    builds = []
+
+    def build(version):
+        return lambda: builds.append(version) or f"value-{version}"
+
+    assert cache.get("v1", build("v1")) == "value-v1"
+    assert cache.get("v1", build("v1")) == "value-v1"
+    cache.get("v2", build("v2"))
+    cache.get("v3", build("v3"))
+    assert builds == ["v1", "v2", "v3"]
+    assert len(cache) == 2
+    # The oldest version was dropped and is built again
+    cache.get("v1", build("v1"))
+    assert builds[-1] == "v1"
+
+
+def test_other_versions_are_served_while_one_builds():
+    cache = VersionedCache(4)
+    cache.get("old", lambda: "old-value")
+    release = threading.Event()
+    builds = []
+
+    def slow_build():
+        builds.append(1)
+        release.wait(5)
+        return "new-value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("new", slow_build))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while not builds:
+        time.sleep(0.01)
+    assert cache.get("old", lambda: "rebuilt") == "old-value"
+    assert results == []
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["new-value"] * 3
+    assert len(builds) == 1
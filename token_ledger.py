@@ -0,0 +1,213 @@
+"""
+Token accounting and budgets for the chatbot.
+Prompt and response tokens of every Gemini call are counted per table,
+session and day and saved next to the orders (token_usage.json) by a
+background thread. Sessions that use up most of their budget switch to
+compact prompts; past the budget they answer locally until the next session
+or day. Benchmarks and the fake backend keep their counts in memory.
+"""
+import atexit
+import copy
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+import config
+from utils.database import add_token_usage, load_token_usage, merge_token_usage
+
+# Ledger path that keeps the counts in memory instead of a file
+MEMORY = ":memory:"
+
+
+def today() -> str:
+    """Accounting day (local date, like order timestamps)."""
+    return datetime.now().date().isoformat()
+
+
+def total_tokens(totals: Dict) -> int:
+    return totals["prompt_tokens"] + totals["response_tokens"]
+
+
+def table_totals(day_usage: Dict) -> Dict[int, int]:
+    """{table_id: tokens} from one day of the usage file."""
+    return {int(table_id): total_tokens(totals) for table_id, totals in day_usage.get("tables", {}).items()}
+
+
+def budget_share(used: int, budget: int) -> float:
+    """Share of a budget used (0 when the budget is unlimited)."""
+    return used / budget if budget > 0 else 0.0
+
+
+class TokenLedger:
+    """
+    Counts tokens in memory and writes them to the usage file in batches.
+    `path` defaults to TOKEN_USAGE_FILE; MEMORY keeps the usage in memory only.
+    """
+
+    def __init__(self, path: Union[Path, str, None] = None, flush_interval: Optional[float] = None):
+        self.path = path if path == MEMORY else Path(path or config.TOKEN_USAGE_FILE)
+        self.flush_interval = config.TOKEN_LEDGER_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._pending = {}  # (day, table_id, session_id) -> entry not yet written
+        self._table_totals = {}  # table_id -> tokens today in the file (all processes)
+        self._usage = {}  # written usage of a MEMORY ledger
+        self._day = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def _load(self) -> Dict[str, Dict]:
+        if self.path == MEMORY:
+            return self._usage
+        return load_token_usage(self.path)
+
+    def _add(self, entries: List[Dict]) -> Optional[Dict[str, Dict]]:
+        if self.path == MEMORY:
+            self._usage = merge_token_usage(self._usage, entries)
+            return self._usage
+        return add_token_usage(entries, self.path)
+
+    def start(self):
+        """Start the background writer (once)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="token-ledger", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error writing token usage: {e}")
+
+    def _roll_day(self):
+        """Load today's table totals when the day changes (or on first use). Caller holds the lock."""
+        day = today()
+        if day != self._day:
+            self._table_totals = table_totals(self._load().get(day, {}))
+            self._day = day
+
+    def record(self, table_id: int, session_id: str, prompt_tokens: int, response_tokens: int,
+               model: Optional[str] = None):
+        """Count the tokens of one Gemini call (written by the background thread)."""
+        with self._lock:
+            self._roll_day()
+            key = (self._day, table_id, session_id)
+            entry = self._pending.setdefault(key, {
+                "day": self._day, "table_id": table_id, "session_id": session_id,
+                "prompt_tokens": 0, "response_tokens": 0, "calls": 0
+            })
+            entry["prompt_tokens"] += prompt_tokens or 0
+            entry["response_tokens"] += response_tokens or 0
+            entry["calls"] += 1
+            entry["model"] = model
+            entry["last_seen"] = datetime.now().isoformat()
+
+    def flush(self) -> bool:
+        """Write pending counts to the usage file."""
+        with self._flush_lock:
+            with self._lock:
+                entries = list(self._pending.values())
+                self._pending = {}
+            if not entries:
+                return True
+
+            usage = self._add(entries)
+            with self._lock:
+                if usage is None:
+                    # Keep the counts for the next attempt
+                    for entry in entries:
+                        key = (entry["day"], entry["table_id"], entry["session_id"])
+                        pending = self._pending.setdefault(key, dict(entry, prompt_tokens=0,
+                                                                     response_tokens=0, calls=0))
+                        for counter in ("prompt_tokens", "response_tokens", "calls"):
+                            pending[counter] += entry[counter]
+                    return False
+                if self._day is not None:
+                    # The file also holds other processes' counts
+                    self._table_totals = table_totals(usage.get(self._day, {}))
+            return True
+
+    def table_tokens(self, table_id: int) -> int:
+        """Tokens used by a table today, including counts not written yet."""
+        with self._lock:
+            self._roll_day()
+            pending = sum(
+                total_tokens(entry)
+                for (day, pending_table, _), entry in self._pending.items()
+                if day == self._day and pending_table == table_id
+            )
+            return self._table_totals.get(table_id, 0) + pending
+
+    def budget_mode(self, table_id: int, session_tokens: int) -> str:
+        """'normal', 'compact' or 'local' for a session given its and its table's usage."""
+        share = max(
+            budget_share(session_tokens, config.TOKEN_BUDGET_PER_SESSION),
+            budget_share(self.table_tokens(table_id), config.TOKEN_BUDGET_PER_TABLE_PER_DAY)
+        )
+        if share >= 1.0:
+            return "local"
+        if share >= config.TOKEN_BUDGET_COMPACT_SHARE:
+            return "compact"
+        return "normal"
+
+    def _usage_with_pending(self) -> Dict[str, Dict]:
+        """Written usage plus the counts not written yet (without writing them)."""
+        with self._lock:
+            entries = [dict(entry) for entry in self._pending.values()]
+        return merge_token_usage(copy.deepcopy(self._load()), entries)
+
+    def daily_totals(self) -> List[Dict]:
+        """Token totals per day, oldest first."""
+        rows = []
+        for day, data in sorted(self._usage_with_pending().items()):
+            tables = data.get("tables", {}).values()
+            rows.append({
+                "day": day,
+                "prompt_tokens": sum(t["prompt_tokens"] for t in tables),
+                "response_tokens": sum(t["response_tokens"] for t in tables),
+                "calls": sum(t["calls"] for t in tables),
+                "sessions": len(data.get("sessions", {}))
+            })
+        return rows
+
+    def day_usage(self, day: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """Per-table and per-session totals of a day, largest first."""
+        data = self._usage_with_pending().get(day or today(), {})
+        table_budget = config.TOKEN_BUDGET_PER_TABLE_PER_DAY
+        session_budget = config.TOKEN_BUDGET_PER_SESSION
+        tables = [
+            {"table_id": int(table_id), **totals,
+             "budget_used": round(budget_share(total_tokens(totals), table_budget), 3)}
+            for table_id, totals in data.get("tables", {}).items()
+        ]
+        sessions = [
+            {"session_id": session_id, **totals,
+             "budget_used": round(budget_share(total_tokens(totals), session_budget), 3)}
+            for session_id, totals in data.get("sessions", {}).items()
+        ]
+        return {
+            "tables": sorted(tables, key=total_tokens, reverse=True),
+            "sessions": sorted(sessions, key=total_tokens, reverse=True)
+        }
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_token_ledger() -> TokenLedger:
+    """Get the process-wide token ledger, starting its writer on first use."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            in_memory = config.TOKEN_USAGE_IN_MEMORY or config.GEMINI_BACKEND == "fake"
+            _ledger = TokenLedger(MEMORY if in_memory else None)
+            _ledger.start()
+            # Counts of the last few seconds would otherwise be lost on shutdown
+            atexit.register(_ledger.flush)
+        return _ledger
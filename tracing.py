@@ -0,0 +1,182 @@
+"""
+Latency tracing for the chatbot pipeline.
+Each operation (init, model discovery, prompt build, send, order parsing,
+cart update) records a span with its duration, time to first token and
+prompt/response sizes. Spans are kept in memory for the admin panel and
+can be exported as JSON.
+"""
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import config
+from utils.chat_history import estimate_tokens
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(values: List[float]) -> Dict:
+    """Count, mean and p50/p95/p99 of latencies in seconds."""
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4) if values else 0.0,
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4) if values else 0.0
+    }
+
+
+class Span:
+    """Timing and size data of one operation."""
+
+    def __init__(self, name: str, table_id: Optional[int] = None, model: Optional[str] = None,
+                 attributes: Optional[Dict] = None):
+        self.name = name
+        self.table_id = table_id
+        self.model = model
+        self.attributes = attributes or {}
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self.ttft = None
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self.prompt_tokens = None
+        self.response_tokens = None
+        self.status = "ok"
+        self.error = None
+
+    def mark_first_token(self):
+        """Record the time to first token (only the first call counts)."""
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self._start
+
+    def set_sizes(self, prompt: str = "", response: str = "", usage=None, prompt_tokens: Optional[int] = None):
+        """Record prompt/response sizes, using the API's token counts when available."""
+        self.prompt_chars = len(prompt)
+        self.response_chars = len(response)
+        self.prompt_tokens = (getattr(usage, "prompt_token_count", None) or prompt_tokens
+                              or estimate_tokens(prompt))
+        self.response_tokens = getattr(usage, "candidates_token_count", None) or estimate_tokens(response)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "table_id": self.table_id,
+            "model": self.model,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "ttft": self.ttft,
+            "prompt_chars": self.prompt_chars,
+            "response_chars": self.response_chars,
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class Tracer:
+    """Keeps the most recent spans and aggregates them per operation and model."""
+
+    def __init__(self, max_spans: Optional[int] = None):
+        self.enabled = config.TRACING_ENABLED
+        self._spans = deque(maxlen=max_spans or config.TRACE_MAX_SPANS)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, table_id: Optional[int] = None, model: Optional[str] = None, **attributes):
+        """Time the enclosed block; exceptions mark the span as failed and propagate."""
+        span = Span(name, table_id, model, attributes)
+        try:
+            yield span
+        except Exception as e:
+            span.status = "error"
+            span.error = str(e)[:200]
+            raise
+        finally:
+            self.record(span)
+
+    def record(self, span: Span):
+        """Finish a span (if still running) and keep it."""
+        if span.duration is None:
+            span.finish()
+        if self.enabled:
+            with self._lock:
+                self._spans.append(span)
+
+    def get_spans(self, name: Optional[str] = None) -> List[Dict]:
+        """Recorded spans as dicts, oldest first."""
+        with self._lock:
+            spans = list(self._spans)
+        return [span.to_dict() for span in spans if name is None or span.name == name]
+
+    def summary(self) -> List[Dict]:
+        """Latency percentiles, TTFT and token counts per operation and model."""
+        groups = {}
+        for span in self.get_spans():
+            groups.setdefault((span["name"], span["model"] or "-"), []).append(span)
+
+        rows = []
+        for (name, model), spans in sorted(groups.items()):
+            durations = [s["duration"] for s in spans]
+            ttfts = [s["ttft"] for s in spans if s["ttft"] is not None]
+            prompt_tokens = [s["prompt_tokens"] for s in spans if s["prompt_tokens"] is not None]
+            response_tokens = [s["response_tokens"] for s in spans if s["response_tokens"] is not None]
+            duration = latency_summary(durations)
+            ttft = latency_summary(ttfts)
+            rows.append({
+                "operation": name,
+                "model": model,
+                "count": len(spans),
+                "errors": sum(1 for s in spans if s["status"] != "ok"),
+                "p50": duration["p50"],
+                "p95": duration["p95"],
+                "p99": duration["p99"],
+                "ttft_p50": ttft["p50"] if ttfts else None,
+                "ttft_p95": ttft["p95"] if ttfts else None,
+                "ttft_p99": ttft["p99"] if ttfts else None,
+                "avg_prompt_tokens": round(sum(prompt_tokens) / len(prompt_tokens)) if prompt_tokens else None,
+                "avg_response_tokens": round(sum(response_tokens) / len(response_tokens)) if response_tokens else None
+            })
+        return rows
+
+    def export_json(self) -> str:
+        """Summary and raw spans as a JSON document."""
+        return json.dumps({
+            "exported_at": time.time(),
+            "summary": self.summary(),
+            "spans": self.get_spans()
+        }, ensure_ascii=False, indent=2)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+        return _tracer
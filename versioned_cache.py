@@ -0,0 +1,56 @@
+"""
+Objects built once per data version.
+The menu index, deal engine and menu cards are derived from the menu and
+deals; each is built the first time its version is asked for and only the
+latest few versions are kept.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+
+class VersionedCache:
+    """Values by version, building each once and keeping the `size` most recent."""
+
+    def __init__(self, size: int = 4):
+        self.size = size
+        self._values = OrderedDict()  # version -> value, newest last
+        self._building = {}  # version -> Future of a value being built
+        self._lock = threading.Lock()
+
+    def get(self, version: Hashable, build: Callable[[], Any]) -> Any:
+        """
+        The value of a version, built with `build()` if it is not cached.
+        The build runs without holding the lock, so other versions are served
+        meanwhile; callers asking for the same version wait for it.
+        """
+        with self._lock:
+            value = self._values.get(version)
+            if value is not None:
+                return value
+            future = self._building.get(version)
+            building = future is None
+            if building:
+                future = self._building[version] = Future()
+
+        if not building:
+            return future.result()
+
+        try:
+            value = build()
+        except BaseException as e:
+            with self._lock:
+                del self._building[version]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            while len(self._values) >= self.size:
+                self._values.popitem(last=False)
+            self._values[version] = value
+            del self._building[version]
+        future.set_result(value)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._values)